@@ -6,8 +6,8 @@
 """
 
 import streamlit as st
-import json
 import os
+import time
 from datetime import datetime
 from helpers import (
     validate_inventory_movement, 
@@ -30,41 +30,87 @@ from helpers import (
     get_stock_out_frequency,
     predict_low_stock,
     AttendanceManager,
+    parse_badge_events,
     MultiWarehouseManager,
+    StockLedger,
+    TransferManager,
+    OrderBook,
+    WavePlanner,
+    PickPathOptimizer,
+    ShipmentManager,
+    ReplenishmentEngine,
+    load_dataset,
+    save_dataset,
+    dataset_stamp,
+    compact_dataset,
     backup_manager,
     audit_logger,
     auth_manager,
     attendance_manager,
-    warehouse_manager
+    attendance_analytics,
+    warehouse_manager,
+    session_manager,
+    shard_store,
+    snapshot_store,
+    email_config,
+    alert_dispatcher,
+    event_bus,
+    view_cache,
+    profiler,
+    metrics_registry
 )
 
+rerun_started = time.perf_counter()
+
 # =============================================================================
 # DATA STORAGE (Local JSON - No database needed)
 # =============================================================================
 DATA_FILE = "warehouse_data.json"
+data_scope = None  # warehouse id whose shard is loaded (None = all)
+# Slot-backed inventory/order records instead of dicts (large datasets)
+COMPACT_RECORDS = os.environ.get('WAREHOUSE_COMPACT', '0') == '1'
 
-def load_data():
-    """Load data from JSON file"""
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return {
-        'employees': [],
-        'inventory': [],
-        'orders': [],
-        'shipments': []
-    }
+@profiler.instrumented("app.load_data")
+def load_data(warehouse_id=None):
+    """Load data from JSON file (or the selected warehouse shard)"""
+    global data_scope
+    data_scope = warehouse_id
+    if shard_store.enabled():
+        data = shard_store.load_scope(warehouse_id)
+    else:
+        # Shared mapped snapshot when it is current, so workers skip the JSON parse
+        data = (snapshot_store.load(DATA_FILE) if snapshot_store.enabled() else None) or load_dataset(DATA_FILE)
+    return compact_dataset(data) if COMPACT_RECORDS else data
 
+def data_generation(warehouse_id=None):
+    """Stamp of the files load_data(warehouse_id) reads; changes on every save by any worker"""
+    if shard_store.enabled():
+        return 'shards', shard_store.scope_stamp(warehouse_id)
+    return 'file', dataset_stamp(DATA_FILE)
+
+@profiler.instrumented("app.save_data")
 def save_data(data):
-    """Save data to JSON file"""
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    """Save data to JSON file (only changed shards when sharded)"""
+    # The cached ledger/order indexes may not cover direct list edits: rebuild after a write
+    st.session_state.pop('data_state', None)
+    if shard_store.enabled():
+        try:
+            shard_store.save(data, data_scope)
+        except ValueError as e:
+            # Nothing was written; stop before the caller reports success
+            st.error(f"❌ Not saved: {e}")
+            st.stop()
+        return
+    save_dataset(data, DATA_FILE)
+    if snapshot_store.enabled():
+        snapshot_store.publish(data, DATA_FILE)
 
-# Load initial data
-warehouse_data = load_data()
+def next_id(table):
+    """Next record id; allocated globally when data is sharded"""
+    if shard_store.enabled():
+        return shard_store.allocate_id(table)
+    # Not len() + 1: after a delete that repeats an id still in use
+    return max((r['id'] for r in warehouse_data[table]), default=0) + 1
 
 # =============================================================================
 # AUTHENTICATION & SESSION MANAGEMENT
@@ -77,6 +123,8 @@ def initialize_session():
         st.session_state.user_role = None
     if 'username' not in st.session_state:
         st.session_state.username = None
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = None
 
 
 def login_page():
@@ -210,6 +258,7 @@ def login_page():
                         st.session_state.authenticated = True
                         st.session_state.user_role = role
                         st.session_state.username = username
+                        st.session_state.session_token = session_manager.create_session(username, role)
                         st.success(message)
                         st.experimental_rerun()
                     else:
@@ -275,11 +324,10 @@ def login_page():
                             st.success(message)
                             st.balloons()
                             st.info("✅ Account created! You can now login with your credentials.")
-                            audit_logger.log_action(
-                                'CREATE', 
-                                'users', 
-                                1, 
-                                'System', 
+                            event_bus.publish(
+                                'UserCreated',
+                                1,
+                                'System',
                                 f'New user registered: {new_username} ({user_role})'
                             )
                         else:
@@ -289,35 +337,44 @@ def login_page():
 
 
 def check_permission(required_action: str) -> bool:
-    """Check if user has permission for action"""
-    return auth_manager.has_permission(st.session_state.user_role, required_action)
+    """Check if user has permission for action (bit test on the session token)"""
+    return session_manager.has_permission(st.session_state.session_token, required_action)
 
 
 # Initialize session
 initialize_session()
 
+# Expired or revoked tokens force a fresh login
+if st.session_state.authenticated and not session_manager.get_session(st.session_state.session_token):
+    st.session_state.authenticated = False
+    st.session_state.user_role = None
+    st.session_state.username = None
+    st.session_state.session_token = None
+
 # Check authentication
 if not st.session_state.authenticated:
     login_page()
     st.stop()
 
-# Load initial data
-warehouse_data = load_data()
+# Whole-rerun profile requested from the admin Performance tab (authenticated reruns only).
+# finally: st.stop(), reruns and errors in a page must not leave the capture running.
+rerun_capture = profiler.capture() if st.session_state.get('profile_next_rerun') else None
+st.session_state['profile_next_rerun'] = False
+try:
+    # =============================================================================
+    # CONFIGURATION
+    # =============================================================================
+    st.set_page_config(
+        page_title="🏭 Industrial Warehouse Pro",
+        page_icon="🏭",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
 
-# =============================================================================
-# CONFIGURATION
-# =============================================================================
-st.set_page_config(
-    page_title="🏭 Industrial Warehouse Pro",
-    page_icon="🏭",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# =============================================================================
-# CUSTOM STYLING FOR MAIN APPLICATION
-# =============================================================================
-st.markdown("""
+    # =============================================================================
+    # CUSTOM STYLING FOR MAIN APPLICATION
+    # =============================================================================
+    st.markdown("""
 <style>
 /* Main app background */
 .stApp {
@@ -478,1011 +535,1628 @@ body, p, label, .stMarkdown, span {
 </style>
 """, unsafe_allow_html=True)
 
-# =============================================================================
-# MAIN INTERFACE
-# =============================================================================
-col1, col2 = st.columns([10, 2])
-with col1:
-    st.markdown("""
+    # =============================================================================
+    # MAIN INTERFACE
+    # =============================================================================
+    col1, col2 = st.columns([10, 2])
+    with col1:
+        st.markdown("""
     <h1 style='color: #FF6B6B; text-align: left; text-shadow: 0 0 30px rgba(255, 107, 107, 0.4);'>
     🏭 INDUSTRIAL WAREHOUSE MANAGEMENT SYSTEM
     </h1>
     """, unsafe_allow_html=True)
-with col2:
-    if st.button("🚪 Logout", key="logout_btn"):
-        st.session_state.authenticated = False
-        st.session_state.user_role = None
-        st.session_state.username = None
-        st.experimental_rerun()
+    with col2:
+        if st.button("🚪 Logout", key="logout_btn"):
+            session_manager.revoke(st.session_state.session_token)
+            st.session_state.session_token = None
+            st.session_state.authenticated = False
+            st.session_state.user_role = None
+            st.session_state.username = None
+            st.experimental_rerun()
 
-st.markdown(f"<p style='color: #FFB0B0; font-size: 13px;'>**User:** {st.session_state.username} | **Role:** {st.session_state.user_role.upper()} | ✅ Production Ready | ⚡ Zero Dependencies | 🚀 Instant Deployment</p>", unsafe_allow_html=True)
+    st.markdown(f"<p style='color: #FFB0B0; font-size: 13px;'>**User:** {st.session_state.username} | **Role:** {st.session_state.user_role.upper()} | ✅ Production Ready | ⚡ Zero Dependencies | 🚀 Instant Deployment</p>", unsafe_allow_html=True)
 
-# Sidebar Navigation with Role-Based Access
-st.sidebar.title("📋 Navigation")
+    # Sidebar Navigation with Role-Based Access
+    st.sidebar.title("📋 Navigation")
 
-page_options = ["📊 Dashboard", "👥 Employees", "📦 Inventory", "🛒 Orders", "🚚 Shipments", "📈 Reports"]
+    page_options = ["📊 Dashboard", "👥 Employees", "📦 Inventory", "🛒 Orders", "🚚 Shipments", "📈 Reports"]
 
-# Add admin-only options
-if st.session_state.user_role == 'admin':
-    page_options.extend(["🔐 Admin Panel", "⚙️ Settings"])
+    # Add admin-only options
+    if st.session_state.user_role == 'admin':
+        page_options.extend(["🔐 Admin Panel", "⚙️ Settings"])
 
-page = st.sidebar.selectbox("Select Module:", page_options)
+    page = st.sidebar.selectbox("Select Module:", page_options)
+    page_started = time.perf_counter()
 
-# Sidebar Info Panel
-with st.sidebar:
-    st.markdown("---")
-    st.subheader("📊 Quick Stats")
-    col1, col2 = st.columns(2)
-    with col1:
-        st.metric("👥 Employees", len(warehouse_data['employees']))
-    with col2:
-        st.metric("📦 Items", len(warehouse_data['inventory']))
-    
-    st.metric("🛒 Orders", len(warehouse_data['orders']))
-    
-    # Admin options
-    if st.session_state.user_role == 'admin':
+    # Warehouse scope for inventory, order and dashboard views
+    warehouses = warehouse_manager.get_all_warehouses()
+    selected_site = st.sidebar.selectbox(
+        "🏢 Warehouse:",
+        ["All Warehouses"] + [f"ID:{w['id']} - {w['name']}" for w in warehouses]
+    )
+    selected_warehouse = None if selected_site == "All Warehouses" else int(selected_site.split(':')[1].split(' ')[0])
+
+    def publish_stock_crossing(crossing):
+        """Ledger callback: an item just went below min_stock or recovered"""
+        where = f" at site {crossing['warehouse_id']}" if crossing['warehouse_id'] else ""
+        level = f"{crossing['quantity']}/{crossing['min_stock']}"
+        event_bus.publish(
+            'StockLow' if crossing['low'] else 'StockRecovered',
+            crossing['item_id'],
+            st.session_state.get('username', 'System'),
+            f"{crossing['name']}{where}: {level}",
+            warehouse_id=crossing['warehouse_id'],
+            # Site crossings alert too: one site can run dry while the network total looks fine
+            alert=f"{crossing['name']}{where} below minimum stock ({level})" if crossing['low'] else None
+        )
+
+    @profiler.instrumented("app.load_state")
+    def load_state(warehouse_id, warehouses):
+        """Data plus the ledger-backed managers, reused across reruns until the data files change"""
+        global data_scope
+        key = (warehouse_id, data_generation(warehouse_id), COMPACT_RECORDS,
+               tuple((w['id'], w.get('capacity', 0)) for w in warehouses))
+        cached = st.session_state.get('data_state')
+        if cached and cached[0] == key:
+            data_scope = warehouse_id
+            return cached[1]
+        
+        data = load_data(warehouse_id)
+        ledger = StockLedger(data, warehouses, on_cross=publish_stock_crossing)
+        allocate_id = shard_store.allocate_id if shard_store.enabled() else None
+        state = {
+            'data': data,
+            'stock_ledger': ledger,
+            'transfer_manager': TransferManager(data, ledger, allocate_id=allocate_id),
+            'order_book': OrderBook(data, ledger, allocate_id=allocate_id),
+            'shipment_manager': ShipmentManager(data, ledger.default_warehouse, allocate_id=allocate_id),
+            'generation': key[1]
+        }
+        st.session_state['data_state'] = (key, state)
+        return state
+
+    # Load data (only the selected warehouse's shard when sharding is on)
+    app_state = load_state(selected_warehouse, warehouses)
+    warehouse_data = app_state['data']
+    stock_ledger = app_state['stock_ledger']
+    transfer_manager = app_state['transfer_manager']
+    order_book = app_state['order_book']
+    shipment_manager = app_state['shipment_manager']
+    data_gen = app_state['generation']  # keys view_cache entries, so other workers' writes show up
+
+    # Release orders deferred by peak-hour admission control into this hour's capacity.
+    # Only sites whose orders are loaded are primed and drained (one shard when sharded).
+    loaded_scope = selected_warehouse if shard_store.enabled() else None
+    peak_manager.prime(warehouse_data['orders'], loaded_scope)
+    released_entries = peak_manager.drain(warehouse_id=loaded_scope)
+    released_orders, admitted, retry, partial = [], [], [], False
+    if released_entries:
+        orders_by_id = {o['id']: o for o in warehouse_data['orders']}
+        for entry in released_entries:
+            order_id, units, site, _ = entry
+            order = orders_by_id.get(order_id)
+            if order is None:
+                # Deleted since it was queued: give its units back to the hour
+                peak_manager.forget(order_id, units, warehouse_id=site)
+                continue
+            moved, _ = order_book.advance_order(order_id, 'Reserved')
+            if order_book.next_state(order) == 'Reserved':
+                retry.append(entry)  # some lines still lack stock: stay at the head of the queue
+                partial = partial or moved
+                continue
+            order['admission'] = 'Admitted'
+            order['admitted_hour'] = peak_manager.slot()
+            released_orders.append(order_id)
+            admitted.append(entry)
+        peak_manager.mark_released(admitted)
+        peak_manager.requeue(retry)
+    if released_orders or partial:
+        save_data(warehouse_data)
+    if released_orders:
+        event_bus.publish('OrderUpdated', released_orders[0], 'System',
+                          f"Released from admission queue: orders {released_orders}")
+        st.sidebar.info(f"⏳ {len(released_orders)} queued orders released for fulfilment")
+
+    active_warehouse = selected_warehouse or stock_ledger.default_warehouse
+    inventory_view = stock_ledger.items_at(selected_warehouse) if selected_warehouse else warehouse_data['inventory']
+    all_orders = order_book.view(warehouse_data['orders'])
+    orders_view = order_book.view(stock_ledger.orders_at(selected_warehouse)) if selected_warehouse else all_orders
+
+    # Sidebar Info Panel
+    with st.sidebar:
         st.markdown("---")
-        st.subheader("🔧 Admin Tools")
+        st.subheader("📊 Quick Stats")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("👥 Employees", len(warehouse_data['employees']))
+        with col2:
+            st.metric("📦 Items", len(inventory_view))
         
-        with st.expander("💾 Backup & Recovery"):
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("🔄 Create Backup"):
-                    try:
-                        backup_file = backup_manager.create_backup(warehouse_data)
-                        st.success(f"✅ Backup created: {backup_file}")
-                    except Exception as e:
-                        st.error(f"❌ Backup failed: {str(e)}")
-            
-            with col2:
-                if st.button("📋 View Backups"):
-                    st.session_state.show_backups = not st.session_state.get('show_backups', False)
-            
-            if st.session_state.get('show_backups'):
-                backups = backup_manager.list_backups()
-                if backups:
-                    selected_backup = st.selectbox(
-                        "Select backup to restore:",
-                        [b['filename'] for b in backups],
-                        key="backup_select"
-                    )
-                    
-                    backup_path = next((b['path'] for b in backups if b['filename'] == selected_backup), None)
-                    if st.button("Restore Selected Backup"):
-                        try:
-                            success, msg = backup_manager.restore_backup(backup_path)
-                            if success:
-                                st.success(msg)
-                                st.experimental_rerun()
-                            else:
-                                st.error(msg)
-                        except Exception as e:
-                            st.error(f"❌ Restore failed: {str(e)}")
-                else:
-                    st.info("No backups available")
+        st.metric("🛒 Orders", len(orders_view))
         
-        with st.expander("📋 Audit Trail"):
-            if st.button("📥 Download Audit Log"):
-                try:
-                    success, msg = audit_logger.export_audit_csv()
-                    if success:
-                        st.success(msg)
-                        with open("audit_report.csv", "rb") as f:
-                            st.download_button(
-                                label="⬇️ Download CSV",
-                                data=f.read(),
-                                file_name="audit_report.csv",
-                                mime="text/csv"
-                            )
-                    else:
-                        st.error(msg)
-                except Exception as e:
-                    st.error(f"❌ Export failed: {str(e)}")
-            
-            recent_logs = audit_logger.get_audit_trail()[:10]
-            if recent_logs:
-                st.dataframe(recent_logs, use_container_width=True)
-            else:
-                st.info("No audit logs yet")
-
-# =============================================================================
-# EXECUTIVE DASHBOARD
-# =============================================================================
-if page == "📊 Dashboard":
-    col1, col2, col3, col4 = st.columns(4)
-    
-    # KPIs
-    with col1:
-        st.metric("👥 Employees", len(warehouse_data['employees']))
-    
-    with col2:
-        total_value = sum(
-            item.get('quantity', 0) * item.get('price', 0) 
-            for item in warehouse_data['inventory']
-        )
-        st.metric("💰 Inventory Value", f"₹{total_value:,.0f}")
-    
-    with col3:
-        pending = len([o for o in warehouse_data['orders'] if o.get('status') == 'Pending'])
-        st.metric("🛒 Pending Orders", pending)
-    
-    with col4:
-        low_stock = len([
-            i for i in warehouse_data['inventory'] 
-            if i.get('quantity', 0) < i.get('min_stock', 10)
-        ])
-        st.metric("⚠️ Low Stock", low_stock)
-    
-    # Advanced Analytics Row
-    st.subheader("📊 Advanced Analytics")
-    tab1, tab2, tab3, tab4 = st.tabs(["💵 Profit Analysis", "📈 Inventory Turnover", "📊 Revenue Trends", "🏭 Stock Forecast"])
-    
-    with tab1:
-        try:
-            profit_data = calculate_profit_margin(warehouse_data['orders'], warehouse_data['inventory'])
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Revenue", f"₹{profit_data.get('total_revenue', 0):,.0f}")
-            with col2:
-                st.metric("Estimated Cost", f"₹{profit_data.get('estimated_cost', 0):,.0f}")
-            with col3:
-                st.metric("Profit", f"₹{profit_data.get('profit', 0):,.0f}")
-            with col4:
-                st.metric("Profit Margin %", f"{profit_data.get('margin_percent', 0):.1f}%")
-        except Exception as e:
-            st.error(f"❌ Analytics error: {str(e)}")
-    
-    with tab2:
-        try:
-            turnover_data = calculate_inventory_turnover(warehouse_data['orders'], warehouse_data['inventory'])
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Sold", turnover_data.get('total_sold', 0))
-            with col2:
-                st.metric("Avg Inventory", turnover_data.get('avg_inventory', 0))
-            with col3:
-                st.metric("Turnover Rate", f"{turnover_data.get('turnover_rate', 0):.2f}x")
-            with col4:
-                st.metric("Days to Sell", f"{turnover_data.get('days_to_sell', 0):.0f}")
-        except Exception as e:
-            st.error(f"❌ Analytics error: {str(e)}")
-    
-    with tab3:
-        try:
-            trends = get_revenue_trends(warehouse_data['orders'], days=30)
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Period", f"{trends.get('period_days', 0)} days")
-            with col2:
-                st.metric("Total Revenue", f"₹{trends.get('total_revenue', 0):,.0f}")
-            with col3:
-                st.metric("Daily Avg", f"₹{trends.get('avg_daily', 0):,.0f}")
+        # Admin options
+        if st.session_state.user_role == 'admin':
+            st.markdown("---")
+            st.subheader("🔧 Admin Tools")
             
-            if trends.get('daily_revenue'):
-                st.bar_chart(trends['daily_revenue'])
-        except Exception as e:
-            st.error(f"❌ Analytics error: {str(e)}")
-    
-    with tab4:
-        try:
-            forecasts = predict_low_stock(warehouse_data['orders'], warehouse_data['inventory'], days_ahead=7)
-            if forecasts:
-                st.warning(f"⚠️ {len(forecasts)} items predicted to go low in 7 days")
-                st.dataframe(forecasts, use_container_width=True)
-            else:
-                st.success("✅ All items have sufficient stock for next 7 days")
-        except Exception as e:
-            st.error(f"❌ Forecast error: {str(e)}")
-    
-    # Peak Hour Alert
-    if peak_manager.is_peak_hour():
-        capacity = peak_manager.get_current_capacity()
-        total_ordered = sum(
-            sum(item.get('quantity', 0) for item in o.get('items', [])) 
-            for o in warehouse_data['orders']
-        )
-        peak_warning, msg = peak_manager.get_peak_hour_warning(warehouse_data['orders'])
-        if peak_warning:
-            st.warning(msg)
-        else:
-            st.info(f"📊 Peak hours: {total_ordered}/{capacity} capacity used")
-    
-    # Recent Activity
-    st.subheader("📋 Recent Activity")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("Latest Orders")
-        recent_orders = warehouse_data['orders'][-5:]
-        if recent_orders:
-            st.dataframe(recent_orders, use_container_width=True)
-    
-    with col2:
-        st.subheader("Inventory Status")
-        low_items = [i for i in warehouse_data['inventory'] 
-                    if i.get('quantity', 0) < i.get('min_stock', 10)]
-        if low_items:
-            st.error(f"⚠️ {len(low_items)} LOW STOCK ITEMS")
-            for item in low_items:
-                st.warning(f"{item['name']}: {item['quantity']}/{item['min_stock']}")
-        else:
-            st.success("✅ All stock levels OK")
-
-# =============================================================================
-# EMPLOYEES MODULE
-# =============================================================================
-elif page == "👥 Employees":
-    tab1, tab2, tab3, tab4 = st.tabs(["➕ Hire Employee", "📋 Employee List", "👣 Attendance", "📥 Export"])
-    
-    with tab1:
-        if check_permission('create'):
-            st.subheader("Hire New Employee")
-            with st.form("add_employee", clear_on_submit=True):
+            with st.expander("💾 Backup & Recovery"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    name = st.text_input("Full Name")
-                    position = st.selectbox("Position", ["Worker", "Supervisor", "Manager", "Engineer"])
+                    if st.button("🔄 Create Backup"):
+                        try:
+                            backup_file = backup_manager.create_backup(warehouse_data)
+                            st.success(f"✅ Backup created: {backup_file}")
+                        except Exception as e:
+                            st.error(f"❌ Backup failed: {str(e)}")
+                
                 with col2:
-                    age = st.number_input("Age", 18, 65, 30)
-                    salary = st.number_input("Monthly Salary", 25000.0, 150000.0, 50000.0, step=1000.0)
+                    if st.button("📋 View Backups"):
+                        st.session_state.show_backups = not st.session_state.get('show_backups', False)
                 
-                submitted = st.form_submit_button("✅ Hire Employee", use_container_width=True)
-                if submitted:
+                if st.session_state.get('show_backups'):
+                    backups = backup_manager.list_backups()
+                    if backups:
+                        selected_backup = st.selectbox(
+                            "Select backup to restore:",
+                            [b['filename'] for b in backups],
+                            key="backup_select"
+                        )
+                        
+                        backup_path = next((b['path'] for b in backups if b['filename'] == selected_backup), None)
+                        if st.button("Restore Selected Backup"):
+                            try:
+                                success, msg = backup_manager.restore_backup(backup_path)
+                                if success:
+                                    st.success(msg)
+                                    st.experimental_rerun()
+                                else:
+                                    st.error(msg)
+                            except Exception as e:
+                                st.error(f"❌ Restore failed: {str(e)}")
+                    else:
+                        st.info("No backups available")
+            
+            with st.expander("📋 Audit Trail"):
+                if st.button("📥 Download Audit Log"):
                     try:
-                        valid, msg = validate_employee_data(name, int(age), position, float(salary))
-                        if valid:
-                            emp_id = len(warehouse_data['employees']) + 1
-                            employee = {
-                                'id': emp_id,
-                                'name': name,
-                                'age': int(age),
-                                'position': position,
-                                'salary': float(salary),
-                                'shift': 'Day',
-                                'hire_date': datetime.now().strftime("%Y-%m-%d")
-                            }
-                            warehouse_data['employees'].append(employee)
-                            save_data(warehouse_data)
-                            audit_logger.log_action('CREATE', 'employees', emp_id, st.session_state.username, f"Hired {name}")
-                            st.success(f"✅ {name} hired successfully! ID: {emp_id}")
-                            st.experimental_rerun()
+                        success, msg = audit_logger.export_audit_csv()
+                        if success:
+                            st.success(msg)
+                            with open("audit_report.csv", "rb") as f:
+                                st.download_button(
+                                    label="⬇️ Download CSV",
+                                    data=f.read(),
+                                    file_name="audit_report.csv",
+                                    mime="text/csv"
+                                )
                         else:
                             st.error(msg)
                     except Exception as e:
-                        st.error(f"❌ Error: {str(e)}")
-        else:
-            st.warning("❌ You don't have permission to hire employees")
-    
-    with tab2:
-        st.subheader("👥 Employee List")
+                        st.error(f"❌ Export failed: {str(e)}")
+                
+                recent_logs = audit_logger.get_audit_trail()[:10]
+                if recent_logs:
+                    st.dataframe(recent_logs, use_container_width=True)
+                else:
+                    st.info("No audit logs yet")
+
+    # =============================================================================
+    # EXECUTIVE DASHBOARD
+    # =============================================================================
+    if page == "📊 Dashboard":
+        col1, col2, col3, col4 = st.columns(4)
         
-        # Search functionality
-        search_query = st.text_input("🔍 Search employees (name/position/ID):")
+        # KPIs
+        with col1:
+            st.metric("👥 Employees", len(warehouse_data['employees']))
         
-        if search_query:
-            employees_to_display = search_employees(warehouse_data['employees'], search_query)
-            if not employees_to_display:
-                st.info("No employees found")
-        else:
-            employees_to_display = warehouse_data['employees']
+        with col2:
+            total_value = sum(
+                item.get('quantity', 0) * item.get('price', 0) 
+                for item in inventory_view
+            )
+            st.metric("💰 Inventory Value", f"₹{total_value:,.0f}")
         
-        if employees_to_display:
-            st.dataframe(employees_to_display, use_container_width=True)
-            
-            # Payroll Summary
-            total_payroll = sum(emp.get('salary', 0) for emp in employees_to_display)
-            st.metric("💰 Payroll (Filtered)", f"₹{total_payroll:,.0f}")
-        else:
-            st.info("👥 No employees. Hire your first employee above!")
-    
-    with tab3:
-        st.subheader("👣 Employee Attendance")
+        with col3:
+            pending = len([o for o in orders_view if o.get('status') not in OrderBook.CLOSED_STATES])
+            st.metric("🛒 Pending Orders", pending)
         
-        if warehouse_data['employees']:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                selected_emp = st.selectbox(
-                    "Select Employee:",
-                    [f"ID:{e['id']} - {e['name']}" for e in warehouse_data['employees']]
-                )
-                emp_id = int(selected_emp.split(':')[1].split(' ')[0])
-                
-                if st.button("✅ Check In", use_container_width=True):
-                    success, msg = attendance_manager.check_in(emp_id)
-                    if success:
-                        st.success(msg)
-                        audit_logger.log_action('UPDATE', 'attendance', emp_id, st.session_state.username, 'Checked in')
-                    else:
-                        st.warning(msg)
-            
-            with col2:
-                if st.button("🚪 Check Out", use_container_width=True):
-                    success, msg = attendance_manager.check_out(emp_id)
-                    if success:
-                        st.success(msg)
-                        audit_logger.log_action('UPDATE', 'attendance', emp_id, st.session_state.username, 'Checked out')
-                    else:
-                        st.warning(msg)
-            
-            # Attendance Report
-            st.subheader("📋 Attendance Record")
-            attendance_records = attendance_manager.get_attendance_report(emp_id)
-            if attendance_records:
-                st.dataframe(attendance_records, use_container_width=True)
-            else:
-                st.info("No attendance records yet")
-        else:
-            st.info("No employees to track")
-    
-    with tab4:
-        st.subheader("📥 Export Employees")
+        with col4:
+            low_stock = len(stock_ledger.low_stock_ids(selected_warehouse))
+            st.metric("⚠️ Low Stock", low_stock)
         
-        if warehouse_data['employees']:
-            if st.button("📥 Export to CSV"):
-                try:
-                    success, msg = export_to_csv(warehouse_data['employees'], "employees_export.csv")
-                    if success:
-                        st.success(msg)
-                        with open("employees_export.csv", "rb") as f:
-                            st.download_button(
-                                label="⬇️ Download CSV",
-                                data=f.read(),
-                                file_name="employees_export.csv",
-                                mime="text/csv"
-                            )
-                    else:
-                        st.error(msg)
-                except Exception as e:
-                    st.error(f"❌ Export failed: {str(e)}")
-        else:
-            st.info("No employees to export")
-
-# =============================================================================
-# INVENTORY MODULE
-# =============================================================================
-elif page == "📦 Inventory":
-    tab1, tab2, tab3, tab4 = st.tabs(["➕ Add Stock", "📋 View Stock", "✏️ Adjust Stock", "📥 Export"])
-    
-    with tab1:
-        if check_permission('create'):
-            st.subheader("Add New Inventory Item")
-            with st.form("add_inventory", clear_on_submit=True):
-                col1, col2 = st.columns(2)
+        if selected_warehouse:
+            st.progress(min(stock_ledger.utilization(selected_warehouse), 1.0),
+                        text=f"🏢 Capacity used: {stock_ledger.site_total(selected_warehouse):,} / "
+                             f"{stock_ledger.capacity.get(selected_warehouse, 0):,} units")
+        
+        # Advanced Analytics Row (cached until an order/stock event invalidates them)
+        st.subheader("📊 Advanced Analytics")
+        cache_scope = (selected_warehouse, datetime.now().strftime("%Y-%m-%d"))
+        stock_modules = ('orders', 'inventory', 'transfers', 'purchase_orders')
+        tab1, tab2, tab3, tab4 = st.tabs(["💵 Profit Analysis", "📈 Inventory Turnover", "📊 Revenue Trends", "🏭 Stock Forecast"])
+        
+        with tab1:
+            try:
+                profit_data = view_cache.get(('profit', cache_scope), stock_modules,
+                                             lambda: calculate_profit_margin(orders_view, inventory_view),
+                                             generation=data_gen)
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Total Revenue", f"₹{profit_data.get('total_revenue', 0):,.0f}")
+                with col2:
+                    st.metric("Estimated Cost", f"₹{profit_data.get('estimated_cost', 0):,.0f}")
+                with col3:
+                    st.metric("Profit", f"₹{profit_data.get('profit', 0):,.0f}")
+                with col4:
+                    st.metric("Profit Margin %", f"{profit_data.get('margin_percent', 0):.1f}%")
+            except Exception as e:
+                st.error(f"❌ Analytics error: {str(e)}")
+        
+        with tab2:
+            try:
+                turnover_data = view_cache.get(('turnover', cache_scope), stock_modules,
+                                               lambda: calculate_inventory_turnover(orders_view, inventory_view),
+                                               generation=data_gen)
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Total Sold", turnover_data.get('total_sold', 0))
+                with col2:
+                    st.metric("Avg Inventory", turnover_data.get('avg_inventory', 0))
+                with col3:
+                    st.metric("Turnover Rate", f"{turnover_data.get('turnover_rate', 0):.2f}x")
+                with col4:
+                    st.metric("Days to Sell", f"{turnover_data.get('days_to_sell', 0):.0f}")
+            except Exception as e:
+                st.error(f"❌ Analytics error: {str(e)}")
+        
+        with tab3:
+            try:
+                trends = view_cache.get(('trends', cache_scope), stock_modules,
+                                        lambda: get_revenue_trends(orders_view, days=30),
+                                        generation=data_gen)
+                col1, col2, col3 = st.columns(3)
                 with col1:
-                    name = st.text_input("Item Name")
-                    quantity = st.number_input("Quantity", 0, 10000, 100, step=10)
+                    st.metric("Period", f"{trends.get('period_days', 0)} days")
                 with col2:
-                    price = st.number_input("Price per Unit", 0.1, 100000.0, 100.0, step=10.0)
-                    min_stock = st.number_input("Minimum Stock Level", 0, 1000, 10)
+                    st.metric("Total Revenue", f"₹{trends.get('total_revenue', 0):,.0f}")
+                with col3:
+                    st.metric("Daily Avg", f"₹{trends.get('avg_daily', 0):,.0f}")
                 
-                submitted = st.form_submit_button("➕ Add Item", use_container_width=True)
-                if submitted:
-                    try:
-                        valid, msg = validate_inventory_item(name, int(quantity), float(price), int(min_stock))
-                        if valid:
-                            item_id = len(warehouse_data['inventory']) + 1
-                            item = {
-                                'id': item_id,
-                                'name': name,
-                                'quantity': int(quantity),
-                                'price': float(price),
-                                'min_stock': int(min_stock),
-                                'added_date': datetime.now().strftime("%Y-%m-%d")
-                            }
-                            warehouse_data['inventory'].append(item)
-                            save_data(warehouse_data)
-                            audit_logger.log_action('CREATE', 'inventory', item_id, st.session_state.username, f"Added {name}")
-                            st.success(f"✅ Added {quantity} x {name} to inventory!")
-                            st.experimental_rerun()
-                        else:
-                            st.error(msg)
-                    except Exception as e:
-                        st.error(f"❌ Error: {str(e)}")
-        else:
-            st.warning("❌ You don't have permission to add inventory")
-    
-    with tab2:
-        st.subheader("📦 View & Filter Stock")
+                if trends.get('daily_revenue'):
+                    st.bar_chart(trends['daily_revenue'])
+            except Exception as e:
+                st.error(f"❌ Analytics error: {str(e)}")
         
-        # Search functionality
-        search_query = st.text_input("🔍 Search inventory (name/ID):")
+        with tab4:
+            try:
+                forecasts = view_cache.get(('forecast', cache_scope), stock_modules,
+                                           lambda: predict_low_stock(orders_view, inventory_view, days_ahead=7),
+                                           generation=data_gen)
+                if forecasts:
+                    st.warning(f"⚠️ {len(forecasts)} items predicted to go low in 7 days")
+                    st.dataframe(forecasts, use_container_width=True)
+                else:
+                    st.success("✅ All items have sufficient stock for next 7 days")
+            except Exception as e:
+                st.error(f"❌ Forecast error: {str(e)}")
         
-        # Filter by stock status
-        status_filter = st.selectbox("Filter by status:", ["All", "Low Stock", "Medium Stock", "High Stock"])
+        # Peak Hour Alert
+        admission = peak_manager.metrics(warehouse_id=active_warehouse)
+        if peak_manager.is_peak_hour(warehouse_id=active_warehouse):
+            peak_warning, msg = peak_manager.get_peak_hour_warning(warehouse_id=active_warehouse)
+            if peak_warning:
+                st.warning(msg)
+            else:
+                st.info(f"📊 Peak hours: {admission['hour_consumed']}/{admission['hour_capacity']} capacity used")
         
-        if search_query:
-            inventory_to_display = search_inventory(warehouse_data['inventory'], search_query)
-        else:
-            inventory_to_display = warehouse_data['inventory']
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("🚦 Hour Capacity", f"{admission['hour_consumed']}/{admission['hour_capacity']}",
+                    f"{admission['utilization_pct']}%")
+        col2.metric("✅ Admitted", admission['admitted'])
+        col3.metric("⏳ Queued", admission['queue_depth'], f"{admission['queued_units']} units")
+        col4.metric("❌ Rejected", admission['rejected'])
         
-        if status_filter != "All":
-            status_map = {
-                "Low Stock": "low",
-                "Medium Stock": "medium",
-                "High Stock": "high"
-            }
-            inventory_to_display = filter_inventory_by_stock_status(inventory_to_display, status_map[status_filter])
+        # Recent Activity
+        st.subheader("📋 Recent Activity")
+        if event_bus.alerts:
+            for alert in list(event_bus.alerts)[:5]:
+                st.warning(f"🔔 {alert['timestamp'][:16]} {alert['alert']}")
+        col1, col2 = st.columns(2)
         
-        if inventory_to_display:
-            # Prepare display data with status
-            display_items = []
-            total_value = 0
-            
-            for item in inventory_to_display:
-                status = "⚠️ LOW" if item['quantity'] < item['min_stock'] else "✅ OK"
-                value = item['quantity'] * item['price']
-                display_items.append({
-                    **item,
-                    'status': status,
-                    'total_value': value
-                })
-                total_value += value
-            
-            st.dataframe(display_items, use_container_width=True)
-            st.metric("💰 Total Inventory Value", f"₹{total_value:,.0f}")
-            
-            # Stock Level Chart
-            if len(display_items) > 1:
-                chart_data = {}
-                for item in display_items[:10]:
-                    chart_data[item['name'][:20]] = item['quantity']
-                
-                st.subheader("📊 Stock Levels")
-                st.bar_chart(chart_data)
-        else:
-            st.info("📦 No items found")
-    
-    with tab3:
-        if check_permission('update'):
-            if warehouse_data['inventory']:
-                selected_item = st.selectbox(
-                    "Select Item to Adjust:",
-                    [f"ID:{item['id']} - {item['name']}" for item in warehouse_data['inventory']]
-                )
-                
-                if selected_item:
-                    item = next(i for i in warehouse_data['inventory'] 
-                               if f"ID:{i['id']}" in selected_item)
+        with col1:
+            st.subheader("Latest Orders")
+            recent_orders = orders_view[-5:]
+            if recent_orders:
+                st.dataframe(recent_orders, use_container_width=True)
+        
+        with col2:
+            st.subheader("Inventory Status")
+            low_items = stock_ledger.low_stock_items(selected_warehouse)
+            if low_items:
+                st.error(f"⚠️ {len(low_items)} LOW STOCK ITEMS")
+                for item in low_items:
+                    st.warning(f"{item['name']}: {item['quantity']}/{item['min_stock']}")
+            else:
+                st.success("✅ All stock levels OK")
+
+    # =============================================================================
+    # EMPLOYEES MODULE
+    # =============================================================================
+    elif page == "👥 Employees":
+        tab1, tab2, tab3, tab4 = st.tabs(["➕ Hire Employee", "📋 Employee List", "👣 Attendance", "📥 Export"])
+        
+        with tab1:
+            if check_permission('create'):
+                st.subheader("Hire New Employee")
+                with st.form("add_employee", clear_on_submit=True):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        name = st.text_input("Full Name")
+                        position = st.selectbox("Position", ["Worker", "Supervisor", "Manager", "Engineer"])
+                    with col2:
+                        age = st.number_input("Age", 18, 65, 30)
+                        salary = st.number_input("Monthly Salary", 25000.0, 150000.0, 50000.0, step=1000.0)
                     
-                    with st.form("adjust_stock", clear_on_submit=True):
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            new_quantity = st.number_input(
-                                "New Quantity", 
-                                0, 10000, item['quantity'], step=5
-                            )
-                        with col2:
-                            new_price = st.number_input(
-                                "New Price", 
-                                0.1, 100000.0, item['price'], step=5.0
-                            )
-                        
-                        submitted = st.form_submit_button("💾 Update Stock", use_container_width=True)
-                        if submitted:
-                            try:
-                                item['quantity'] = int(new_quantity)
-                                item['price'] = float(new_price)
-                                item['updated_date'] = datetime.now().strftime("%Y-%m-%d")
+                    submitted = st.form_submit_button("✅ Hire Employee", use_container_width=True)
+                    if submitted:
+                        try:
+                            valid, msg = validate_employee_data(name, int(age), position, float(salary))
+                            if valid:
+                                emp_id = next_id('employees')
+                                employee = {
+                                    'id': emp_id,
+                                    'name': name,
+                                    'age': int(age),
+                                    'position': position,
+                                    'salary': float(salary),
+                                    'shift': 'Day',
+                                    'warehouse_id': active_warehouse,
+                                    'hire_date': datetime.now().strftime("%Y-%m-%d")
+                                }
+                                warehouse_data['employees'].append(employee)
                                 save_data(warehouse_data)
-                                audit_logger.log_action('UPDATE', 'inventory', item['id'], st.session_state.username, f"Updated {item['name']}")
-                                st.success(f"✅ {item['name']} updated successfully!")
+                                event_bus.publish('EmployeeHired', emp_id, st.session_state.username, f"Hired {name}")
+                                st.success(f"✅ {name} hired successfully! ID: {emp_id}")
                                 st.experimental_rerun()
-                            except Exception as e:
-                                st.error(f"❌ Error: {str(e)}")
+                            else:
+                                st.error(msg)
+                        except Exception as e:
+                            st.error(f"❌ Error: {str(e)}")
             else:
-                st.warning("📦 No inventory to adjust")
-        else:
-            st.warning("❌ You don't have permission to update inventory")
-    
-    with tab4:
-        st.subheader("📥 Export Inventory")
+                st.warning("❌ You don't have permission to hire employees")
         
-        if warehouse_data['inventory']:
-            if st.button("📥 Export to CSV"):
-                try:
-                    success, msg = export_to_csv(warehouse_data['inventory'], "inventory_export.csv")
-                    if success:
-                        st.success(msg)
-                        with open("inventory_export.csv", "rb") as f:
-                            st.download_button(
-                                label="⬇️ Download CSV",
-                                data=f.read(),
-                                file_name="inventory_export.csv",
-                                mime="text/csv"
-                            )
-                    else:
-                        st.error(msg)
-                except Exception as e:
-                    st.error(f"❌ Export failed: {str(e)}")
-        else:
-            st.info("No inventory to export")
-
-# =============================================================================
-# ORDERS MODULE
-# =============================================================================
-elif page == "🛒 Orders":
-    tab1, tab2, tab3 = st.tabs(["➕ New Order", "📋 Order List", "📥 Export"])
-    
-    with tab1:
-        if check_permission('create'):
-            st.subheader("Create New Order")
+        with tab2:
+            st.subheader("👥 Employee List")
             
-            # Peak hour warning
-            if peak_manager.is_peak_hour():
-                capacity = peak_manager.get_current_capacity()
-                total_ordered = sum(
-                    sum(item.get('quantity', 0) for item in o.get('items', [])) 
-                    for o in warehouse_data['orders']
-                )
-                peak_warning, msg = peak_manager.get_peak_hour_warning(warehouse_data['orders'])
-                if peak_warning:
-                    st.warning(msg)
+            # Search functionality
+            search_query = st.text_input("🔍 Search employees (name/position/ID):")
+            
+            if search_query:
+                employees_to_display = search_employees(warehouse_data['employees'], search_query)
+                if not employees_to_display:
+                    st.info("No employees found")
+            else:
+                employees_to_display = warehouse_data['employees']
             
-            with st.form("new_order", clear_on_submit=True):
-                customer = st.text_input("Customer Name")
+            if employees_to_display:
+                st.dataframe(employees_to_display, use_container_width=True)
                 
-                st.subheader("Select Items")
-                available_items = {i['id']: i for i in warehouse_data['inventory']}
-                selected_items = {}
+                # Payroll Summary (base salary + overtime from attendance)
+                payroll = attendance_analytics.payroll_summary(employees_to_display)
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("💰 Payroll (Filtered)", f"₹{payroll['total_payroll']:,.0f}")
+                with col2:
+                    st.metric("⏱️ Overtime Pay", f"₹{payroll['total_overtime_pay']:,.0f}",
+                              delta=f"{payroll['total_overtime_hours']:.1f} h")
+                with col3:
+                    st.metric("📅 Period", payroll['period'])
                 
-                for item_id, item in available_items.items():
-                    qty = st.number_input(
-                        f"{item['name']} (₹{item['price']}) - Stock: {item['quantity']}",
-                        0, min(10, item['quantity']), 0, key=f"qty_{item_id}"
-                    )
-                    if qty > 0:
-                        selected_items[item_id] = qty
+                with st.expander("📊 Hours & Overtime This Month"):
+                    st.dataframe(payroll['rows'], use_container_width=True)
+            else:
+                st.info("👥 No employees. Hire your first employee above!")
+        
+        with tab3:
+            st.subheader("👣 Employee Attendance")
+            
+            if warehouse_data['employees']:
+                col1, col2 = st.columns(2)
                 
-                submitted = st.form_submit_button("✅ Create Order", use_container_width=True)
+                with col1:
+                    selected_emp = st.selectbox(
+                        "Select Employee:",
+                        [f"ID:{e['id']} - {e['name']}" for e in warehouse_data['employees']]
+                    )
+                    emp_id = int(selected_emp.split(':')[1].split(' ')[0])
+                    
+                    if st.button("✅ Check In", use_container_width=True):
+                        success, msg = attendance_manager.check_in(emp_id)
+                        if success:
+                            st.success(msg)
+                            event_bus.publish('AttendanceRecorded', emp_id, st.session_state.username, 'Checked in')
+                        else:
+                            st.warning(msg)
                 
-                if submitted and customer and selected_items:
+                with col2:
+                    if st.button("🚪 Check Out", use_container_width=True):
+                        success, msg = attendance_manager.check_out(emp_id)
+                        if success:
+                            st.success(msg)
+                            event_bus.publish('AttendanceRecorded', emp_id, st.session_state.username, 'Checked out')
+                        else:
+                            st.warning(msg)
+
+                # Bulk badge-reader import (shift change)
+                if check_permission('update'):
+                    with st.expander("📥 Bulk Badge Import"):
+                        badge_file = st.file_uploader("Badge events (CSV: employee_id,event,timestamp or JSON lines)",
+                                                      type=["csv", "jsonl", "txt"], key="badge_upload")
+                        if badge_file and st.button("⚡ Import Badge Events"):
+                            try:
+                                events = parse_badge_events(badge_file.getvalue().decode('utf-8'))
+                                stats = attendance_manager.bulk_record(events)
+                                if 'error' in stats:
+                                    st.error(f"❌ Import failed: {stats['error']}")
+                                else:
+                                    st.success(f"✅ {stats['checked_in']} check-ins, {stats['checked_out']} check-outs "
+                                               f"({stats['duplicates']} duplicates, {stats['rejected']} rejected)")
+                                    for row, reason in stats['errors'][:20]:
+                                        st.warning(f"Row {row}: {reason}")
+                                    event_bus.publish('AttendanceRecorded', 0, st.session_state.username,
+                                                      f"Bulk badge import: {stats['written']} records")
+                            except Exception as e:
+                                st.error(f"❌ Import failed: {str(e)}")
+
+                # Attendance Report
+                st.subheader("📋 Attendance Record")
+                attendance_records = attendance_manager.get_attendance_report(emp_id)
+                if attendance_records:
+                    st.dataframe(attendance_records, use_container_width=True)
+                else:
+                    st.info("No attendance records yet")
+            else:
+                st.info("No employees to track")
+        
+        with tab4:
+            st.subheader("📥 Export Employees")
+            
+            if warehouse_data['employees']:
+                if st.button("📥 Export to CSV"):
                     try:
-                        order_id = len(warehouse_data['orders']) + 1
-                        total = 0
-                        
-                        # Calculate total and validate stock
-                        order_items = []
-                        all_valid = True
-                        
-                        for item_id, qty in selected_items.items():
-                            item = available_items[item_id]
-                            
-                            # Validate inventory movement
-                            result = validate_inventory_movement(warehouse_data['inventory'], item_id, qty, 'OUT')
-                            if not result['valid']:
-                                st.error(f"❌ {item['name']}: {result['error']}")
-                                all_valid = False
-                                break
-                            
-                            line_total = qty * item['price']
-                            total += line_total
-                            order_items.append({
-                                'item_id': item_id,
-                                'name': item['name'],
-                                'quantity': qty,
-                                'price': item['price'],
-                                'total': line_total
-                            })
-                            # Deduct from inventory
-                            item['quantity'] -= qty
-                        
-                        if all_valid:
-                            order = {
-                                'id': order_id,
-                                'customer': customer,
-                                'items': order_items,
-                                'total': total,
-                                'total_qty': sum(i['quantity'] for i in order_items),
-                                'status': 'Pending',
-                                'created_date': datetime.now().strftime("%Y-%m-%d")
-                            }
-                            
-                            warehouse_data['orders'].append(order)
-                            save_data(warehouse_data)
-                            audit_logger.log_action('CREATE', 'orders', order_id, st.session_state.username, f"Order from {customer}")
-                            st.success(f"✅ Order #{order_id} created for {customer} | ₹{total:,.0f}")
-                            st.experimental_rerun()
+                        success, msg = export_to_csv(warehouse_data['employees'], "employees_export.csv")
+                        if success:
+                            st.success(msg)
+                            with open("employees_export.csv", "rb") as f:
+                                st.download_button(
+                                    label="⬇️ Download CSV",
+                                    data=f.read(),
+                                    file_name="employees_export.csv",
+                                    mime="text/csv"
+                                )
+                        else:
+                            st.error(msg)
                     except Exception as e:
-                        st.error(f"❌ Error creating order: {str(e)}")
-                elif submitted:
-                    st.error("❌ Select items and enter customer name!")
-        else:
-            st.warning("❌ You don't have permission to create orders")
-    
-    with tab2:
-        st.subheader("📋 Order List")
-        
-        # Search functionality
-        search_query = st.text_input("🔍 Search orders (customer/ID):")
-        
-        if search_query:
-            orders_to_display = search_orders(warehouse_data['orders'], search_query)
-            if not orders_to_display:
-                st.info("No orders found")
-        else:
-            orders_to_display = warehouse_data['orders']
+                        st.error(f"❌ Export failed: {str(e)}")
+            else:
+                st.info("No employees to export")
+
+    # =============================================================================
+    # INVENTORY MODULE
+    # =============================================================================
+    elif page == "📦 Inventory":
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["➕ Add Stock", "📋 View Stock", "✏️ Adjust Stock", "📥 Export",
+                                                      "🔁 Transfers", "🧾 Purchase Orders"])
         
-        if orders_to_display:
-            total_revenue = sum(order.get('total', 0) for order in orders_to_display)
-            st.metric("💰 Total Revenue (Filtered)", f"₹{total_revenue:,.0f}")
-            
-            for order in reversed(orders_to_display[-10:]):  # Last 10 orders
-                with st.expander(f"Order #{order['id']} - {order['customer']} (₹{order['total']:,.0f})"):
-                    st.write(f"**Status:** {order['status']}")
-                    st.write(f"**Date:** {order.get('created_date', 'N/A')}")
-                    st.write("**Items:**")
-                    for item in order['items']:
-                        st.write(f"• {item['name']} x{item['quantity']} @ ₹{item['price']}")
-                    
+        with tab1:
+            if check_permission('create'):
+                st.subheader("Add New Inventory Item")
+                with st.form("add_inventory", clear_on_submit=True):
                     col1, col2 = st.columns(2)
                     with col1:
-                        if check_permission('update') and st.button(f"✅ Mark Fulfilled", key=f"fulfill_{order['id']}"):
-                            try:
-                                order['status'] = 'Fulfilled'
-                                save_data(warehouse_data)
-                                audit_logger.log_action('UPDATE', 'orders', order['id'], st.session_state.username, 'Marked fulfilled')
-                                st.success("✅ Order marked fulfilled!")
-                                st.experimental_rerun()
-                            except Exception as e:
-                                st.error(f"❌ Error: {str(e)}")
-                    
+                        name = st.text_input("Item Name")
+                        quantity = st.number_input("Quantity", 0, 10000, 100, step=10)
                     with col2:
-                        if check_permission('delete') and st.button(f"🗑️ Delete Order", key=f"delete_{order['id']}"):
-                            try:
-                                warehouse_data['orders'].remove(order)
+                        price = st.number_input("Price per Unit", 0.1, 100000.0, 100.0, step=10.0)
+                        min_stock = st.number_input("Minimum Stock Level", 0, 1000, 10)
+                    bin_code = st.text_input("Bin Location (optional, e.g. B-07-2)")
+                    
+                    submitted = st.form_submit_button("➕ Add Item", use_container_width=True)
+                    if submitted:
+                        try:
+                            valid, msg = validate_inventory_item(name, int(quantity), float(price), int(min_stock))
+                            if valid:
+                                item_id = next_id('inventory')
+                                item = {
+                                    'id': item_id,
+                                    'name': name,
+                                    'quantity': int(quantity),
+                                    'price': float(price),
+                                    'min_stock': int(min_stock),
+                                    'added_date': datetime.now().strftime("%Y-%m-%d")
+                                }
+                                warehouse_data['inventory'].append(item)
+                                stock_ledger.add_item(item, active_warehouse)
+                                if bin_code:
+                                    stock_ledger.set_bin(active_warehouse, item_id, bin_code)
                                 save_data(warehouse_data)
-                                audit_logger.log_action('DELETE', 'orders', order['id'], st.session_state.username, 'Deleted')
-                                st.success("✅ Order deleted!")
+                                event_bus.publish('InventoryItemAdded', item_id, st.session_state.username, f"Added {name}")
+                                st.success(f"✅ Added {quantity} x {name} to inventory!")
                                 st.experimental_rerun()
-                            except Exception as e:
-                                st.error(f"❌ Error: {str(e)}")
-        else:
-            st.info("🛒 No orders yet.")
-    
-    with tab3:
-        st.subheader("📥 Export Orders")
-        
-        if warehouse_data['orders']:
-            if st.button("📥 Export to CSV"):
-                try:
-                    success, msg = export_to_csv(warehouse_data['orders'], "orders_export.csv")
-                    if success:
-                        st.success(msg)
-                        with open("orders_export.csv", "rb") as f:
-                            st.download_button(
-                                label="⬇️ Download CSV",
-                                data=f.read(),
-                                file_name="orders_export.csv",
-                                mime="text/csv"
-                            )
-                    else:
-                        st.error(msg)
-                except Exception as e:
-                    st.error(f"❌ Export failed: {str(e)}")
-        else:
-            st.info("No orders to export")
-
-# =============================================================================
-# SHIPMENTS & REPORTS (Simplified)
-# =============================================================================
-elif page == "🚚 Shipments":
-    st.header("🚚 Shipment Tracking")
-    st.info("👈 Create orders first, then mark as fulfilled")
-
-elif page == "📈 Reports":
-    st.header("📈 Business Reports")
-    
-    # Simple metrics
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        avg_order = sum(o.get('total', 0) for o in warehouse_data['orders']) / max(len(warehouse_data['orders']), 1)
-        st.metric("📊 Avg Order Value", f"₹{avg_order:,.0f}")
-    
-    with col2:
-        active_items = len([i for i in warehouse_data['inventory'] if i['quantity'] > 0])
-        st.metric("📦 Active SKUs", active_items)
-    
-    with col3:
-        st.metric("👥 Team Size", len(warehouse_data['employees']))
-    
-    # Top selling items
-    st.subheader("🏆 Top Selling Items")
-    stock_outs = get_stock_out_frequency(warehouse_data['orders'], warehouse_data['inventory'])
-    if stock_outs:
-        st.dataframe(stock_outs, use_container_width=True)
-
-# =============================================================================
-# ADMIN PANEL
-# =============================================================================
-elif page == "🔐 Admin Panel":
-    if st.session_state.user_role == 'admin':
-        st.title("🔐 Admin Control Panel")
-        
-        admin_tab1, admin_tab2, admin_tab3, admin_tab4 = st.tabs(["🏢 Warehouses", "👥 Users", "⚙️ System", "📊 Analytics"])
+                            else:
+                                st.error(msg)
+                        except Exception as e:
+                            st.error(f"❌ Error: {str(e)}")
+            else:
+                st.warning("❌ You don't have permission to add inventory")
         
-        with admin_tab1:
-            st.subheader("🏢 Warehouse Locations")
+        with tab2:
+            st.subheader("📦 View & Filter Stock")
             
-            warehouses = warehouse_manager.get_all_warehouses()
-            if warehouses:
-                st.dataframe(warehouses, use_container_width=True)
+            # Search functionality
+            search_query = st.text_input("🔍 Search inventory (name/ID):")
             
-            st.subheader("➕ Add New Warehouse")
-            with st.form("add_warehouse"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    name = st.text_input("Warehouse Name")
-                    location = st.text_input("Location/City")
-                with col2:
-                    address = st.text_input("Address")
-                    phone = st.text_input("Phone")
+            # Filter by stock status
+            status_filter = st.selectbox("Filter by status:", ["All", "Low Stock", "Medium Stock", "High Stock"])
+            
+            if search_query:
+                inventory_to_display = search_inventory(inventory_view, search_query)
+            else:
+                inventory_to_display = inventory_view
+            
+            if status_filter != "All":
+                status_map = {
+                    "Low Stock": "low",
+                    "Medium Stock": "medium",
+                    "High Stock": "high"
+                }
+                inventory_to_display = filter_inventory_by_stock_status(inventory_to_display, status_map[status_filter],
+                                                                        stock_ledger.low_stock_ids(selected_warehouse))
+            
+            if inventory_to_display:
+                # Prepare display data with status
+                low_ids = stock_ledger.low_stock_ids(selected_warehouse)
+                display_items = []
+                total_value = 0
                 
-                capacity = st.number_input("Capacity (units)", 1000, 100000, 5000)
-                submitted = st.form_submit_button("Add Warehouse")
+                for item in inventory_to_display:
+                    status = "⚠️ LOW" if item['id'] in low_ids else "✅ OK"
+                    value = item['quantity'] * item['price']
+                    display_items.append({
+                        **item,
+                        'status': status,
+                        'total_value': value
+                    })
+                    total_value += value
                 
-                if submitted and name and location:
-                    success, msg = warehouse_manager.add_warehouse(name, location, address, phone, capacity)
-                    if success:
-                        st.success(msg)
-                        st.experimental_rerun()
-                    else:
-                        st.error(msg)
+                st.dataframe(display_items, use_container_width=True)
+                st.metric("💰 Total Inventory Value", f"₹{total_value:,.0f}")
+                
+                # Stock Level Chart
+                if len(display_items) > 1:
+                    chart_data = {}
+                    for item in display_items[:10]:
+                        chart_data[item['name'][:20]] = item['quantity']
+                    
+                    st.subheader("📊 Stock Levels")
+                    st.bar_chart(chart_data)
+            else:
+                st.info("📦 No items found")
         
-        with admin_tab2:
-            st.subheader("👥 User Management")
-            
-            user_subtab1, user_subtab2, user_subtab3 = st.tabs(["📋 All Users", "➕ Add User", "🔐 Manage Users"])
+        with tab3:
+            if check_permission('update'):
+                if warehouse_data['inventory']:
+                    selected_item = st.selectbox(
+                        "Select Item to Adjust:",
+                        [f"ID:{item['id']} - {item['name']}" for item in warehouse_data['inventory']]
+                    )
+                    
+                    if selected_item:
+                        item = next(i for i in warehouse_data['inventory'] 
+                                   if f"ID:{i['id']}" in selected_item)
+                        site_qty = stock_ledger.quantity(active_warehouse, item['id'])
+                        st.caption(f"🏢 Adjusting stock at warehouse ID:{active_warehouse}")
+                        
+                        with st.form("adjust_stock", clear_on_submit=True):
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                new_quantity = st.number_input(
+                                    "New Quantity", 
+                                    0, 10000, site_qty, step=5
+                                )
+                            with col2:
+                                new_price = st.number_input(
+                                    "New Price", 
+                                    0.1, 100000.0, item['price'], step=5.0
+                                )
+                            new_bin = st.text_input(
+                                "Bin Location (AISLE-BAY-LEVEL)",
+                                stock_ledger.bin_of(active_warehouse, item['id']) or ''
+                            )
+                            
+                            submitted = st.form_submit_button("💾 Update Stock", use_container_width=True)
+                            if submitted:
+                                try:
+                                    success, msg = stock_ledger.set_bin(active_warehouse, item['id'], new_bin)
+                                    if success:
+                                        # Refused when it would drop on-hand below reserved stock
+                                        success, msg = stock_ledger.set_quantity(active_warehouse, item['id'], int(new_quantity))
+                                    if success:
+                                        item['price'] = float(new_price)
+                                        item['updated_date'] = datetime.now().strftime("%Y-%m-%d")
+                                        save_data(warehouse_data)
+                                        event_bus.publish('StockAdjusted', item['id'], st.session_state.username, f"Updated {item['name']}",
+                                                          warehouse_id=active_warehouse, quantity=int(new_quantity))
+                                        st.success(f"✅ {item['name']} updated successfully!")
+                                        st.experimental_rerun()
+                                    else:
+                                        st.error(msg)
+                                except Exception as e:
+                                    st.error(f"❌ Error: {str(e)}")
+                else:
+                    st.warning("📦 No inventory to adjust")
+            else:
+                st.warning("❌ You don't have permission to update inventory")
+        
+        with tab4:
+            st.subheader("📥 Export Inventory")
             
-            with user_subtab1:
-                st.write("**All User Accounts:**")
-                try:
-                    all_users = auth_manager.get_all_users()
-                    if all_users:
-                        st.dataframe(all_users, use_container_width=True)
-                        st.caption(f"Total users: {len(all_users)}")
-                    else:
-                        st.info("No users found")
-                except Exception as e:
-                    st.error(f"Error loading users: {str(e)}")
+            if warehouse_data['inventory']:
+                if st.button("📥 Export to CSV"):
+                    try:
+                        success, msg = export_to_csv(warehouse_data['inventory'], "inventory_export.csv")
+                        if success:
+                            st.success(msg)
+                            with open("inventory_export.csv", "rb") as f:
+                                st.download_button(
+                                    label="⬇️ Download CSV",
+                                    data=f.read(),
+                                    file_name="inventory_export.csv",
+                                    mime="text/csv"
+                                )
+                        else:
+                            st.error(msg)
+                    except Exception as e:
+                        st.error(f"❌ Export failed: {str(e)}")
+            else:
+                st.info("No inventory to export")
+        
+        with tab5:
+            st.subheader("🔁 Inter-Warehouse Transfers")
             
-            with user_subtab2:
-                st.write("**Create New User Account:**")
-                with st.form("admin_add_user"):
+            if not check_permission('update'):
+                st.warning("❌ You don't have permission to transfer stock")
+            elif len(warehouses) < 2:
+                st.info("🏢 Add a second warehouse in the Admin Panel to transfer stock")
+            elif shard_store.enabled() and selected_warehouse:
+                st.info("🧩 Select 'All Warehouses' to manage transfers between shards")
+            elif warehouse_data['inventory']:
+                site_labels = {f"ID:{w['id']} - {w['name']}": w['id'] for w in warehouses}
+                with st.form("new_transfer", clear_on_submit=True):
                     col1, col2 = st.columns(2)
                     with col1:
-                        add_username = st.text_input("Username", key="admin_username")
-                        add_password = st.text_input("Password", type="password", key="admin_password")
-                    with col2:
-                        add_fullname = st.text_input("Full Name", key="admin_fullname")
-                        add_role = st.selectbox(
-                            "Role",
-                            ["worker", "manager", "admin"],
-                            key="admin_role"
+                        transfer_item = st.selectbox(
+                            "Item", [f"ID:{i['id']} - {i['name']}" for i in warehouse_data['inventory']]
                         )
+                        transfer_qty = st.number_input("Quantity", 1, 100000, 10)
+                    with col2:
+                        from_site = st.selectbox("From", list(site_labels), key="transfer_from")
+                        to_site = st.selectbox("To", list(site_labels), index=1, key="transfer_to")
                     
-                    submit_add = st.form_submit_button("➕ Add User", use_container_width=True)
-                    
-                    if submit_add:
-                        try:
-                            if not add_username or len(add_username) < 3:
-                                st.error("❌ Username must be at least 3 characters")
-                            elif not add_password or len(add_password) < 6:
-                                st.error("❌ Password must be at least 6 characters")
-                            elif not add_fullname:
-                                st.error("❌ Full name is required")
-                            else:
-                                success, msg = auth_manager.register_user(
-                                    add_username,
-                                    add_password,
-                                    add_role,
-                                    add_fullname
-                                )
+                    if st.form_submit_button("📦 Reserve Transfer", use_container_width=True):
+                        item_id = int(transfer_item.split(':')[1].split(' ')[0])
+                        success, msg = transfer_manager.create_transfer(
+                            item_id, site_labels[from_site], site_labels[to_site], int(transfer_qty)
+                        )
+                        if success:
+                            save_data(warehouse_data)
+                            event_bus.publish('TransferCreated', item_id, st.session_state.username, msg)
+                            st.success(msg)
+                            st.experimental_rerun()
+                        else:
+                            st.error(msg)
+                
+                st.subheader("🚛 Open Transfers")
+                open_transfers = transfer_manager.open_transfers()
+                if open_transfers:
+                    for transfer in open_transfers:
+                        col1, col2, col3 = st.columns([6, 2, 2])
+                        with col1:
+                            st.write(f"#{transfer['id']} item {transfer['item_id']} x{transfer['quantity']}: "
+                                     f"site {transfer['from_warehouse']} → {transfer['to_warehouse']} ({transfer['status']})")
+                        with col2:
+                            label = "🚚 Dispatch" if transfer['status'] == 'Reserved' else "📥 Receive"
+                            if st.button(label, key=f"transfer_step_{transfer['id']}"):
+                                action = transfer_manager.dispatch if transfer['status'] == 'Reserved' else transfer_manager.receive
+                                success, msg = action(transfer['id'])
                                 if success:
-                                    st.success(msg)
-                                    audit_logger.log_action(
-                                        'CREATE',
-                                        'users',
-                                        1,
-                                        st.session_state.username,
-                                        f'New user created: {add_username} ({add_role})'
-                                    )
+                                    save_data(warehouse_data)
+                                    event_bus.publish('TransferUpdated', transfer['id'], st.session_state.username, msg)
                                     st.experimental_rerun()
                                 else:
                                     st.error(msg)
-                        except Exception as e:
-                            st.error(f"❌ Error: {str(e)}")
+                        with col3:
+                            if st.button("✖️ Cancel", key=f"transfer_cancel_{transfer['id']}"):
+                                success, msg = transfer_manager.cancel(transfer['id'])
+                                if success:
+                                    save_data(warehouse_data)
+                                    event_bus.publish('TransferUpdated', transfer['id'], st.session_state.username, msg)
+                                    st.experimental_rerun()
+                                else:
+                                    st.error(msg)
+                else:
+                    st.info("No open transfers")
+                
+                st.subheader("⚖️ Rebalancing Proposals")
+                proposals = transfer_manager.propose_rebalancing(all_orders, warehouse_data['inventory'])
+                if proposals:
+                    st.dataframe(proposals[:200], use_container_width=True)
+                    if st.button(f"✅ Reserve All {len(proposals)} Moves"):
+                        result = transfer_manager.apply_proposals(proposals)
+                        save_data(warehouse_data)
+                        event_bus.publish('TransferCreated', 0, st.session_state.username,
+                                          f"Rebalancing: {result['created']} transfers reserved")
+                        st.success(f"✅ {result['created']} transfers reserved")
+                        st.experimental_rerun()
+                else:
+                    st.success("✅ Stock is balanced across sites for the next 7 days")
+            else:
+                st.info("📦 No inventory to transfer")
+        
+        with tab6:
+            st.subheader("🧾 Replenishment")
+            st.caption("Draft POs from 30-day demand, lead time and EOQ; also runs nightly via replenish.py")
+            replenishment = ReplenishmentEngine(warehouse_data, stock_ledger,
+                                                allocate_id=shard_store.allocate_id if shard_store.enabled() else None)
             
-            with user_subtab3:
-                st.write("**Delete User or Manage Access:**")
-                try:
-                    all_users = auth_manager.get_all_users()
-                    if all_users and len(all_users) > 1:
-                        user_to_manage = st.selectbox(
-                            "Select user to manage:",
-                            [u['username'] for u in all_users if u['username'] != st.session_state.username],
-                            key="manage_user_select"
-                        )
-                        
+            if check_permission('create') and st.button("🔄 Run Replenishment Now"):
+                result = replenishment.run()
+                if 'error' in result:
+                    st.error(f"❌ Replenishment failed: {result['error']}")
+                else:
+                    save_data(warehouse_data)
+                    event_bus.publish('PurchaseOrdersDrafted', 0, st.session_state.username,
+                                      f"{result['lines']} lines: {result['pos_created']} new POs, "
+                                      f"{result['pos_updated']} drafts updated")
+                    st.success(f"✅ {result['skus_evaluated']} SKUs checked in {result['elapsed']}s: "
+                               f"{result['lines']} lines, {result['pos_created']} new POs, {result['pos_updated']} drafts updated")
+            
+            open_pos = replenishment.open_orders(selected_warehouse)
+            if open_pos:
+                st.metric("📬 Open POs", len(open_pos), f"₹{sum(po['total'] for po in open_pos):,.0f}")
+                for po in open_pos[:50]:
+                    with st.expander(f"PO #{po['id']} | {po['supplier']} | Site {po['warehouse_id']} | "
+                                     f"{len(po['lines'])} lines | ₹{po['total']:,.0f} | {po['status']}"):
+                        st.dataframe(po['lines'], use_container_width=True)
                         col1, col2 = st.columns(2)
                         with col1:
-                            if st.button("🗑️ Delete User", key="delete_user_btn"):
-                                success, msg = auth_manager.delete_user(user_to_manage)
+                            action = 'submit' if po['status'] == 'Draft' else 'receive'
+                            label = "📤 Submit to Supplier" if action == 'submit' else "📥 Receive Goods"
+                            if check_permission('update') and st.button(label, key=f"po_{action}_{po['id']}"):
+                                success, msg = getattr(replenishment, action)(po['id'])
                                 if success:
+                                    save_data(warehouse_data)
+                                    event_bus.publish('PurchaseOrderUpdated', po['id'], st.session_state.username, msg)
                                     st.success(msg)
-                                    audit_logger.log_action(
-                                        'DELETE',
-                                        'users',
-                                        1,
-                                        st.session_state.username,
-                                        f'User deleted: {user_to_manage}'
-                                    )
                                     st.experimental_rerun()
                                 else:
                                     st.error(msg)
-                        
                         with col2:
-                            st.caption("⚠️ This will permanently delete the user account")
-                    else:
-                        st.info("Cannot manage users (need at least 2 users and cannot delete yourself)")
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+                            if check_permission('delete') and st.button("✖️ Cancel PO", key=f"po_cancel_{po['id']}"):
+                                success, msg = replenishment.cancel(po['id'])
+                                if success:
+                                    save_data(warehouse_data)
+                                    event_bus.publish('PurchaseOrderUpdated', po['id'], st.session_state.username, msg)
+                                    st.experimental_rerun()
+                                else:
+                                    st.error(msg)
+            else:
+                st.info("📭 No open purchase orders")
+
+    # =============================================================================
+    # ORDERS MODULE
+    # =============================================================================
+    elif page == "🛒 Orders":
+        tab1, tab2, tab3, tab4 = st.tabs(["➕ New Order", "📋 Order List", "📥 Export", "🌊 Pick Waves"])
         
-        with admin_tab3:
-            st.subheader("⚙️ System Settings")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.subheader("📧 Email Configuration")
-                try:
-                    email_cfg = email_config.get_config()
+        with tab1:
+            if check_permission('create'):
+                st.subheader("Create New Order")
+                
+                # Peak hour warning
+                if peak_manager.is_peak_hour(warehouse_id=active_warehouse):
+                    peak_warning, msg = peak_manager.get_peak_hour_warning(warehouse_id=active_warehouse)
+                    if peak_warning:
+                        st.warning(msg)
+                st.caption(f"🚦 {peak_manager.tokens(warehouse_id=active_warehouse)} units of capacity left this hour")
+                
+                with st.form("new_order", clear_on_submit=True):
+                    customer = st.text_input("Customer Name")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        destination = st.text_input("Destination City")
+                    with col2:
+                        carrier = st.selectbox("Carrier", list(ShipmentManager.CARRIERS))
                     
-                    enabled = st.checkbox("Enable Email Alerts", value=email_cfg.get('enabled', False))
-                    smtp_server = st.text_input("SMTP Server", value=email_cfg.get('smtp_server', ''))
-                    smtp_port = st.number_input("SMTP Port", value=email_cfg.get('smtp_port', 587))
-                    sender_email = st.text_input("Sender Email", value=email_cfg.get('sender_email', ''))
-                    sender_password = st.text_input("Sender Password", type="password", value=email_cfg.get('sender_password', ''))
+                    st.subheader("Select Items")
+                    site_inventory = stock_ledger.items_at(active_warehouse, available=True)
+                    available_items = {i['id']: i for i in site_inventory}
+                    selected_items = {}
                     
-                    if st.button("💾 Save Email Config"):
-                        new_config = {
-                            'smtp_server': smtp_server,
-                            'smtp_port': smtp_port,
-                            'sender_email': sender_email,
-                            'sender_password': sender_password,
-                            'enabled': enabled,
-                            'alerts': email_cfg.get('alerts', {})
-                        }
-                        if email_config.update_config(new_config):
-                            st.success("✅ Email config saved")
-                        else:
-                            st.error("❌ Failed to save config")
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
-            
-            with col2:
-                st.subheader("💾 Data Management")
-                
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    if st.button("🔄 Create Backup Now"):
+                    for item_id, item in available_items.items():
+                        qty = st.number_input(
+                            f"{item['name']} (₹{item['price']}) - Stock: {item['quantity']}",
+                            0, min(10, item['quantity']), 0, key=f"qty_{item_id}"
+                        )
+                        if qty > 0:
+                            selected_items[item_id] = qty
+                    
+                    submitted = st.form_submit_button("✅ Create Order", use_container_width=True)
+                    
+                    if submitted and customer and selected_items:
                         try:
-                            backup_file = backup_manager.create_backup(warehouse_data)
-                            st.success(f"✅ Backup created: {backup_file}")
+                            order_id = next_id('orders')
+                            total = 0
+                            
+                            # Calculate total and validate stock
+                            order_items = []
+                            all_valid = True
+                            
+                            for item_id, qty in selected_items.items():
+                                item = available_items[item_id]
+                                
+                                # Validate inventory movement
+                                result = validate_inventory_movement(site_inventory, item_id, qty, 'OUT')
+                                if not result['valid']:
+                                    st.error(f"❌ {item['name']}: {result['error']}")
+                                    all_valid = False
+                                    break
+                                
+                                line_total = qty * item['price']
+                                total += line_total
+                                order_items.append({
+                                    'item_id': item_id,
+                                    'name': item['name'],
+                                    'quantity': qty,
+                                    'price': item['price'],
+                                    'total': line_total
+                                })
+                            
+                            if all_valid:
+                                # Admission control: over-capacity orders are queued, not reserved
+                                units = sum(line['quantity'] for line in order_items)
+                                decision, admission_msg = peak_manager.admit(order_id, units, warehouse_id=active_warehouse)
+                                if decision == 'Rejected':
+                                    st.error(admission_msg)
+                                else:
+                                    # Reserve stock at the fulfilling warehouse (all lines or none)
+                                    success, msg, order = order_book.create_order(
+                                        order_id, customer, order_items, active_warehouse,
+                                        reserve=(decision == 'Admitted')
+                                    )
+                                    if success:
+                                        order['admission'] = decision
+                                        order['destination'] = destination.strip().title()
+                                        order['carrier'] = carrier
+                                        if decision == 'Admitted':
+                                            order['admitted_hour'] = peak_manager.slot()
+                                        else:
+                                            order['deferred_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                                        stock_ledger.record_order(order)
+                                        save_data(warehouse_data)
+                                        event_bus.publish('OrderCreated', order_id, st.session_state.username, f"Order from {customer} ({decision.lower()})",
+                                                          alert=f"Order #{order_id} queued: {admission_msg}" if decision == 'Deferred' else None,
+                                                          alert_kind='peak_hours')
+                                        st.success(f"✅ Order #{order_id} created for {customer} | ₹{total:,.0f}")
+                                        if decision == 'Deferred':
+                                            st.info(admission_msg)
+                                        st.experimental_rerun()
+                                    else:
+                                        peak_manager.forget(order_id, units if decision == 'Admitted' else 0,
+                                                            warehouse_id=active_warehouse)
+                                        st.error(msg)
                         except Exception as e:
-                            st.error(f"❌ Backup failed: {str(e)}")
+                            st.error(f"❌ Error creating order: {str(e)}")
+                    elif submitted:
+                        st.error("❌ Select items and enter customer name!")
+            else:
+                st.warning("❌ You don't have permission to create orders")
+        
+        with tab2:
+            st.subheader("📋 Order List")
+            
+            # Search functionality
+            search_query = st.text_input("🔍 Search orders (customer/ID):")
+            
+            if search_query:
+                orders_to_display = search_orders(orders_view, search_query)
+                if not orders_to_display:
+                    st.info("No orders found")
+            else:
+                orders_to_display = orders_view
+            
+            if orders_to_display:
+                total_revenue = sum(order.get('total', 0) for order in orders_to_display)
+                st.metric("💰 Total Revenue (Filtered)", f"₹{total_revenue:,.0f}")
                 
-                with col_b:
-                    if st.button("🗑️ Clear All Data"):
-                        if st.checkbox("I understand this will delete all data"):
-                            warehouse_data['employees'] = []
-                            warehouse_data['inventory'] = []
-                            warehouse_data['orders'] = []
-                            warehouse_data['shipments'] = []
-                            save_data(warehouse_data)
-                            st.success("✅ All data cleared")
-                            st.experimental_rerun()
+                for order in reversed(orders_to_display[-10:]):  # Last 10 orders
+                    with st.expander(f"Order #{order['id']} - {order['customer']} (₹{order['total']:,.0f})"):
+                        st.write(f"**Status:** {order['status']}")
+                        st.write(f"**Date:** {order.get('created_date', 'N/A')}")
+                        st.write("**Items:**")
+                        for item in order['items']:
+                            st.write(f"• {item['name']} x{item['quantity']} @ ₹{item['price']} ({item.get('status', '')})")
+                        
+                        col1, col2, col3 = st.columns(3)
+                        next_state = order_book.next_state(order)
+                        with col1:
+                            if next_state and check_permission('update') and st.button(f"➡️ Mark {next_state}", key=f"advance_{order['id']}"):
+                                try:
+                                    success, msg = order_book.advance_order(order['id'], next_state)
+                                    if success:
+                                        save_data(warehouse_data)
+                                        event_bus.publish('OrderUpdated', order['id'], st.session_state.username, f'Marked {next_state.lower()}')
+                                        st.success(msg)
+                                        st.experimental_rerun()
+                                    else:
+                                        st.error(msg)
+                                except Exception as e:
+                                    st.error(f"❌ Error: {str(e)}")
+                        
+                        with col2:
+                            if next_state and check_permission('update') and st.button("✖️ Cancel Order", key=f"cancel_{order['id']}"):
+                                try:
+                                    success, msg = order_book.advance_order(order['id'], 'Cancelled')
+                                    if success:
+                                        peak_manager.forget(order['id'], order.get('total_qty', 0) if order.get('admission') == 'Admitted' else 0,
+                                                            order.get('admitted_hour'), order.get('warehouse_id'))
+                                        save_data(warehouse_data)
+                                        event_bus.publish('OrderUpdated', order['id'], st.session_state.username, 'Cancelled, stock returned')
+                                        st.success(msg)
+                                        st.experimental_rerun()
+                                    else:
+                                        st.error(msg)
+                                except Exception as e:
+                                    st.error(f"❌ Error: {str(e)}")
+                        
+                        with col3:
+                            if check_permission('delete') and st.button(f"🗑️ Delete Order", key=f"delete_{order['id']}"):
+                                try:
+                                    peak_manager.forget(order['id'], order.get('total_qty', 0) if order.get('admission') == 'Admitted' else 0,
+                                                        order.get('admitted_hour'), order.get('warehouse_id'))
+                                    order_book.delete_order(order['id'])
+                                    save_data(warehouse_data)
+                                    event_bus.publish('OrderDeleted', order['id'], st.session_state.username, 'Deleted')
+                                    st.success("✅ Order deleted!")
+                                    st.experimental_rerun()
+                                except Exception as e:
+                                    st.error(f"❌ Error: {str(e)}")
+            else:
+                st.info("🛒 No orders yet.")
         
-        with admin_tab4:
-            st.subheader("📊 System Analytics")
+        with tab3:
+            st.subheader("📥 Export Orders")
+            
+            if warehouse_data['orders']:
+                if st.button("📥 Export to CSV"):
+                    try:
+                        success, msg = export_to_csv(all_orders, "orders_export.csv")
+                        if success:
+                            st.success(msg)
+                            with open("orders_export.csv", "rb") as f:
+                                st.download_button(
+                                    label="⬇️ Download CSV",
+                                    data=f.read(),
+                                    file_name="orders_export.csv",
+                                    mime="text/csv"
+                                )
+                        else:
+                            st.error(msg)
+                    except Exception as e:
+                        st.error(f"❌ Export failed: {str(e)}")
+            else:
+                st.info("No orders to export")
+        
+        with tab4:
+            st.subheader("🌊 Pick Wave Planning")
+            st.caption("Reserved orders are batched by shared SKUs so pickers walk each aisle once per wave")
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Total Employees", len(warehouse_data['employees']))
+                max_orders = st.number_input("Max orders per wave", 1, 500, 25)
             with col2:
-                st.metric("Total Inventory Items", len(warehouse_data['inventory']))
+                max_units = st.number_input("Max units per wave", 1, 100000, 500)
             with col3:
-                st.metric("Total Orders", len(warehouse_data['orders']))
+                max_skus = st.number_input("Max SKUs per wave", 1, 1000, 40)
             
-            # Audit trail summary
-            st.subheader("📋 Recent Audit Trail")
-            recent_logs = audit_logger.get_audit_trail()[:20]
-            if recent_logs:
-                st.dataframe(recent_logs, use_container_width=True)
+            wave_planner = WavePlanner(order_book, max_orders, max_units, max_skus,
+                                       router=PickPathOptimizer(stock_ledger))
+            waves = wave_planner.plan(selected_warehouse)
+            
+            if waves:
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("🌊 Waves", len(waves))
+                col2.metric("🛒 Orders", sum(len(w['order_ids']) for w in waves))
+                col3.metric("📦 Units", sum(w['units'] for w in waves))
+                walked = sum(w['distance'] for w in waves)
+                unrouted = sum(w['unrouted_distance'] for w in waves)
+                col4.metric("🚶 Walking (m)", f"{walked:,.0f}",
+                            f"-{(1 - walked / unrouted) * 100:.0f}% vs. list order" if unrouted else None,
+                            delta_color="inverse")
+                
+                for wave in waves[:20]:
+                    with st.expander(f"Wave {wave['wave_id']} | Site {wave['warehouse_id']} | "
+                                     f"{len(wave['order_ids'])} orders | {wave['skus']} SKUs | {wave['units']} units"):
+                        st.write(f"**Orders:** {', '.join(f'#{oid}' for oid in wave['order_ids'])}")
+                        st.caption(f"🚶 Route: {wave['distance']:,.0f} m (unrouted {wave['unrouted_distance']:,.0f} m); "
+                                   f"items without a bin are picked last")
+                        st.dataframe(wave['pick_list'], use_container_width=True)
+                        
+                        if check_permission('update') and st.button("✅ Mark Wave Picked", key=f"wave_{wave['wave_id']}"):
+                            success, msg = wave_planner.release(wave)
+                            if success:
+                                save_data(warehouse_data)
+                                event_bus.publish('OrderUpdated', wave['wave_id'], st.session_state.username,
+                                                  f"Wave picked: orders {wave['order_ids']}")
+                                st.success(msg)
+                                st.experimental_rerun()
+                            else:
+                                st.error(msg)
             else:
-                st.info("No audit logs yet")
-    else:
-        st.error("❌ Admin access required")
+                st.info("📭 No reserved orders waiting to be picked")
 
-# =============================================================================
-# SETTINGS PAGE
-# =============================================================================
-elif page == "⚙️ Settings":
-    st.title("⚙️ User Settings")
-    
-    settings_tab1, settings_tab2, settings_tab3 = st.tabs(["👤 Profile", "🔐 Change Password", "ℹ️ Help"])
-    
-    with settings_tab1:
-        st.subheader(f"👤 Your Profile")
-        col1, col2 = st.columns(2)
-        with col1:
-            st.write(f"**Username:** {st.session_state.username}")
-        with col2:
-            st.write(f"**Role:** {st.session_state.user_role.upper()}")
+    # =============================================================================
+    # SHIPMENTS & REPORTS (Simplified)
+    # =============================================================================
+    elif page == "🚚 Shipments":
+        st.header("🚚 Shipment Tracking")
         
-        st.markdown("---")
-        st.subheader("🔑 Permissions")
+        counts = shipment_manager.summary(selected_warehouse)
+        cols = st.columns(len(counts))
+        for col, (status, count) in zip(cols, counts.items()):
+            col.metric(status, count)
         
-        role = st.session_state.user_role
-        permissions = {
-            'admin': ['Create', 'Read', 'Update', 'Delete', 'View Reports', 'Admin Panel'],
-            'manager': ['Create', 'Read', 'Update', 'View Reports'],
-            'worker': ['Read (View-only)']
-        }
+        ship_tab1, ship_tab2, ship_tab3 = st.tabs(["📦 Consolidate", "🧾 Manifests", "🔎 Track & Update"])
         
-        st.write(f"**Your {role.upper()} can:**")
-        for perm in permissions.get(role, []):
-            st.write(f"✅ {perm}")
+        with ship_tab1:
+            st.subheader("📦 Consolidate Fulfilled Orders")
+            unshipped = shipment_manager.unshipped(orders_view)
+            if unshipped:
+                st.info(f"🛒 {len(unshipped)} fulfilled orders waiting to ship "
+                        f"({sum(o.get('total_qty', 0) for o in unshipped)} units)")
+                st.dataframe([{k: o.get(k) for k in ('id', 'customer', 'destination', 'carrier', 'total_qty', 'warehouse_id')}
+                              for o in unshipped[:200]], use_container_width=True)
+                if check_permission('create') and st.button("📦 Create Shipments", use_container_width=True):
+                    success, msg, created = shipment_manager.consolidate(warehouse_data['orders'], selected_warehouse)
+                    if success and created:
+                        save_data(warehouse_data)
+                        event_bus.publish('ShipmentsCreated', created[0]['id'], st.session_state.username,
+                                          f"{len(created)} shipments consolidated")
+                        st.success(msg)
+                        st.experimental_rerun()
+                    elif success:
+                        st.info(msg)
+                    else:
+                        st.error(msg)
+            else:
+                st.info("📭 No fulfilled orders waiting to ship")
         
-        if st.session_state.user_role == 'admin':
-            st.markdown("---")
-            st.subheader("🔗 Admin Tools")
-            st.markdown("- [Go to Admin Panel](#admin-panel)")
-    
-    with settings_tab2:
-        st.subheader("🔐 Change Your Password")
+        with ship_tab2:
+            st.subheader("🧾 Carrier Manifests")
+            waiting = [s for s in warehouse_data['shipments'] if s['status'] == 'Created'
+                       and (selected_warehouse is None or s.get('warehouse_id') == selected_warehouse)]
+            st.write(f"**{len(waiting)} shipments** waiting for a manifest")
+            if waiting and check_permission('update') and st.button("🧾 Generate Manifests", use_container_width=True):
+                success, msg, manifests = shipment_manager.generate_manifests(selected_warehouse)
+                if success and manifests:
+                    save_data(warehouse_data)
+                    event_bus.publish('ShipmentsUpdated', 0, st.session_state.username, msg)
+                    st.success(msg)
+                    st.dataframe(manifests, use_container_width=True)
+                    for manifest in manifests:
+                        with open(manifest['file'], 'rb') as f:
+                            st.download_button(f"⬇️ {manifest['manifest_id']}", f.read(),
+                                               file_name=os.path.basename(manifest['file']), mime="text/csv",
+                                               key=manifest['manifest_id'])
+                else:
+                    st.error(msg) if not success else st.info(msg)
         
-        with st.form("change_password_form"):
-            current_pwd = st.text_input("Current Password", type="password", key="current_pwd")
-            new_pwd = st.text_input("New Password", type="password", key="new_pwd")
-            confirm_pwd = st.text_input("Confirm New Password", type="password", key="confirm_pwd")
-            
-            submit_change = st.form_submit_button("✅ Change Password", use_container_width=True)
+        with ship_tab3:
+            st.subheader("🔎 Track Shipment")
+            ref = st.text_input("Tracking number or shipment ID:")
+            if ref:
+                found = shipment_manager.track(int(ref) if ref.strip().isdigit() else ref.strip().upper())
+                if found:
+                    st.write(f"**{found['tracking']}** | {found['carrier']} → {found['destination']} | "
+                             f"Orders: {', '.join(f'#{o}' for o in found['order_ids'])} | **{found['status']}**")
+                    st.dataframe(found['history'], use_container_width=True)
+                else:
+                    st.warning("❌ Shipment not found")
             
-            if submit_change:
-                try:
-                    # Validate
-                    if not current_pwd:
-                        st.error("❌ Current password is required")
-                    elif not new_pwd or len(new_pwd) < 6:
-                        st.error("❌ New password must be at least 6 characters")
-                    elif new_pwd != confirm_pwd:
-                        st.error("❌ Passwords do not match")
-                    else:
-                        success, msg = auth_manager.change_password(
-                            st.session_state.username,
-                            current_pwd,
-                            new_pwd
+            if check_permission('update'):
+                st.subheader("✏️ Bulk Status Update")
+                with st.form("shipment_status", clear_on_submit=True):
+                    refs = st.text_area("Tracking numbers (one per line)")
+                    new_status = st.selectbox("New Status", ShipmentManager.STATUSES[1:])
+                    note = st.text_input("Note (hub, reason...)")
+                    submitted = st.form_submit_button("💾 Update Status")
+                    if submitted and refs.strip():
+                        success, msg = shipment_manager.update_status(
+                            [r.strip().upper() for r in refs.splitlines() if r.strip()], new_status, note
                         )
                         if success:
+                            save_data(warehouse_data)
+                            event_bus.publish('ShipmentsUpdated', 0, st.session_state.username, msg)
                             st.success(msg)
-                            st.info("ℹ️ Please login again with your new password")
-                            audit_logger.log_action(
-                                'UPDATE',
-                                'users',
-                                1,
-                                st.session_state.username,
-                                'Password changed'
+                        else:
+                            st.error(msg)
+
+    elif page == "📈 Reports":
+        st.header("📈 Business Reports")
+        
+        # Simple metrics
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            avg_order = sum(o.get('total', 0) for o in orders_view) / max(len(orders_view), 1)
+            st.metric("📊 Avg Order Value", f"₹{avg_order:,.0f}")
+        
+        with col2:
+            active_items = len([i for i in inventory_view if i['quantity'] > 0])
+            st.metric("📦 Active SKUs", active_items)
+        
+        with col3:
+            st.metric("👥 Team Size", len(warehouse_data['employees']))
+        
+        # Top selling items
+        st.subheader("🏆 Top Selling Items")
+        stock_outs = view_cache.get(('stock_outs', selected_warehouse), ('orders', 'inventory', 'transfers', 'purchase_orders'),
+                                    lambda: get_stock_out_frequency(orders_view, inventory_view),
+                                    generation=data_gen)
+        if stock_outs:
+            st.dataframe(stock_outs, use_container_width=True)
+
+    # =============================================================================
+    # ADMIN PANEL
+    # =============================================================================
+    elif page == "🔐 Admin Panel":
+        if st.session_state.user_role == 'admin':
+            st.title("🔐 Admin Control Panel")
+            
+            # The Performance tab is hidden unless the URL carries ?perf=1
+            show_perf = 'perf' in st.experimental_get_query_params()
+            admin_tabs = st.tabs(["🏢 Warehouses", "👥 Users", "⚙️ System", "📊 Analytics"]
+                                 + (["⏱️ Performance"] if show_perf else []))
+            admin_tab1, admin_tab2, admin_tab3, admin_tab4 = admin_tabs[:4]
+            
+            with admin_tab1:
+                st.subheader("🏢 Warehouse Locations")
+                
+                if warehouses:
+                    st.dataframe(warehouses, use_container_width=True)
+                    
+                    st.subheader("📦 Stock & Capacity by Site")
+                    st.dataframe(stock_ledger.site_summary(), use_container_width=True)
+                    
+                    st.subheader("🚦 Order Capacity Calendar (units/hour)")
+                    calendar_site = st.selectbox(
+                        "Site:", [f"ID:{w['id']} - {w['name']}" for w in warehouses], key="calendar_site"
+                    )
+                    calendar_wid = int(calendar_site.split(':')[1].split(' ')[0])
+                    st.dataframe(peak_manager.calendar.week(calendar_wid), use_container_width=True)
+                    st.caption(f"Edit {peak_manager.calendar.config_file} for per-site, weekday and seasonal limits")
+                    
+                    if st.button("🧠 Learn Limits from Order History"):
+                        learned = peak_manager.calendar.learn(warehouse_data['orders'])
+                        success, msg = peak_manager.calendar.save()
+                        if success:
+                            event_bus.publish('SettingsChanged', 0, st.session_state.username,
+                                              f"Learned limits for {len(learned)} sites", module='capacity_calendar')
+                            st.success(f"{msg} - learned limits for {len(learned)} sites")
+                            st.experimental_rerun()
+                        else:
+                            st.error(msg)
+                
+                st.subheader("➕ Add New Warehouse")
+                with st.form("add_warehouse"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        name = st.text_input("Warehouse Name")
+                        location = st.text_input("Location/City")
+                    with col2:
+                        address = st.text_input("Address")
+                        phone = st.text_input("Phone")
+                    
+                    capacity = st.number_input("Capacity (units)", 1000, 100000, 5000)
+                    submitted = st.form_submit_button("Add Warehouse")
+                    
+                    if submitted and name and location:
+                        success, msg = warehouse_manager.add_warehouse(name, location, address, phone, capacity)
+                        if success:
+                            st.success(msg)
+                            st.experimental_rerun()
+                        else:
+                            st.error(msg)
+            
+            with admin_tab2:
+                st.subheader("👥 User Management")
+                
+                user_subtab1, user_subtab2, user_subtab3 = st.tabs(["📋 All Users", "➕ Add User", "🔐 Manage Users"])
+                
+                with user_subtab1:
+                    st.write("**All User Accounts:**")
+                    try:
+                        all_users = auth_manager.get_all_users()
+                        if all_users:
+                            st.dataframe(all_users, use_container_width=True)
+                            st.caption(f"Total users: {len(all_users)}")
+                        else:
+                            st.info("No users found")
+                    except Exception as e:
+                        st.error(f"Error loading users: {str(e)}")
+                
+                with user_subtab2:
+                    st.write("**Create New User Account:**")
+                    with st.form("admin_add_user"):
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            add_username = st.text_input("Username", key="admin_username")
+                            add_password = st.text_input("Password", type="password", key="admin_password")
+                        with col2:
+                            add_fullname = st.text_input("Full Name", key="admin_fullname")
+                            add_role = st.selectbox(
+                                "Role",
+                                ["worker", "manager", "admin"],
+                                key="admin_role"
                             )
+                        
+                        submit_add = st.form_submit_button("➕ Add User", use_container_width=True)
+                        
+                        if submit_add:
+                            try:
+                                if not add_username or len(add_username) < 3:
+                                    st.error("❌ Username must be at least 3 characters")
+                                elif not add_password or len(add_password) < 6:
+                                    st.error("❌ Password must be at least 6 characters")
+                                elif not add_fullname:
+                                    st.error("❌ Full name is required")
+                                else:
+                                    success, msg = auth_manager.register_user(
+                                        add_username,
+                                        add_password,
+                                        add_role,
+                                        add_fullname
+                                    )
+                                    if success:
+                                        st.success(msg)
+                                        event_bus.publish(
+                                            'UserCreated',
+                                            1,
+                                            st.session_state.username,
+                                            f'New user created: {add_username} ({add_role})'
+                                        )
+                                        st.experimental_rerun()
+                                    else:
+                                        st.error(msg)
+                            except Exception as e:
+                                st.error(f"❌ Error: {str(e)}")
+                
+                with user_subtab3:
+                    st.write("**Delete User or Manage Access:**")
+                    try:
+                        all_users = auth_manager.get_all_users()
+                        if all_users and len(all_users) > 1:
+                            user_to_manage = st.selectbox(
+                                "Select user to manage:",
+                                [u['username'] for u in all_users if u['username'] != st.session_state.username],
+                                key="manage_user_select"
+                            )
+                            
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                if st.button("🗑️ Delete User", key="delete_user_btn"):
+                                    success, msg = auth_manager.delete_user(user_to_manage)
+                                    if success:
+                                        session_manager.revoke_user(user_to_manage)
+                                        st.success(msg)
+                                        event_bus.publish(
+                                            'UserDeleted',
+                                            1,
+                                            st.session_state.username,
+                                            f'User deleted: {user_to_manage}'
+                                        )
+                                        st.experimental_rerun()
+                                    else:
+                                        st.error(msg)
+                            
+                            with col2:
+                                st.caption("⚠️ This will permanently delete the user account")
+                        else:
+                            st.info("Cannot manage users (need at least 2 users and cannot delete yourself)")
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+            
+            with admin_tab3:
+                st.subheader("⚙️ System Settings")
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.subheader("📧 Email Configuration")
+                    try:
+                        email_cfg = email_config.get_config()
+                        
+                        enabled = st.checkbox("Enable Email Alerts", value=email_cfg.get('enabled', False))
+                        smtp_server = st.text_input("SMTP Server", value=email_cfg.get('smtp_server', ''))
+                        smtp_port = st.number_input("SMTP Port", value=email_cfg.get('smtp_port', 587))
+                        sender_email = st.text_input("Sender Email", value=email_cfg.get('sender_email', ''))
+                        sender_password = st.text_input("Sender Password", type="password", value=email_cfg.get('sender_password', ''))
+                        recipients = st.text_input("Alert Recipients (comma separated)",
+                                                   value=", ".join(email_cfg.get('recipients', [])))
+                        use_tls = st.checkbox("Use STARTTLS", value=email_cfg.get('use_tls', int(smtp_port) == 587))
+                        alert_toggles = {
+                            kind: st.checkbox(f"Send {kind.replace('_', ' ')} alerts", value=on, key=f"alert_{kind}")
+                            for kind, on in email_cfg.get('alerts', {}).items()
+                        }
+                        
+                        if st.button("💾 Save Email Config"):
+                            new_config = {
+                                'smtp_server': smtp_server,
+                                'smtp_port': int(smtp_port),
+                                'sender_email': sender_email,
+                                'sender_password': sender_password,
+                                'recipients': [r.strip() for r in recipients.split(',') if r.strip()],
+                                'use_tls': use_tls,
+                                'enabled': enabled,
+                                'alerts': alert_toggles
+                            }
+                            if email_config.update_config(new_config):
+                                st.success("✅ Email config saved")
+                            else:
+                                st.error("❌ Failed to save config")
+                        
+                        alert_dispatcher.start()
+                        outbox = alert_dispatcher.pending()
+                        failed = alert_dispatcher.failed()
+                        st.caption(f"📤 Outbox: {len(outbox)} alerts waiting | {len(failed)} failed | "
+                                   f"{alert_dispatcher.stats['sent_mails']} digests sent this session")
+                        if failed:
+                            st.warning(f"⚠️ {len(failed)} alerts failed after {alert_dispatcher.max_attempts} "
+                                       f"attempts - check the SMTP settings")
+                            if st.button("🔁 Retry Failed Alerts"):
+                                st.success(f"✅ {alert_dispatcher.retry_failed()} alerts queued again")
+                        if outbox or failed:
+                            st.dataframe([{k: a[k] for k in ('kind', 'text', 'status', 'attempts')}
+                                          for a in (failed + outbox)[:50]],
+                                         use_container_width=True)
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+                
+                with col2:
+                    st.subheader("💾 Data Management")
+                    
+                    col_a, col_b = st.columns(2)
+                    with col_a:
+                        if st.button("🔄 Create Backup Now"):
+                            try:
+                                backup_file = backup_manager.create_backup(warehouse_data)
+                                st.success(f"✅ Backup created: {backup_file}")
+                            except Exception as e:
+                                st.error(f"❌ Backup failed: {str(e)}")
+                    
+                    with col_b:
+                        if st.button("🗑️ Clear All Data"):
+                            if st.checkbox("I understand this will delete all data"):
+                                warehouse_data['employees'] = []
+                                warehouse_data['inventory'] = []
+                                warehouse_data['orders'] = []
+                                warehouse_data['order_lines'] = []
+                                warehouse_data['shipments'] = []
+                                warehouse_data['shipment_events'] = []
+                                warehouse_data['stock_levels'] = []
+                                warehouse_data['transfers'] = []
+                                warehouse_data['purchase_orders'] = []
+                                save_data(warehouse_data)
+                                view_cache.clear()
+                                event_bus.publish('SettingsChanged', 0, st.session_state.username, 'All data cleared')
+                                st.success("✅ All data cleared")
+                                st.experimental_rerun()
+                    
+                    st.markdown("---")
+                    if shard_store.enabled():
+                        st.caption(f"🧩 Sharded by warehouse: {len(shard_store.warehouse_ids())} shards in {shard_store.shard_dir}/")
+                    elif st.button("🧩 Shard Data by Warehouse"):
+                        success, msg = shard_store.migrate(load_data(), warehouses)
+                        if success:
+                            event_bus.publish('SettingsChanged', 0, st.session_state.username, msg)
+                            st.success(msg)
+                            st.info(f"ℹ️ {DATA_FILE} is kept as a pre-sharding snapshot")
                         else:
                             st.error(msg)
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
-    
-    with settings_tab3:
-        st.subheader("📚 Help & Documentation")
-        st.markdown("""
+                    
+                    if snapshot_store.enabled():
+                        info = snapshot_store.status()
+                        st.caption(f"🗺️ Shared snapshot generation {info['generation']} "
+                                   f"({info['bytes'] / 1024:,.0f} KB, mapped by every worker)")
+                    elif not shard_store.enabled() and st.button("🗺️ Enable Shared Snapshots"):
+                        success, msg = snapshot_store.publish(load_data(), DATA_FILE)
+                        if success:
+                            event_bus.publish('SettingsChanged', 0, st.session_state.username, msg)
+                            st.success(msg)
+                        else:
+                            st.error(msg)
+            
+            with admin_tab4:
+                st.subheader("📊 System Analytics")
+                
+                if shard_store.enabled():
+                    # Cross-shard totals from cached per-warehouse summaries
+                    totals = shard_store.aggregate_totals()
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Total Employees", totals.get('employees', 0))
+                    with col2:
+                        st.metric("Total Inventory Items", totals.get('items', 0))
+                    with col3:
+                        st.metric("Total Orders", totals.get('orders', 0))
+                    st.dataframe(shard_store.aggregate(), use_container_width=True)
+                else:
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Total Employees", len(warehouse_data['employees']))
+                    with col2:
+                        st.metric("Total Inventory Items", len(warehouse_data['inventory']))
+                    with col3:
+                        st.metric("Total Orders", len(warehouse_data['orders']))
+                
+                # Domain event bus
+                st.subheader("📨 Event Bus")
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Published", event_bus.stats['published'])
+                col2.metric("Delivered", event_bus.stats['delivered'], f"{event_bus.stats['batches']} batches")
+                col3.metric("Queued", event_bus.queue_depth())
+                col4.metric("Handler Errors", event_bus.stats['errors'])
+                if event_bus.stats['by_type']:
+                    st.bar_chart(event_bus.stats['by_type'])
+                st.caption(f"View cache: {view_cache.hits} hits / {view_cache.misses} misses")
+                
+                # Audit trail summary
+                st.subheader("📋 Recent Audit Trail")
+                recent_logs = audit_logger.get_audit_trail()[:20]
+                if recent_logs:
+                    st.dataframe(recent_logs, use_container_width=True)
+                else:
+                    st.info("No audit logs yet")
+            
+            if show_perf:
+                with admin_tabs[4]:
+                    st.subheader("⏱️ Performance")
+                    if profiler.wrapped:
+                        profiler.enabled = st.checkbox("Time every helpers function and manager method",
+                                                       value=profiler.enabled,
+                                                       help="Process-wide; adds a little overhead to every call")
+                    else:
+                        st.caption("Per-function timings and file I/O counters are off: start the app with "
+                                   "WAREHOUSE_PROFILE=1 to record them")
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("🔬 Profile Next Rerun"):
+                            st.session_state['profile_next_rerun'] = True
+                            st.experimental_rerun()
+                    with col2:
+                        if st.button("🧹 Reset Counters"):
+                            profiler.reset()
+                            st.experimental_rerun()
+                    
+                    st.subheader("Operations (ms)")
+                    timings = profiler.report()
+                    if timings:
+                        st.dataframe(timings, use_container_width=True)
+                    else:
+                        st.info("No samples yet - rerun a page")
+                    
+                    st.subheader("File I/O")
+                    io_rows = profiler.io_report()
+                    if io_rows:
+                        st.dataframe(io_rows, use_container_width=True)
+                    
+                    if st.session_state.get('last_profile'):
+                        st.subheader("Last Rerun Profile")
+                        st.code(st.session_state['last_profile'])
+                    
+                    st.subheader("📡 Metrics Exporter")
+                    metrics_port = metrics_registry.serving()
+                    if metrics_port:
+                        st.success(f"Serving http://127.0.0.1:{metrics_port}/metrics")
+                    else:
+                        port = st.number_input("Port", min_value=1024, max_value=65535, value=9464)
+                        if st.button("▶️ Start Exporter"):
+                            success, msg = metrics_registry.serve(int(port))
+                            st.success(msg) if success else st.error(msg)
+                    with st.expander("Current exposition"):
+                        st.code(metrics_registry.exposition())
+        else:
+            st.error("❌ Admin access required")
+
+    # =============================================================================
+    # SETTINGS PAGE
+    # =============================================================================
+    elif page == "⚙️ Settings":
+        st.title("⚙️ User Settings")
+        
+        settings_tab1, settings_tab2, settings_tab3 = st.tabs(["👤 Profile", "🔐 Change Password", "ℹ️ Help"])
+        
+        with settings_tab1:
+            st.subheader(f"👤 Your Profile")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Username:** {st.session_state.username}")
+            with col2:
+                st.write(f"**Role:** {st.session_state.user_role.upper()}")
+            
+            st.markdown("---")
+            st.subheader("🔑 Permissions")
+            
+            role = st.session_state.user_role
+            permissions = {
+                'admin': ['Create', 'Read', 'Update', 'Delete', 'View Reports', 'Admin Panel'],
+                'manager': ['Create', 'Read', 'Update', 'View Reports'],
+                'worker': ['Read (View-only)']
+            }
+            
+            st.write(f"**Your {role.upper()} can:**")
+            for perm in permissions.get(role, []):
+                st.write(f"✅ {perm}")
+            
+            if st.session_state.user_role == 'admin':
+                st.markdown("---")
+                st.subheader("🔗 Admin Tools")
+                st.markdown("- [Go to Admin Panel](#admin-panel)")
+        
+        with settings_tab2:
+            st.subheader("🔐 Change Your Password")
+            
+            with st.form("change_password_form"):
+                current_pwd = st.text_input("Current Password", type="password", key="current_pwd")
+                new_pwd = st.text_input("New Password", type="password", key="new_pwd")
+                confirm_pwd = st.text_input("Confirm New Password", type="password", key="confirm_pwd")
+                
+                submit_change = st.form_submit_button("✅ Change Password", use_container_width=True)
+                
+                if submit_change:
+                    try:
+                        # Validate
+                        if not current_pwd:
+                            st.error("❌ Current password is required")
+                        elif not new_pwd or len(new_pwd) < 6:
+                            st.error("❌ New password must be at least 6 characters")
+                        elif new_pwd != confirm_pwd:
+                            st.error("❌ Passwords do not match")
+                        else:
+                            success, msg = auth_manager.change_password(
+                                st.session_state.username,
+                                current_pwd,
+                                new_pwd
+                            )
+                            if success:
+                                session_manager.revoke_user(st.session_state.username)
+                                st.success(msg)
+                                st.info("ℹ️ Please login again with your new password")
+                                event_bus.publish(
+                                    'PasswordChanged',
+                                    1,
+                                    st.session_state.username,
+                                    'Password changed'
+                                )
+                            else:
+                                st.error(msg)
+                    except Exception as e:
+                        st.error(f"❌ Error: {str(e)}")
+        
+        with settings_tab3:
+            st.subheader("📚 Help & Documentation")
+            st.markdown("""
         **Quick Tips:**
         - 📊 Dashboard: View KPIs and analytics
         - 👥 Employees: Hire and manage team
@@ -1502,7 +2176,13 @@ elif page == "⚙️ Settings":
         - Contact your administrator for account issues
         """)
 
-# Footer
-st.markdown("---")
-st.markdown("*✅ Production Ready | Zero Dependencies | Audit Trail Enabled | Multi-user Support*")
-st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | User: {st.session_state.username} | Role: {st.session_state.user_role.upper()}")
+    profiler.record(f"page:{page}", time.perf_counter() - page_started)
+    profiler.record("rerun", time.perf_counter() - rerun_started)
+
+    # Footer
+    st.markdown("---")
+    st.markdown("*✅ Production Ready | Zero Dependencies | Audit Trail Enabled | Multi-user Support*")
+    st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | User: {st.session_state.username} | Role: {st.session_state.user_role.upper()}")
+finally:
+    if rerun_capture is not None:
+        st.session_state['last_profile'] = profiler.finish_capture(rerun_capture)
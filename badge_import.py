@@ -0,0 +1,116 @@
+"""
+BADGE IMPORT - Bulk shift check-in/out from badge-reader events
+Reads CSV (employee_id,event,timestamp) or JSON lines from a file or stdin
+and commits them to the attendance store in batches.
+
+Usage:
+    python badge_import.py events.csv
+    tail -f gate.log | python badge_import.py - --batch-size 200
+    python badge_import.py --synthetic 5000      # sizing run, no input needed
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from helpers import AttendanceManager, parse_badge_events
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_events(count: int, staff: int = 500):
+    """Shift-change burst: everyone badges in within 15 minutes, with repeat taps"""
+    start = datetime.now().replace(hour=6, minute=0, second=0, microsecond=0)
+    for _ in range(count):
+        yield {
+            'employee_id': random.randint(1, staff),
+            'event': 'IN',
+            'timestamp': (start + timedelta(seconds=random.randint(0, 900))).isoformat()
+        }
+
+
+def read_events(stream):
+    """Yield events line by line so stdin can be a live feed"""
+    header = None
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            yield from parse_badge_events(line)
+        elif header is None:
+            header = line
+        else:
+            yield from parse_badge_events(f"{header}\n{line}")
+
+
+def run(events, manager: AttendanceManager, batch_size: int, dedupe_seconds: int):
+    totals = {}
+    event_latency, commit_latency = [], []
+    batch, received_at = [], []
+    started = time.perf_counter()
+
+    def flush():
+        commit_start = time.perf_counter()
+        stats = manager.bulk_record(batch, dedupe_seconds=dedupe_seconds)
+        done = time.perf_counter()
+        commit_latency.append(done - commit_start)
+        event_latency.extend(done - t for t in received_at)
+        for key, value in stats.items():
+            if isinstance(value, int):
+                totals[key] = totals.get(key, 0) + value
+        if 'error' in stats:
+            print(f"❌ Batch failed: {stats['error']}", file=sys.stderr)
+        batch.clear()
+        received_at.clear()
+
+    for event in events:
+        batch.append(event)
+        received_at.append(time.perf_counter())
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    received = totals.get('received', 0)
+    print(f"✅ {received} events in {len(commit_latency)} batches, {elapsed:.3f}s")
+    print("   " + ", ".join(f"{k}={v}" for k, v in totals.items() if k != 'received'))
+    print(f"   throughput: {received / elapsed if elapsed else 0:,.0f} events/s")
+    print(f"   commit latency p50={percentile(commit_latency, 50) * 1000:.2f}ms "
+          f"p99={percentile(commit_latency, 99) * 1000:.2f}ms")
+    print(f"   event latency  p50={percentile(event_latency, 50) * 1000:.2f}ms "
+          f"p99={percentile(event_latency, 99) * 1000:.2f}ms")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk badge check-in/out import")
+    parser.add_argument("source", nargs="?", default="-", help="events file, or - for stdin")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dedupe-seconds", type=int, default=60)
+    parser.add_argument("--attendance-file", default="attendance.json")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="generate N synthetic shift-change events instead of reading input")
+    args = parser.parse_args()
+
+    manager = AttendanceManager(args.attendance_file)
+    if args.synthetic:
+        events = synthetic_events(args.synthetic)
+        run(events, manager, args.batch_size, args.dedupe_seconds)
+    elif args.source == "-":
+        run(read_events(sys.stdin), manager, args.batch_size, args.dedupe_seconds)
+    else:
+        with open(args.source, 'r') as f:
+            run(read_events(f), manager, args.batch_size, args.dedupe_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+ATTENDANCE BENCHMARK - Period totals, numpy columns vs pure Python
+Writes day partitions for a synthetic workforce, then times the
+AttendanceAnalytics period totals with numpy and with the pure-Python
+fallback: cold (fresh analytics, partitions decoded into day columns) and
+warm (day columns loaded, period cache cleared, so only the aggregation
+runs). Totals from both paths are checked to match.
+
+Usage: python benchmarks/bench_attendance.py [--employees 1000] [--days 365] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def best_of(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def records(employees, days, seed):
+    rng = random.Random(seed)
+    first = datetime(2024, 1, 1)
+    for d in range(days):
+        date = (first + timedelta(days=d)).strftime("%Y-%m-%d")
+        for employee_id in range(1, employees + 1):
+            if rng.random() < 0.1:
+                continue  # absent
+            start = rng.randrange(6 * 3600, 22 * 3600)
+            end = (start + rng.randrange(6 * 3600, 11 * 3600)) % 86400
+            yield {
+                'employee_id': employee_id, 'date': date,
+                'check_in': time.strftime("%H:%M:%S", time.gmtime(start)),
+                'check_out': None if rng.random() < 0.02 else time.strftime("%H:%M:%S", time.gmtime(end)),
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attendance period totals: numpy vs pure Python")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # helpers creates its data files in the working directory
+        import helpers
+        from helpers import AttendanceAnalytics, attendance_manager
+
+        rows = list(records(args.employees, args.days, args.seed))
+        with attendance_manager._locked():
+            attendance_manager._write_records(rows)
+        dates = attendance_manager.list_dates()
+        print(f"{len(rows):,} attendance records, {args.employees:,} employees, {len(dates)} days")
+        if helpers.np is None:
+            print("numpy not installed: only the pure-Python path is available")
+
+        numpy = helpers.np
+        results = {}
+        for label, backend in (('numpy', numpy), ('pure python', None)):
+            if label == 'numpy' and numpy is None:
+                continue
+            helpers.np = backend
+            for period, span in (('month', dates[:30]), ('year', dates)):
+                cold_ms, totals = best_of(
+                    lambda: AttendanceAnalytics(attendance_manager).hours_by_employee(span[0], span[-1]),
+                    args.repeat)
+                analytics = AttendanceAnalytics(attendance_manager)
+                analytics.hours_by_employee(span[0], span[-1])
+
+                def warm():
+                    analytics._periods.clear()
+                    return analytics.hours_by_employee(span[0], span[-1])
+                warm_ms, _ = best_of(warm, args.repeat)
+                results[(label, period)] = (warm_ms, totals)
+                print(f"{label:<14}{period:<8}{cold_ms:>10.1f}ms cold{warm_ms:>10.1f}ms warm")
+        helpers.np = numpy
+
+        if numpy is not None:
+            for period in ('month', 'year'):
+                fast, slow = results[('numpy', period)], results[('pure python', period)]
+                assert fast[1] == slow[1], f"{period} totals differ"
+                print(f"{period}: aggregation {slow[0] / fast[0]:.1f}x faster with numpy, totals identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+CODEC BENCHMARK - Dataset save/load per JSON backend
+Compares the old path (stdlib json, indent=2) with every installed JsonCodec
+backend: compact encode, plain decode, schema-typed decode and file size.
+
+Usage: python benchmarks/bench_codec.py [--scale 100k] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate, parse_scale
+
+
+def best_of(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON codec backends on a synthetic dataset")
+    parser.add_argument("--scale", default="100k", help="order rows: 1k, 10k, 100k, 1m or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = parse_scale(args.scale)
+    data = generate(rows, seed=args.seed)['data']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # helpers creates its data files in the working directory
+        from helpers import JsonCodec
+
+        # Before: what load_data/save_data used to do
+        save_ms, raw = best_of(lambda: json.dumps(data, indent=2).encode(), args.repeat)
+        load_ms, _ = best_of(lambda: json.loads(raw), args.repeat)
+        baseline = (save_ms, load_ms)
+        print(f"scale: {rows:,} orders")
+        print(f"{'backend':<22}{'save':>10}{'load':>10}{'typed load':>12}{'size':>10}{'save x':>8}{'load x':>8}")
+        print(f"{'json indent=2 (old)':<22}{save_ms:>8.0f}ms{load_ms:>8.0f}ms{'':>12}"
+              f"{len(raw) / 2**20:>8.1f}MB{1:>8.1f}{1:>8.1f}")
+
+        for backend in JsonCodec.BACKENDS:
+            codec = JsonCodec(backend)
+            if codec.backend != backend:
+                print(f"{backend:<22}not installed")
+                continue
+            save_ms, raw = best_of(lambda: codec.dumps(data), args.repeat)
+            load_ms, loaded = best_of(lambda: codec.loads(raw), args.repeat)
+            typed_ms, _ = best_of(lambda: codec.decode(raw, 'dataset'), args.repeat)
+            assert loaded['orders'][-1] == data['orders'][-1]
+            print(f"{backend + ' compact':<22}{save_ms:>8.0f}ms{load_ms:>8.0f}ms{typed_ms:>10.0f}ms"
+                  f"{len(raw) / 2**20:>8.1f}MB{baseline[0] / save_ms:>8.1f}{baseline[1] / load_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+LOGIN BENCHMARK - Shift-change login storm against AuthManager
+Measures the real KDF cost of register, login and failed login, and the
+one-off rehash when an account moves to the configured KDF.
+Usage: python benchmarks/bench_login.py [--users 200] [--rounds 3] [--kdf scrypt]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(label, samples):
+    ms = [s * 1000 for s in samples]
+    print(f"{label:<28} n={len(ms):<5} p50={percentile(ms, 50):7.2f}ms "
+          f"p95={percentile(ms, 95):7.2f}ms p99={percentile(ms, 99):7.2f}ms "
+          f"stdev={statistics.pstdev(ms):6.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AuthManager login storm benchmark")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--kdf", default="scrypt", choices=["scrypt", "pbkdf2_sha256"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # helpers creates its data files in the working directory
+        from helpers import AuthManager
+
+        auth = AuthManager(os.path.join(tmp, "bench_users.json"), kdf=args.kdf)
+        register = []
+        for n in range(args.users):
+            start = time.perf_counter()
+            auth.register_user(f"worker{n}", f"pass-{n}", "worker", f"Worker {n}")
+            register.append(time.perf_counter() - start)
+
+        # Every login runs the full KDF: there is no verified-credential cache
+        logins = []
+        for _ in range(args.rounds):
+            for n in range(args.users):
+                start = time.perf_counter()
+                ok, _, _ = auth.authenticate(f"worker{n}", f"pass-{n}")
+                logins.append(time.perf_counter() - start)
+                assert ok
+
+        failed = []
+        for n in range(min(args.users, 50)):
+            start = time.perf_counter()
+            auth.authenticate(f"worker{n}", "wrong-password")
+            failed.append(time.perf_counter() - start)
+
+        # Accounts hashed with the other KDF are rehashed on their first login
+        other = "pbkdf2_sha256" if args.kdf == "scrypt" else "scrypt"
+        legacy = AuthManager(os.path.join(tmp, "legacy_users.json"), kdf=other)
+        upgrade_users = min(args.users, 20)
+        for n in range(upgrade_users):
+            legacy.register_user(f"old{n}", f"pass-{n}", "worker", f"Old {n}")
+        upgraded = AuthManager(os.path.join(tmp, "legacy_users.json"), kdf=args.kdf)
+        first, after = [], []
+        for samples in (first, after):
+            for n in range(upgrade_users):
+                start = time.perf_counter()
+                ok, _, _ = upgraded.authenticate(f"old{n}", f"pass-{n}")
+                samples.append(time.perf_counter() - start)
+                assert ok
+
+        print(f"KDF: {args.kdf}  users: {args.users}  rounds: {args.rounds}")
+        summarize("register (hash)", register)
+        summarize("login (verify)", logins)
+        summarize("failed login (verify)", failed)
+        summarize(f"first login ({other.split('_')[0]} rehash)", first)
+        summarize("login after rehash", after)
+        print(f"storm throughput: {len(logins) / sum(logins):.1f} logins/s per thread")
+
+if __name__ == "__main__":
+    main()
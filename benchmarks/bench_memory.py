@@ -0,0 +1,107 @@
+"""
+MEMORY BENCHMARK - Plain dict records vs compact (slot-backed) records
+Loads the same synthetic dataset both ways, measures retained memory per
+table with tracemalloc, checks that helpers.py analytics return identical
+results on both, and times them.
+
+Usage: python benchmarks/bench_memory.py [--scale 100k] [--seed 42]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate, parse_scale
+
+TABLES = ('inventory', 'orders', 'order_lines')
+
+
+def retained(build):
+    """Bytes still allocated after build() returns, and its result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def order_lines(orders):
+    """data['order_lines'] rows as OrderBook writes them"""
+    lines, line_id = [], 1
+    for order in orders:
+        for item in order['items']:
+            lines.append({'id': line_id, 'order_id': order['id'], 'item_id': item['item_id'],
+                          'name': item['name'], 'quantity': item['quantity'], 'price': item['price'],
+                          'total': item['total'], 'warehouse_id': order['warehouse_id'],
+                          'status': order['status']})
+            line_id += 1
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dict vs compact record memory benchmark")
+    parser.add_argument("--scale", default="100k", help="order rows: 1k, 10k, 100k, 1m or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = parse_scale(args.scale)
+    data = generate(rows, seed=args.seed)['data']
+    data['order_lines'] = order_lines(data['orders'])
+    raw = {table: json.dumps(data[table]) for table in TABLES}
+    del data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # helpers creates its data files in the working directory
+        import helpers
+
+        print(f"scale: {rows:,} orders")
+        print(f"{'table':<14}{'rows':>12}{'dicts':>14}{'compact':>14}{'saved':>9}")
+        plain, compact, total_plain, total_compact = {}, {}, 0, 0
+        for table in TABLES:
+            plain_size, plain[table] = retained(lambda: json.loads(raw[table]))
+            compact_size, compact[table] = retained(
+                lambda: helpers.compact_dataset({table: json.loads(raw[table])})[table])
+            total_plain += plain_size
+            total_compact += compact_size
+            print(f"{table:<14}{len(plain[table]):>12,}{plain_size / 2**20:>12.1f}MB"
+                  f"{compact_size / 2**20:>12.1f}MB{1 - compact_size / plain_size:>9.0%}")
+        print(f"{'total':<26}{total_plain / 2**20:>12.1f}MB{total_compact / 2**20:>12.1f}MB"
+              f"{1 - total_compact / total_plain:>9.0%}")
+
+        # Same answers from the helpers.py functions, and what the slot lookups cost
+        checks = {
+            'calculate_profit_margin': lambda d: helpers.calculate_profit_margin(d['orders'], d['inventory']),
+            'calculate_inventory_turnover': lambda d: helpers.calculate_inventory_turnover(d['orders'], d['inventory']),
+            'get_revenue_trends': lambda d: helpers.get_revenue_trends(d['orders'], days=365),
+            'get_stock_out_frequency': lambda d: helpers.get_stock_out_frequency(d['orders'], d['inventory']),
+            'predict_low_stock': lambda d: helpers.predict_low_stock(d['orders'], d['inventory']),
+            'calculate_inventory_metrics': lambda d: helpers.calculate_inventory_metrics(d['inventory']),
+            'search_orders': lambda d: helpers.search_orders(d['orders'], "customer 7")
+        }
+        print(f"\n{'function':<32}{'dicts':>12}{'compact':>12}  same result")
+        for name, fn in checks.items():
+            timings = []
+            for d in (plain, compact):
+                start = time.perf_counter()
+                result = fn(d)
+                timings.append((time.perf_counter() - start) * 1000)
+                if d is plain:
+                    expected = result
+            same = json.dumps(result, default=helpers._json_default, sort_keys=True) == \
+                json.dumps(expected, default=helpers._json_default, sort_keys=True)
+            print(f"{name:<32}{timings[0]:>10.2f}ms{timings[1]:>10.2f}ms  {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
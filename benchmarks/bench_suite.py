@@ -0,0 +1,175 @@
+"""
+BENCHMARK SUITE - Storage, search, analytics, forecasting, audit and attendance
+Generates a seeded synthetic dataset (see synthetic.py), times the helpers.py
+hot paths against it and writes the results as JSON for regression tracking.
+
+Usage:
+    python benchmarks/bench_suite.py --scale 10k
+    python benchmarks/bench_suite.py --scale 1m --repeat 3 --only analytics --output results.json
+    python benchmarks/bench_suite.py --scale 100k --memory     # also record peak allocations
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate, parse_scale, sizes
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def measure(fn, repeat: int, warmup: int = 1, memory: bool = False) -> dict:
+    """Wall-clock samples for fn(); with memory, one more traced call for peak allocation"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    ms = [s * 1000 for s in samples]
+    result = {
+        'samples_ms': [round(s, 4) for s in ms],
+        'p50_ms': round(percentile(ms, 50), 4),
+        'mean_ms': round(statistics.mean(ms), 4),
+        'min_ms': round(min(ms), 4),
+        'max_ms': round(max(ms), 4),
+        'stdev_ms': round(statistics.pstdev(ms), 4)
+    }
+    if memory:
+        tracemalloc.start()
+        fn()
+        result['peak_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    return result
+
+
+def build_benchmarks(dataset: dict, workdir: str) -> dict:
+    """name -> zero-argument callable, set up against the synthetic dataset"""
+    import helpers
+
+    data = dataset['data']
+    employees, inventory, orders = data['employees'], data['inventory'], data['orders']
+    today = datetime.now()
+    month_ago = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+    today_str = today.strftime("%Y-%m-%d")
+
+    data_file = os.path.join(workdir, "bench_data.json")
+    helpers.save_dataset(data, data_file)
+    snapshots = helpers.SnapshotStore(os.path.join(workdir, "snapshots"))
+    snapshots.publish(data)
+
+    audit_file = os.path.join(workdir, "bench_audit.json")
+    with open(audit_file, 'w') as f:
+        json.dump(dataset['audit'], f, indent=2)
+    audit = helpers.AuditLogger(audit_file)
+
+    attendance = helpers.AttendanceManager(os.path.join(workdir, "bench_attendance.json"))
+    attendance.bulk_record(dataset['attendance_events'])
+    analytics = helpers.AttendanceAnalytics(attendance)
+
+    ledger = helpers.StockLedger(data, dataset['warehouses'])
+    low_ids = ledger.low_stock_ids()
+
+    # Each check-in call needs an employee who hasn't badged in today
+    fresh_ids = iter(e['id'] for e in employees)
+
+    return {
+        'storage.save_dataset': lambda: helpers.save_dataset(data, data_file),
+        'storage.load_dataset': lambda: helpers.load_dataset(data_file),
+        'storage.snapshot_publish': lambda: snapshots.publish(data),
+        'storage.snapshot_load': lambda: snapshots.load(),
+        'search.search_employees': lambda: helpers.search_employees(employees, "employee 1"),
+        'search.search_inventory': lambda: helpers.search_inventory(inventory, "bolt"),
+        'search.search_orders': lambda: helpers.search_orders(orders, "customer 7"),
+        'search.filter_inventory_by_price': lambda: helpers.filter_inventory_by_price(inventory, 50, 150),
+        'search.filter_inventory_by_stock_status': lambda: helpers.filter_inventory_by_stock_status(inventory, "medium"),
+        'analytics.calculate_inventory_metrics': lambda: helpers.calculate_inventory_metrics(inventory, low_ids),
+        'analytics.calculate_profit_margin': lambda: helpers.calculate_profit_margin(orders, inventory),
+        'analytics.calculate_inventory_turnover': lambda: helpers.calculate_inventory_turnover(orders, inventory),
+        'analytics.get_revenue_trends': lambda: helpers.get_revenue_trends(orders, days=30),
+        'analytics.get_stock_out_frequency': lambda: helpers.get_stock_out_frequency(orders, inventory),
+        'analytics.attendance_summarize': lambda: analytics.summarize(employees, month_ago, today_str),
+        'analytics.payroll_summary': lambda: analytics.payroll_summary(employees),
+        'forecast.predict_low_stock': lambda: helpers.predict_low_stock(orders, inventory, days_ahead=7),
+        'audit.log_action': lambda: audit.log_action('UPDATE', 'inventory', 1, 'bench', 'benchmark write'),
+        'attendance.check_in': lambda: attendance.check_in(next(fresh_ids, employees[0]['id']))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="helpers.py benchmark suite on synthetic data")
+    parser.add_argument("--scale", default="10k", help="order rows: 1k, 10k, 100k, 1m, 10m or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", action="append", default=[],
+                        help="run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--memory", action="store_true", help="record peak traced allocations")
+    parser.add_argument("--output", help="write JSON results here (default: stdout table only)")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    rows = parse_scale(args.scale)
+    started = time.perf_counter()
+    dataset = generate(rows, seed=args.seed)
+    generated = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # helpers creates its data files in the working directory
+        benchmarks = build_benchmarks(dataset, tmp)
+        selected = [n for n in benchmarks if not args.only or any(o in n for o in args.only)]
+
+        print(f"scale: {rows:,} orders  seed: {args.seed}  generated in {generated:.1f}s")
+        results = {}
+        for name in selected:
+            results[name] = measure(benchmarks[name], args.repeat, memory=args.memory)
+            r = results[name]
+            print(f"{name:<46} p50={r['p50_ms']:10.3f}ms  mean={r['mean_ms']:10.3f}ms  "
+                  f"stdev={r['stdev_ms']:8.3f}ms" + (f"  peak={r['peak_kb']:,.0f}KB" if 'peak_kb' in r else ''))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'scale': rows,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'sizes': sizes(rows),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+REGRESSION GATE - Compare benchmark runs against a stored per-commit baseline
+Runs bench_suite.py several times in fresh processes, pools the samples and
+applies a one-sided Mann-Whitney U test per benchmark. A benchmark regresses
+when it is significantly slower AND its median moved past the threshold, or
+when its peak memory grew past the memory threshold.
+
+Usage:
+    python benchmarks/regression_gate.py record                 # baseline for HEAD
+    python benchmarks/regression_gate.py check                  # vs latest baseline, exit 1 on regression
+    python benchmarks/regression_gate.py check --baseline 3f2a91c --threshold 0.15
+    python benchmarks/regression_gate.py list
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SUITE = os.path.join(HERE, "bench_suite.py")
+BASELINE_DIR = os.path.join(HERE, "baselines")
+
+
+def git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def current_commit() -> str:
+    commit = git("rev-parse", "--short=12", "HEAD") or "unknown"
+    return commit + "-dirty" if git("status", "--porcelain", "--untracked-files=no") else commit
+
+
+def run_suite(runs: int, scale: int, seed: int, repeat: int, memory: bool, only) -> dict:
+    """Pool samples from several fresh-process suite runs"""
+    pooled = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in range(runs):
+            out = os.path.join(tmp, f"run{n}.json")
+            cmd = [sys.executable, SUITE, "--scale", str(scale), "--seed", str(seed),
+                   "--repeat", str(repeat), "--output", out]
+            cmd += ["--memory"] if memory else []
+            for pattern in only or ():
+                cmd += ["--only", pattern]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise RuntimeError(f"bench_suite.py failed:\n{proc.stderr}")
+            print(f"   run {n + 1}/{runs} done", file=sys.stderr)
+            with open(out) as f:
+                report = json.load(f)
+            for name, result in report['results'].items():
+                entry = pooled.setdefault(name, {'samples_ms': [], 'peak_kb': []})
+                entry['samples_ms'].extend(result['samples_ms'])
+                if 'peak_kb' in result:
+                    entry['peak_kb'].append(result['peak_kb'])
+    for entry in pooled.values():
+        entry['median_ms'] = round(statistics.median(entry['samples_ms']), 4)
+        entry['peak_kb'] = round(statistics.median(entry['peak_kb']), 1) if entry['peak_kb'] else None
+    return {
+        'meta': {'commit': current_commit(), 'scale': scale, 'seed': seed, 'repeat': repeat,
+                 'runs': runs, 'memory': memory, 'python': sys.version.split()[0]},
+        'results': pooled
+    }
+
+
+def mann_whitney_p(slower, faster) -> float:
+    """One-sided p-value that `slower` samples are stochastically larger than `faster`
+    (normal approximation with tie correction, continuity corrected)"""
+    n1, n2 = len(slower), len(faster)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(v, 0) for v in slower] + [(v, 1) for v in faster])
+    ranks, ties, i = [0.0] * len(combined), 0.0, 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    r1 = sum(r for r, (_, group) in zip(ranks, combined) if group == 0)
+    u1 = r1 - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u1 - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline: dict, current: dict, threshold: float, memory_threshold: float,
+            alpha: float, min_ms: float) -> list:
+    """One row per benchmark with a verdict: regressed, improved, ok, new or missing"""
+    rows = []
+    names = list(baseline['results']) + [n for n in current['results'] if n not in baseline['results']]
+    for name in names:
+        base, cur = baseline['results'].get(name), current['results'].get(name)
+        if base is None or cur is None:
+            rows.append({'name': name, 'verdict': 'new' if base is None else 'missing'})
+            continue
+        change = cur['median_ms'] / base['median_ms'] - 1 if base['median_ms'] else 0.0
+        p_slower = mann_whitney_p(cur['samples_ms'], base['samples_ms'])
+        p_faster = mann_whitney_p(base['samples_ms'], cur['samples_ms'])
+        row = {'name': name, 'base_ms': base['median_ms'], 'cur_ms': cur['median_ms'],
+               'change': change, 'p': p_slower if change >= 0 else p_faster, 'verdict': 'ok', 'notes': []}
+
+        if change > threshold and p_slower < alpha:
+            if max(base['median_ms'], cur['median_ms']) < min_ms:
+                row['notes'].append(f"below {min_ms}ms noise floor")
+            else:
+                row['verdict'] = 'regressed'
+                row['notes'].append("latency")
+        elif change < -threshold and p_faster < alpha:
+            row['verdict'] = 'improved'
+
+        if base.get('peak_kb') and cur.get('peak_kb'):
+            mem_change = cur['peak_kb'] / base['peak_kb'] - 1
+            row['mem_change'] = mem_change
+            # Ignore growth of a few KB on tiny allocations
+            if mem_change > memory_threshold and cur['peak_kb'] - base['peak_kb'] > 64:
+                row['verdict'] = 'regressed'
+                row['notes'].append(f"memory {base['peak_kb']:,.0f}KB -> {cur['peak_kb']:,.0f}KB")
+        rows.append(row)
+    return rows
+
+
+def print_report(rows: list, baseline: dict, current: dict, threshold: float, alpha: float):
+    marks = {'regressed': '❌', 'improved': '🚀', 'ok': '✅', 'new': '🆕', 'missing': '⚠️'}
+    meta = baseline['meta']
+    print(f"\nBaseline {meta['commit']}  vs  current {current['meta']['commit']}  "
+          f"(scale {meta['scale']:,}, {meta['runs']} runs x {meta['repeat']} repeats, "
+          f"threshold {threshold:.0%}, alpha {alpha})")
+    print(f"{'':3}{'benchmark':<46}{'baseline':>12}{'current':>12}{'change':>10}{'p':>8}  notes")
+    for row in rows:
+        if 'change' not in row:
+            print(f"{marks[row['verdict']]:<3}{row['name']:<46}{'':>42}  {row['verdict']}")
+            continue
+        print(f"{marks[row['verdict']]:<3}{row['name']:<46}{row['base_ms']:>10.3f}ms{row['cur_ms']:>10.3f}ms"
+              f"{row['change']:>+10.1%}{row['p']:>8.3f}  {', '.join(row['notes'])}")
+    regressed = [r['name'] for r in rows if r['verdict'] == 'regressed']
+    improved = sum(r['verdict'] == 'improved' for r in rows)
+    if regressed:
+        print(f"\n❌ {len(regressed)} regression(s): {', '.join(regressed)}")
+    else:
+        print(f"\n✅ No regressions ({improved} improved, {len(rows)} compared)")
+
+
+def baseline_path(commit: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{commit}.json")
+
+
+def load_baseline(ref: str = None) -> dict:
+    """Baseline for a commit-ish, or the most recently recorded one"""
+    if ref:
+        commit = git("rev-parse", "--short=12", ref) or ref
+        path = baseline_path(commit)
+    else:
+        files = sorted(glob.glob(os.path.join(BASELINE_DIR, "*.json")), key=os.path.getmtime)
+        if not files:
+            raise FileNotFoundError("no baselines recorded - run `regression_gate.py record` first")
+        path = files[-1]
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark regression gate")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="store a baseline for the current commit")
+    check = sub.add_parser("check", help="rerun and compare against a baseline")
+    sub.add_parser("list", help="show stored baselines")
+    for p in (record, check):
+        p.add_argument("--runs", type=int, default=5, help="fresh-process suite runs to pool")
+        p.add_argument("--only", action="append", help="benchmark name filter (repeatable)")
+    record.add_argument("--scale", default="10k")
+    record.add_argument("--seed", type=int, default=42)
+    record.add_argument("--repeat", type=int, default=5)
+    record.add_argument("--no-memory", action="store_true", help="skip peak memory tracing")
+    record.add_argument("--force", action="store_true", help="record even with uncommitted changes")
+    check.add_argument("--baseline", help="commit-ish of the baseline (default: latest recorded)")
+    check.add_argument("--threshold", type=float, default=0.10, help="median slowdown that fails (0.10 = 10%%)")
+    check.add_argument("--memory-threshold", type=float, default=0.10)
+    check.add_argument("--alpha", type=float, default=0.01, help="significance level")
+    check.add_argument("--min-ms", type=float, default=0.05, help="never fail benchmarks faster than this")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for path in sorted(glob.glob(os.path.join(BASELINE_DIR, "*.json")), key=os.path.getmtime):
+            with open(path) as f:
+                meta = json.load(f)['meta']
+            print(f"{meta['commit']:<20} scale={meta['scale']:<10,} runs={meta['runs']} "
+                  f"repeat={meta['repeat']} python={meta['python']}")
+        return 0
+
+    if args.command == "record":
+        from synthetic import parse_scale
+        if current_commit().endswith("-dirty") and not args.force:
+            print("❌ Uncommitted changes - commit first or pass --force", file=sys.stderr)
+            return 2
+        result = run_suite(args.runs, parse_scale(args.scale), args.seed, args.repeat,
+                           not args.no_memory, args.only)
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = baseline_path(result['meta']['commit'])
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Baseline for {result['meta']['commit']}: {len(result['results'])} benchmarks -> {path}")
+        return 0
+
+    try:
+        baseline = load_baseline(args.baseline)
+    except (FileNotFoundError, OSError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    meta = baseline['meta']
+    current = run_suite(args.runs, meta['scale'], meta['seed'], meta['repeat'], meta['memory'], args.only)
+    if args.only:
+        baseline = {**baseline, 'results': {k: v for k, v in baseline['results'].items()
+                                             if k in current['results']}}
+    rows = compare(baseline, current, args.threshold, args.memory_threshold, args.alpha, args.min_ms)
+    print_report(rows, baseline, current, args.threshold, args.alpha)
+    return 1 if any(r['verdict'] == 'regressed' for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, HERE)
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+SYNTHETIC DATA - Seeded generator for benchmark datasets
+Produces employees, SKUs, multi-year orders, badge events and audit entries
+in the same shapes the app writes, sized from a single row count.
+
+Usage:
+    python benchmarks/synthetic.py --scale 100k --out /tmp/bench   # write files
+    from synthetic import generate; data = generate(100_000, seed=7)
+"""
+
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+
+POSITIONS = ['Worker', 'Picker', 'Packer', 'Forklift Operator', 'Supervisor', 'Manager']
+SHIFTS = ['Day', 'Night', 'Swing']
+STATUSES = ['Pending', 'Reserved', 'Picked', 'Shipped', 'Fulfilled', 'Cancelled']
+ACTIONS = ['CREATE', 'UPDATE', 'DELETE']
+MODULES = ['employees', 'inventory', 'orders', 'shipments', 'attendance']
+WORDS = ['steel', 'bolt', 'crate', 'pallet', 'cable', 'chips', 'paper', 'tape', 'valve',
+         'drill', 'glove', 'lamp', 'hinge', 'filter', 'motor', 'panel', 'sensor', 'wheel']
+
+
+def parse_scale(value: str) -> int:
+    """'100k' / '1m' / '2500' -> row count"""
+    value = str(value).lower().replace('_', '')
+    if value in SCALES:
+        return SCALES[value]
+    if value[-1:] in ('k', 'm'):
+        return int(float(value[:-1]) * (1_000 if value[-1] == 'k' else 1_000_000))
+    return int(value)
+
+
+def sizes(rows: int) -> dict:
+    """Table sizes for a scale: rows is the order count, the rest follow from it"""
+    return {
+        'orders': rows,
+        'inventory': max(50, rows // 20),
+        'employees': max(20, rows // 100),
+        'attendance_events': rows,
+        'audit': rows,
+        'warehouses': 1 if rows < 10_000 else 3
+    }
+
+
+def generate(rows: int, seed: int = 42, years: int = 3, today: datetime = None) -> dict:
+    """Dataset plus attendance events and audit entries; same seed, same data"""
+    rng = random.Random(seed)
+    n = sizes(rows)
+    today = (today or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = today - timedelta(days=365 * years)
+    span_days = (today - first_day).days
+
+    def day(offset: int) -> str:
+        return (first_day + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+    employees = [{
+        'id': i,
+        'name': f"Employee {i}",
+        'age': rng.randint(18, 65),
+        'position': rng.choice(POSITIONS),
+        'salary': float(rng.randrange(25_000, 90_000, 500)),
+        'shift': rng.choice(SHIFTS),
+        'hire_date': day(rng.randrange(span_days)),
+        'warehouse_id': rng.randint(1, n['warehouses'])
+    } for i in range(1, n['employees'] + 1)]
+
+    inventory = [{
+        'id': i,
+        'name': f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+        'quantity': rng.randint(0, 500),
+        'price': round(rng.uniform(1, 500), 2),
+        'min_stock': rng.choice((5, 10, 20, 50)),
+        'added_date': day(rng.randrange(span_days)),
+        'updated_date': day(span_days - rng.randrange(30))
+    } for i in range(1, n['inventory'] + 1)]
+
+    # Popular SKUs get most of the lines, like real order books
+    weights = [1.0 / (rank + 1) for rank in range(len(inventory))]
+    orders = []
+    for i in range(1, rows + 1):
+        lines = []
+        for item in rng.choices(inventory, weights=weights, k=rng.randint(1, 5)):
+            qty = rng.randint(1, 20)
+            lines.append({'item_id': item['id'], 'name': item['name'], 'quantity': qty,
+                          'price': item['price'], 'total': round(qty * item['price'], 2)})
+        created = day(int(span_days * (i / rows)))  # orders arrive in id order
+        orders.append({
+            'id': i,
+            'customer': f"Customer {rng.randint(1, max(10, rows // 10))}",
+            'items': lines,
+            'total': round(sum(l['total'] for l in lines), 2),
+            'total_qty': sum(l['quantity'] for l in lines),
+            'status': rng.choice(STATUSES),
+            'warehouse_id': rng.randint(1, n['warehouses']),
+            'created_date': created
+        })
+
+    # Badge events: IN/OUT pairs per (employee, workday), newest days first
+    attendance_events = []
+    offset = span_days
+    while len(attendance_events) < n['attendance_events'] and offset > 0:
+        offset -= 1
+        date = first_day + timedelta(days=offset)
+        if date.weekday() >= 5:
+            continue
+        for emp in employees:
+            start = date + timedelta(hours=rng.choice((6, 7, 8, 14, 22)), minutes=rng.randint(0, 20))
+            hours = rng.uniform(7.5, 10)
+            attendance_events.append({'employee_id': emp['id'], 'event': 'IN', 'timestamp': start.isoformat()})
+            attendance_events.append({'employee_id': emp['id'], 'event': 'OUT',
+                                      'timestamp': (start + timedelta(hours=hours)).isoformat()})
+            if len(attendance_events) >= n['attendance_events']:
+                break
+
+    audit = [{
+        'timestamp': (first_day + timedelta(seconds=int(span_days * 86400 * (i / n['audit'])))).isoformat(),
+        'action': rng.choice(ACTIONS),
+        'module': rng.choice(MODULES),
+        'record_id': rng.randint(1, rows),
+        'user': rng.choice(('admin', 'manager', 'worker')),
+        'details': f"synthetic change {i}"
+    } for i in range(n['audit'])]
+
+    return {
+        'data': {
+            'employees': employees,
+            'inventory': inventory,
+            'orders': orders,
+            'shipments': [],
+            'shipment_events': [],
+            'order_lines': [],
+            'stock_levels': [],
+            'transfers': [],
+            'purchase_orders': []
+        },
+        'attendance_events': attendance_events,
+        'audit': audit,
+        'warehouses': [{'id': w, 'name': f"Site {w}", 'location': f"Zone {w}", 'capacity': 1_000_000}
+                       for w in range(1, n['warehouses'] + 1)]
+    }
+
+
+def write(dataset: dict, out_dir: str):
+    """Write warehouse_data.json, audit.json, warehouses.json and badge_events.jsonl"""
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "warehouse_data.json"), 'w') as f:
+        json.dump(dataset['data'], f, indent=2)
+    with open(os.path.join(out_dir, "audit.json"), 'w') as f:
+        json.dump(dataset['audit'], f, indent=2)
+    with open(os.path.join(out_dir, "warehouses.json"), 'w') as f:
+        json.dump(dataset['warehouses'], f, indent=2)
+    with open(os.path.join(out_dir, "badge_events.jsonl"), 'w') as f:
+        for event in dataset['attendance_events']:
+            f.write(json.dumps(event) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded synthetic warehouse dataset")
+    parser.add_argument("--scale", default="10k", help="order rows: 1k, 10k, 100k, 1m, 10m or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--out", required=True, help="directory to write the data files into")
+    args = parser.parse_args()
+
+    rows = parse_scale(args.scale)
+    dataset = generate(rows, seed=args.seed, years=args.years)
+    write(dataset, args.out)
+    print(f"✅ {rows:,} orders, " + ", ".join(f"{len(v):,} {k}" for k, v in dataset['data'].items() if v)
+          + f", {len(dataset['attendance_events']):,} badge events, {len(dataset['audit']):,} audit entries"
+          + f" -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
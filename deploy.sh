@@ -4,6 +4,12 @@ echo "🚀 Deploying Industrial Warehouse System v4.0..."
 # Install dependencies (minimal - no database needed)
 pip install -r requirements.txt
 
+# Performance gate: fail the deploy if hot paths regressed against the latest
+# recorded baseline (record one with: python benchmarks/regression_gate.py record)
+if [ "${SKIP_PERF_GATE:-0}" != "1" ] && ls benchmarks/baselines/*.json >/dev/null 2>&1; then
+    python benchmarks/regression_gate.py check || { echo "❌ Performance regression - deploy aborted"; exit 1; }
+fi
+
 # Start production
 streamlit run app.py --server.port 8080 --server.address 0.0.0.0
 
@@ -5,50 +5,489 @@ Features: Backup, Logging, Search, CSV Export, Error Handling, Authentication, A
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 import json
+import mmap
 import csv
 import os
+import queue
 import shutil
+import abc
+import atexit
+import builtins
+import functools
+import inspect
+import io
+import re
+import sys
+import asyncio
+import smtplib
+import struct
+from email.message import EmailMessage
 import hashlib
+import heapq
+import hmac
+import secrets
+import threading
+import time
+from array import array
+import bisect
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from contextlib import contextmanager
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows: locks only serialize threads of this process
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # attendance analytics fall back to pure-Python columns
+    np = None
+
+class CapacityCalendar:
+    """Per-warehouse, per-weekday, per-hour order capacity (units/hour)
+    
+    capacity_calendar.json layers overrides from general to specific:
+        {"default": 30,
+         "hours": {"14": 50, ...},                    # every site, every day
+         "weekdays": {"Sat": {"15": 40}},             # every site, that weekday
+         "warehouses": {"2": {"default": 20, "hours": {...}, "weekdays": {...}}},
+         "seasons": [{"name": "Festive", "start": "10-15", "end": "11-15", "factor": 1.5}]}
+    
+    A site "default" only replaces the global default; global hour/weekday
+    overrides still apply to that site unless it overrides the same hour.
+    Everything except seasons is resolved once into a dense array indexed by
+    (site row, weekday, hour), so limit() on the order path is O(1).
+    
+    The file is hand-edited: entries that don't parse (unknown weekday, hour
+    outside 0-23, non-numeric limit, ...) are skipped with a warning and the
+    built-in defaults cover what they would have set.
+    """
+    
+    WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+    
+    def __init__(self, config_file="capacity_calendar.json", hourly_limits: Dict = None,
+                 default_limit: int = 30):
+        self.config_file = config_file
+        self.default_limit = default_limit
+        self.config = {'default': default_limit,
+                       'hours': {str(h): v for h, v in (hourly_limits or {}).items()}}
+        if os.path.exists(config_file):
+            try:
+                with open(config_file, 'r') as f:
+                    config = json.load(f)
+                if isinstance(config, dict):
+                    self.config = config
+                else:
+                    self._skip("the whole file (not a JSON object)")
+            except (json.JSONDecodeError, IOError) as e:
+                self._skip(f"the whole file ({e})")
+        self.rebuild()
+    
+    def _skip(self, what: str):
+        print(f"⚠️ {self.config_file}: ignoring {what}")
+    
+    def _number(self, value, what: str, low: int = 0, high: int = None) -> Optional[int]:
+        """int(value) if it lies in low..high, else None (and a warning)"""
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            number = None
+        if number is None or number < low or (high is not None and number > high):
+            self._skip(f"{what} {value!r}")
+            return None
+        return number
+    
+    def _hours(self, layer, where: str) -> Dict[int, int]:
+        """{"14": 50, ...} -> {14: 50, ...}, dropping entries that don't parse"""
+        if not isinstance(layer, dict):
+            if layer is not None:
+                self._skip(f"{where} (not an object)")
+            return {}
+        hours = {}
+        for h, v in layer.items():
+            hour = self._number(h, f"{where} hour", 0, 23)
+            limit = self._number(v, f"{where}[{h}] limit")
+            if hour is not None and limit is not None:
+                hours[hour] = limit
+        return hours
+    
+    def _weekdays(self, layer, where: str) -> Dict[int, Dict[int, int]]:
+        """{"Sat": {...}} -> {5: {...}}, dropping unknown weekday names"""
+        if not isinstance(layer, dict):
+            if layer is not None:
+                self._skip(f"{where} (not an object)")
+            return {}
+        days = {}
+        for name, hours in layer.items():
+            if name not in self.WEEKDAYS:
+                self._skip(f"{where} weekday {name!r}")
+                continue
+            days[self.WEEKDAYS.index(name)] = self._hours(hours, f"{where}.{name}")
+        return days
+    
+    def _sites(self, layer) -> Dict[int, Dict]:
+        """{"2": {...}} -> {2: {...}}, dropping bad warehouse ids and non-object layers"""
+        if not isinstance(layer, dict):
+            if layer is not None:
+                self._skip("warehouses (not an object)")
+            return {}
+        sites = {}
+        for wid, site in layer.items():
+            site_id = self._number(wid, "warehouse id", 1)
+            if site_id is None:
+                continue
+            if not isinstance(site, dict):
+                self._skip(f"warehouses.{wid} (not an object)")
+                continue
+            sites[site_id] = site
+        return sites
+    
+    def _season_list(self, layer) -> List[Tuple[str, str, float]]:
+        """[(start, end, factor)] for seasons with valid MM-DD dates and a numeric factor"""
+        if not isinstance(layer, list):
+            if layer is not None:
+                self._skip("seasons (not a list)")
+            return []
+        seasons = []
+        for season in layer:
+            try:
+                start, end = season['start'], season['end']
+                for day in (start, end):
+                    datetime.strptime(f"2000-{day}", "%Y-%m-%d")  # leap year: 02-29 is valid
+                seasons.append((start, end, float(season.get('factor', 1.0))))
+            except (TypeError, KeyError, ValueError, AttributeError):
+                self._skip(f"season {season!r}")
+        return seasons
+    
+    def rebuild(self):
+        """Resolve the layered config into the dense lookup array"""
+        cfg = self.config
+        sites = self._sites(cfg.get('warehouses'))
+        self._rows = {wid: row for row, wid in enumerate(sites, start=1)}
+        self._limits = array('i', [0] * ((len(sites) + 1) * 7 * 24))
+        self._defaults = [0] * (len(sites) + 1)   # site row -> its default (non-peak) limit
+        base_default = self._number(cfg.get('default', self.default_limit), "default")
+        if base_default is None:
+            base_default = self.default_limit
+        base_hours = self._hours(cfg.get('hours'), "hours")
+        base_days = self._weekdays(cfg.get('weekdays'), "weekdays")
+        
+        layers = [(0, '', {})] + [(self._rows[wid], f"warehouses.{wid}.", site) for wid, site in sites.items()]
+        for row, where, site in layers:
+            default = base_default
+            if 'default' in site:
+                default = self._number(site['default'], f"{where}default")
+                if default is None:
+                    default = base_default
+            self._defaults[row] = default
+            site_hours = self._hours(site.get('hours'), f"{where}hours")
+            site_days = self._weekdays(site.get('weekdays'), f"{where}weekdays")
+            for day in range(7):
+                for hour in range(24):
+                    limit = default
+                    for layer in (base_hours, base_days.get(day, {}), site_hours, site_days.get(day, {})):
+                        limit = layer.get(hour, limit)
+                    self._limits[(row * 7 + day) * 24 + hour] = limit
+        
+        self._seasons = self._season_list(cfg.get('seasons'))
+        self._season_cache = {}
+    
+    def season_factor(self, when: datetime) -> float:
+        """Multiplier from any season covering this date (cached per day)"""
+        day = when.strftime("%m-%d")
+        factor = self._season_cache.get(day)
+        if factor is None:
+            factor = 1.0
+            for start, end, f in self._seasons:
+                inside = start <= day <= end if start <= end else (day >= start or day <= end)
+                if inside:
+                    factor *= f
+            self._season_cache[day] = factor
+        return factor
+    
+    def limit(self, warehouse_id: int = None, when: datetime = None) -> int:
+        """Units per hour allowed at a site for the hour containing when"""
+        when = when or datetime.now()
+        row = self._rows.get(warehouse_id, 0)
+        limit = self._limits[(row * 7 + when.weekday()) * 24 + when.hour]
+        return int(limit * self.season_factor(when)) if self._seasons else limit
+    
+    def is_peak(self, warehouse_id: int = None, when: datetime = None) -> bool:
+        """True when an hour/weekday override sets this hour's limit instead of the site default"""
+        when = when or datetime.now()
+        row = self._rows.get(warehouse_id, 0)
+        return self._limits[(row * 7 + when.weekday()) * 24 + when.hour] != self._defaults[row]
+    
+    def week(self, warehouse_id: int = None) -> List[Dict]:
+        """7 x 24 grid of base limits for display"""
+        row = self._rows.get(warehouse_id, 0)
+        return [
+            {'day': name, **{f"{h:02d}": self._limits[(row * 7 + d) * 24 + h] for h in range(24)}}
+            for d, name in enumerate(self.WEEKDAYS)
+        ]
+    
+    def learn(self, orders: List[Dict], percentile: float = 0.9, headroom: float = 1.1,
+              min_samples: int = 3) -> Dict:
+        """Derive per-site weekday/hour limits from admitted throughput in the order log
+        
+        For every (site, weekday, hour) with at least min_samples observed hours,
+        the limit becomes the given percentile of units admitted per hour, plus
+        headroom. Returns the learned layer (also merged into config).
+        """
+        per_hour = {}   # (wid, "YYYY-MM-DD HH") -> units
+        for order in orders:
+            slot = order.get('admitted_hour')
+            if slot and order.get('status') != 'Cancelled':
+                key = (order.get('warehouse_id'), slot)
+                per_hour[key] = per_hour.get(key, 0) + order.get('total_qty', 0)
+        
+        samples = {}    # (wid, weekday, hour) -> [units]
+        for (wid, slot), units in per_hour.items():
+            when = datetime.strptime(slot, "%Y-%m-%d %H")
+            samples.setdefault((wid, when.weekday(), when.hour), []).append(units)
+        
+        learned = {}
+        for (wid, day, hour), values in samples.items():
+            if wid is None or len(values) < min_samples:
+                continue
+            values.sort()
+            observed = values[min(len(values) - 1, int(percentile * (len(values) - 1) + 0.5))]
+            site = learned.setdefault(str(wid), {'weekdays': {}})
+            site['weekdays'].setdefault(self.WEEKDAYS[day], {})[str(hour)] = max(1, int(observed * headroom + 0.5))
+        
+        sites = self.config.setdefault('warehouses', {})
+        for wid, layer in learned.items():
+            target = sites.setdefault(wid, {}).setdefault('weekdays', {})
+            for day, hours in layer['weekdays'].items():
+                target.setdefault(day, {}).update(hours)
+        self.rebuild()
+        return learned
+    
+    def save(self) -> Tuple[bool, str]:
+        """Persist the calendar config"""
+        try:
+            with open(self.config_file, 'w') as f:
+                json.dump(self.config, f, indent=2)
+            return True, "✅ Capacity calendar saved"
+        except Exception as e:
+            return False, f"❌ Error saving capacity calendar: {str(e)}"
+
+
 class PeakHourManager:
-    """Handles 300% order spikes during 2-5PM (14:00-17:00)"""
+    """Handles 300% order spikes during 2-5PM (14:00-17:00)
     
-    def __init__(self):
-        # Peak hour capacity limits by hour
+    Admission control: every (warehouse, clock hour) is a token bucket whose
+    size comes from the CapacityCalendar. Orders that fit are admitted and
+    consume tokens; orders that don't are deferred to a FIFO queue and
+    released into later hours by drain(). Consumed units are counted per
+    bucket as orders are admitted, so capacity checks never rescan the
+    order list. One manager serves every session thread, so buckets, queue
+    and counters are only touched under self._lock.
+    """
+    
+    def __init__(self, default_limit: int = 30, max_queue: int = 500,
+                 calendar_file: str = "capacity_calendar.json"):
+        # Peak hour capacity limits by hour (calendar defaults when no calendar file exists)
         self.hourly_limits = {
             14: 50,   # 2-3 PM: 50 units
             15: 75,   # 3-4 PM: 75 units (peak)
             16: 100,  # 4-5 PM: 100 units (peak peak)
             17: 80    # 5-6 PM: 80 units
         }
+        self.default_limit = default_limit
+        self.calendar = CapacityCalendar(calendar_file, self.hourly_limits, default_limit)
+        self.max_queue = max_queue
+        self._consumed = {}         # (warehouse_id, "YYYY-MM-DD HH") -> units admitted
+        self._queue = deque()       # (order_id, units, warehouse_id, deferred_at)
+        self._queued_ids = set()
+        self._primed = set()        # warehouse scopes already counted (None = every site)
+        # Monotonic (exported as *_total): released counts drained orders the caller admitted
+        self.decisions = {'admitted': 0, 'deferred': 0, 'rejected': 0, 'released': 0, 'requeued': 0}
+        self._lock = threading.RLock()  # re-entrant: admit/metrics call consumed() etc.
+    
+    @staticmethod
+    def slot(now: datetime = None) -> str:
+        """Bucket key for the clock hour containing now"""
+        return (now or datetime.now()).strftime("%Y-%m-%d %H")
+    
+    def get_current_capacity(self, now: datetime = None, warehouse_id: int = None) -> int:
+        """Returns hourly capacity limit for the site based on current time"""
+        return self.calendar.limit(warehouse_id, now)
+    
+    def is_peak_hour(self, now: datetime = None, warehouse_id: int = None) -> bool:
+        """Check if the hour has a peak limit in the site's capacity calendar"""
+        return self.calendar.is_peak(warehouse_id, now)
+    
+    def prime(self, orders: List[Dict], warehouse_id: int = None):
+        """Rebuild hourly counters and the deferral queue from saved orders
+        
+        Runs once per process per warehouse scope: orders is the order list
+        loaded for that scope (one site's shard, or every site for None).
+        """
+        with self._lock:
+            self._prime(orders, warehouse_id)
+    
+    def _prime(self, orders: List[Dict], warehouse_id: int = None):
+        if None in self._primed or warehouse_id in self._primed:
+            return
+        for order in orders:
+            site = order.get('warehouse_id')
+            if (warehouse_id is not None and site != warehouse_id) or site in self._primed:
+                continue
+            slot = order.get('admitted_hour')
+            if slot and order.get('admission') == 'Admitted':
+                key = (order.get('warehouse_id'), slot)
+                self._consumed[key] = self._consumed.get(key, 0) + order.get('total_qty', 0)
+            elif order.get('admission') == 'Deferred' and order.get('status') == 'Pending':
+                self._queue.append((order['id'], order.get('total_qty', 0), order.get('warehouse_id'),
+                                    order.get('deferred_at', '')))
+                self._queued_ids.add(order['id'])
+        self._primed.add(warehouse_id)
+    
+    def consumed(self, now: datetime = None, warehouse_id: int = None) -> int:
+        """Units admitted at the site in the current hour"""
+        with self._lock:
+            return self._consumed.get((warehouse_id, self.slot(now)), 0)
+    
+    def tokens(self, now: datetime = None, warehouse_id: int = None) -> int:
+        """Units still admissible at the site in the current hour"""
+        with self._lock:
+            return max(0, self.get_current_capacity(now, warehouse_id) - self.consumed(now, warehouse_id))
+    
+    def _take(self, units: int, now: datetime = None, warehouse_id: int = None) -> bool:
+        """Consume units from the site's current bucket (caller holds self._lock)"""
+        key = (warehouse_id, self.slot(now))
+        used = self._consumed.get(key, 0)
+        # An order bigger than a whole bucket still gets through an untouched hour
+        if used + units > self.get_current_capacity(now, warehouse_id) and used > 0:
+            return False
+        self._consumed[key] = used + units
+        return True
+    
+    def admit(self, order_id: int, units: int, now: datetime = None,
+              warehouse_id: int = None) -> Tuple[str, str]:
+        """Returns (decision, message); decision is 'Admitted', 'Deferred' or 'Rejected'"""
+        with self._lock:
+            # Deferred orders for the same site go first: a new order may not jump the queue
+            waiting = any(q[2] == warehouse_id for q in self._queue)
+            if not waiting and self._take(units, now, warehouse_id):
+                self.decisions['admitted'] += 1
+                return 'Admitted', (f"✅ Admitted {units} units ({self.consumed(now, warehouse_id)}/"
+                                    f"{self.get_current_capacity(now, warehouse_id)} this hour)")
+            if len(self._queue) >= self.max_queue:
+                self.decisions['rejected'] += 1
+                return 'Rejected', f"❌ Capacity reached and {len(self._queue)} orders already queued - try later"
+            self._queue.append((order_id, units, warehouse_id, (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")))
+            self._queued_ids.add(order_id)
+            self.decisions['deferred'] += 1
+            return 'Deferred', f"⏳ Hourly capacity reached - order queued (position {len(self._queue)})"
+    
+    def drain(self, now: datetime = None, warehouse_id: int = None) -> List[Tuple]:
+        """Release queued orders (FIFO per site) into the current hour's buckets
+        
+        Only warehouse_id's queue is drained when given. Returns the drained
+        queue entries: report the ones the caller admitted via mark_released()
+        and hand back the ones it could not fulfil via requeue().
+        """
+        with self._lock:
+            released, blocked, kept = [], set(), deque()
+            for entry in self._queue:
+                site = entry[2]
+                if warehouse_id is not None and site != warehouse_id:
+                    kept.append(entry)
+                elif site not in blocked and self._take(entry[1], now, site):
+                    self._queued_ids.discard(entry[0])
+                    released.append(entry)
+                else:
+                    blocked.add(site)
+                    kept.append(entry)
+            self._queue = kept
+            return released
+    
+    def mark_released(self, entries: List[Tuple]):
+        """Count drained entries that were actually admitted"""
+        with self._lock:
+            self.decisions['released'] += len(entries)
+    
+    def requeue(self, entries: List[Tuple], now: datetime = None):
+        """Put drained entries back at the head of the queue and refund their units"""
+        with self._lock:
+            for entry in reversed(entries):
+                order_id, units, warehouse_id, _ = entry
+                key = (warehouse_id, self.slot(now))
+                self._consumed[key] = max(0, self._consumed.get(key, 0) - units)
+                self._queue.appendleft(entry)
+                self._queued_ids.add(order_id)
+            self.decisions['requeued'] += len(entries)
+    
+    def forget(self, order_id: int, units: int = 0, slot: str = None, warehouse_id: int = None):
+        """Drop a queued order, or hand an admitted order's units back to its hour"""
+        with self._lock:
+            if order_id in self._queued_ids:
+                self._queue = deque(q for q in self._queue if q[0] != order_id)
+                self._queued_ids.discard(order_id)
+            elif units:
+                key = (warehouse_id, slot or self.slot())
+                self._consumed[key] = max(0, self._consumed.get(key, 0) - units)
+    
+    def queue_depth(self, warehouse_id: int = None) -> int:
+        """Orders waiting, at one site or overall"""
+        with self._lock:
+            if warehouse_id is None:
+                return len(self._queue)
+            return sum(1 for q in self._queue if q[2] == warehouse_id)
+    
+    def active_sites(self, now: datetime = None) -> set:
+        """Sites with units admitted this hour or orders waiting"""
+        slot = self.slot(now)
+        with self._lock:
+            return {wid for wid, s in self._consumed if s == slot} | {q[2] for q in self._queue}
     
-    def get_current_capacity(self) -> int:
-        """Returns hourly capacity limit based on current time"""
-        hour = datetime.now().hour
-        return self.hourly_limits.get(hour, 30)  # Default 30 units outside peak hours
+    def decision_counts(self) -> Dict[str, int]:
+        """Snapshot of the admission decision counters"""
+        with self._lock:
+            return dict(self.decisions)
     
-    def is_peak_hour(self) -> bool:
-        """Check if current time is in peak hours"""
-        hour = datetime.now().hour
-        return hour in self.hourly_limits
+    def metrics(self, now: datetime = None, warehouse_id: int = None) -> Dict:
+        """Admission decisions, plus queue depth and current-hour utilization at a site
+        (queue figures cover every site when warehouse_id is None)"""
+        with self._lock:
+            capacity = self.get_current_capacity(now, warehouse_id)
+            consumed = self.consumed(now, warehouse_id)
+            waiting = [q for q in self._queue if warehouse_id is None or q[2] == warehouse_id]
+            return {
+                **self.decisions,
+                'queue_depth': len(waiting),
+                'queued_units': sum(q[1] for q in waiting),
+                'hour_capacity': capacity,
+                'hour_consumed': consumed,
+                'utilization_pct': round(consumed / capacity * 100, 1) if capacity else 0.0
+            }
     
-    def get_peak_hour_warning(self, current_orders: List[Dict]) -> Tuple[bool, str]:
+    def get_peak_hour_warning(self, current_orders: List[Dict] = None,
+                              warehouse_id: int = None) -> Tuple[bool, str]:
         """
         Returns (is_near_capacity, warning_message)
         """
-        hour = datetime.now().hour
-        if hour not in self.hourly_limits:
+        if not self.is_peak_hour(warehouse_id=warehouse_id):
             return False, ""
+        if current_orders is not None:
+            self.prime(current_orders)
         
-        capacity = self.hourly_limits[hour]
-        total_ordered = sum(o.get('total_qty', 0) for o in current_orders 
-                           if o.get('created_date', '').startswith(datetime.now().strftime("%Y-%m-%d")))
+        capacity = self.get_current_capacity(warehouse_id=warehouse_id)
+        total_ordered = self.consumed(warehouse_id=warehouse_id)
+        waiting = self.queue_depth(warehouse_id)
+        queued = f", {waiting} orders queued" if waiting else ""
         
-        if total_ordered >= capacity * 0.8:  # 80% capacity
-            return True, f"⏰ PEAK HOUR ALERT: {total_ordered}/{capacity} capacity used ({int(total_ordered/capacity*100)}%)"
+        if capacity <= 0:
+            return True, f"⏰ PEAK HOUR ALERT: site closed to new orders this hour{queued}"
+        if total_ordered >= capacity * 0.8 or waiting:  # 80% capacity
+            return True, f"⏰ PEAK HOUR ALERT: {total_ordered}/{capacity} capacity used ({int(total_ordered/capacity*100)}%){queued}"
         
         return False, ""
 
@@ -124,8 +563,8 @@ def validate_inventory_movement(inventory: List[Dict], item_id: int, qty: int,
     }
 
 
-def calculate_inventory_metrics(inventory: List[Dict]) -> Dict:
-    """Calculate key inventory metrics"""
+def calculate_inventory_metrics(inventory: List[Dict], low_ids: set = None) -> Dict:
+    """Calculate key inventory metrics (low_ids: StockLedger.low_stock_ids(), skips the rescan)"""
     if not inventory:
         return {
             'total_items': 0,
@@ -135,7 +574,10 @@ def calculate_inventory_metrics(inventory: List[Dict]) -> Dict:
         }
     
     total_value = sum(item['quantity'] * item['price'] for item in inventory)
-    low_stock = len([i for i in inventory if i['quantity'] < i.get('min_stock', 10)])
+    if low_ids is not None:
+        low_stock = len(low_ids)
+    else:
+        low_stock = len([i for i in inventory if i['quantity'] < i.get('min_stock', 10)])
     
     return {
         'total_items': len(inventory),
@@ -200,8 +642,8 @@ class BackupManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_file = f"{self.backup_dir}/{filename.split('.')[0]}_{timestamp}.json"
             
-            with open(backup_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with profiler.open(backup_file, 'wb') as f:
+                codec.dump(data, f)
             
             return backup_file
         except Exception as e:
@@ -231,15 +673,15 @@ class BackupManager:
             if not os.path.exists(backup_file):
                 return False, "❌ Backup file not found"
             
-            with open(backup_file, 'r') as f:
-                data = json.load(f)
+            with profiler.open(backup_file, 'rb') as f:
+                data = codec.load(f)
             
             # Create safety backup of current file
             if os.path.exists(target_file):
                 shutil.copy(target_file, f"{target_file}.safety_backup")
             
-            with open(target_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with profiler.open(target_file, 'wb') as f:
+                codec.dump(data, f)
             
             return True, f"✅ Restored from {os.path.basename(backup_file)}"
         except json.JSONDecodeError:
@@ -262,8 +704,8 @@ class AuditLogger:
         """Create audit log file if it doesn't exist"""
         try:
             if not os.path.exists(self.log_file):
-                with open(self.log_file, 'w') as f:
-                    json.dump([], f)
+                with profiler.open(self.log_file, 'wb') as f:
+                    codec.dump([], f)
         except Exception as e:
             print(f"Error initializing log: {e}")
     
@@ -280,14 +722,46 @@ class AuditLogger:
                 'details': details
             }
             
-            with open(self.log_file, 'r') as f:
-                logs = json.load(f)
-            
-            logs.append(log_entry)
+            with _file_lock(self.log_file):
+                with profiler.open(self.log_file, 'rb') as f:
+                    logs = codec.load(f)
+                
+                logs.append(log_entry)
+                
+                with profiler.open(self.log_file, 'wb') as f:
+                    codec.dump(logs, f)
             
-            with open(self.log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
+            audit_writes.inc()
+            return True
+        except Exception as e:
+            print(f"Logging error: {e}")
+            return False
+    
+    def log_events(self, events: List[Dict]) -> bool:
+        """Log a batch of domain events with a single read/write of the log file
+        
+        The read-modify-write holds the log's file lock, so it can't interleave
+        with log_action() or another worker process and drop entries.
+        """
+        try:
+            with _file_lock(self.log_file):
+                with profiler.open(self.log_file, 'rb') as f:
+                    logs = codec.load(f)
+                
+                for event in events:
+                    logs.append({
+                        'timestamp': event['timestamp'],
+                        'action': event['action'],
+                        'module': event['module'],
+                        'record_id': event['record_id'],
+                        'user': event['user'],
+                        'details': event['details']
+                    })
+                
+                with profiler.open(self.log_file, 'wb') as f:
+                    codec.dump(logs, f)
             
+            audit_writes.inc(len(events))
             return True
         except Exception as e:
             print(f"Logging error: {e}")
@@ -296,8 +770,8 @@ class AuditLogger:
     def get_audit_trail(self, module: str = None, action: str = None) -> List[Dict]:
         """Retrieve audit logs with optional filtering"""
         try:
-            with open(self.log_file, 'r') as f:
-                logs = json.load(f)
+            with profiler.open(self.log_file, 'rb') as f:
+                logs = codec.load(f)
             
             filtered = logs
             if module:
@@ -370,9 +844,11 @@ def filter_inventory_by_price(inventory: List[Dict], min_price: float = 0,
 
 
 def filter_inventory_by_stock_status(inventory: List[Dict], 
-                                     status: str = "low") -> List[Dict]:
+                                     status: str = "low", low_ids: set = None) -> List[Dict]:
     """Filter inventory by stock status (low, medium, high)"""
     if status == "low":
+        if low_ids is not None:
+            return [i for i in inventory if i['id'] in low_ids]
         return [i for i in inventory if i.get('quantity', 0) < i.get('min_stock', 10)]
     elif status == "medium":
         return [i for i in inventory 
@@ -413,8 +889,17 @@ class AuthManager:
         'worker': ['read']
     }
     
-    def __init__(self, users_file="users.json"):
+    # Tunable KDF cost. scrypt n=2^14 costs ~50ms / 16MB per hash, about a fifth
+    # of PBKDF2 at 600k iterations for comparable strength; every login pays it.
+    # WAREHOUSE_SCRYPT_LOG_N raises n on faster hardware (never below 2^14).
+    SCRYPT_PARAMS = {'n': 2 ** max(14, int(os.environ.get('WAREHOUSE_SCRYPT_LOG_N', 14))), 'r': 8, 'p': 1}
+    PBKDF2_ITERATIONS = 600000
+    
+    def __init__(self, users_file="users.json", kdf: str = "scrypt"):
         self.users_file = users_file
+        self.kdf = kdf if kdf in ('scrypt', 'pbkdf2_sha256') else 'scrypt'
+        self._users = None          # username -> user dict
+        self._users_stamp = None    # (mtime_ns, size) of the file the cache was built from
         self._initialize_users()
     
     def _initialize_users(self):
@@ -446,25 +931,97 @@ class AuthManager:
         except Exception as e:
             print(f"Error initializing users: {e}")
     
+    # ----- User store (indexed by username, cached until the file changes) -----
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(self.users_file)
+            return info.st_mtime_ns, info.st_size
+        except OSError:
+            return None
+    
+    def _load_users(self) -> Dict[str, Dict]:
+        """Return the username -> user index, re-reading the file only if it changed"""
+        stamp = self._file_stamp()
+        if self._users is None or stamp != self._users_stamp:
+            with open(self.users_file, 'r') as f:
+                users = json.load(f)
+            self._users = {u['username']: u for u in users}
+            self._users_stamp = stamp
+        return self._users
+    
+    def _save_users(self, users: Dict[str, Dict]):
+        """Persist the user index and refresh the cache stamp"""
+        with open(self.users_file, 'w') as f:
+            json.dump(list(users.values()), f, indent=2)
+        self._users = users
+        self._users_stamp = self._file_stamp()
+    
+    # ----- Password hashing -----
     def _hash_password(self, password: str) -> str:
-        """Hash password using SHA256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password with a salted KDF, encoded as 'algo$params$salt$hash'"""
+        salt = secrets.token_bytes(16)
+        if self.kdf == 'scrypt':
+            p = self.SCRYPT_PARAMS
+            digest = hashlib.scrypt(password.encode(), salt=salt, n=p['n'], r=p['r'], p=p['p'],
+                                    maxmem=128 * p['r'] * p['n'] * 2)
+            return f"scrypt${p['n']}:{p['r']}:{p['p']}${salt.hex()}${digest.hex()}"
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, self.PBKDF2_ITERATIONS)
+        return f"pbkdf2_sha256${self.PBKDF2_ITERATIONS}${salt.hex()}${digest.hex()}"
+    
+    def _verify_password(self, password: str, stored: str) -> bool:
+        """Check password against a stored hash (KDF or legacy unsalted SHA256)"""
+        try:
+            if '$' not in stored:
+                candidate = hashlib.sha256(password.encode()).hexdigest()
+                return hmac.compare_digest(candidate, stored)
+            
+            algo, params, salt_hex, digest_hex = stored.split('$')
+            salt = bytes.fromhex(salt_hex)
+            if algo == 'scrypt':
+                n, r, p = (int(x) for x in params.split(':'))
+                candidate = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                                           maxmem=128 * r * n * 2)
+            elif algo == 'pbkdf2_sha256':
+                candidate = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, int(params))
+            else:
+                return False
+            return hmac.compare_digest(candidate.hex(), digest_hex)
+        except (ValueError, TypeError):
+            return False
+    
+    def _needs_rehash(self, stored: str) -> bool:
+        """True if stored hash is legacy, uses another KDF or outdated parameters
+        
+        authenticate() rehashes on the next successful login, so PBKDF2 and
+        SHA256 accounts move to the (cheaper to verify) configured scrypt cost.
+        """
+        if self.kdf == 'scrypt':
+            p = self.SCRYPT_PARAMS
+            return not stored.startswith(f"scrypt${p['n']}:{p['r']}:{p['p']}$")
+        return not stored.startswith(f"pbkdf2_sha256${self.PBKDF2_ITERATIONS}$")
     
     def authenticate(self, username: str, password: str) -> Tuple[bool, str, str]:
         """Authenticate user, returns (success, message, role)"""
         try:
-            with open(self.users_file, 'r') as f:
-                users = json.load(f)
+            users = self._load_users()
             
-            user = next((u for u in users if u['username'] == username), None)
+            user = users.get(username)
             if not user:
+                login_attempts.labels('unknown_user').inc()
                 return False, "❌ User not found", ""
             
-            if user['password'] == self._hash_password(password):
+            if self._verify_password(password, user['password']):
+                # Transparently upgrade legacy / weaker hashes
+                if self._needs_rehash(user['password']):
+                    user['password'] = self._hash_password(password)
+                    self._save_users(users)
+                login_attempts.labels('success').inc()
                 return True, f"✅ Welcome {user['name']}", user['role']
             else:
+                login_attempts.labels('bad_password').inc()
                 return False, "❌ Incorrect password", ""
         except Exception as e:
+            login_attempts.labels('error').inc()
             return False, f"❌ Auth error: {str(e)}", ""
     
     def has_permission(self, role: str, action: str) -> bool:
@@ -475,12 +1032,10 @@ class AuthManager:
                      fullname: str) -> Tuple[bool, str]:
         """Register a new user, returns (success, message)"""
         try:
-            with open(self.users_file, 'r') as f:
-                users = json.load(f)
+            users = dict(self._load_users())
             
             # Check if user already exists
-            existing = next((u for u in users if u['username'] == username), None)
-            if existing:
+            if username in users:
                 return False, f"❌ Username '{username}' already exists"
             
             # Validate role
@@ -496,10 +1051,8 @@ class AuthManager:
                 'created_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
-            users.append(new_user)
-            
-            with open(self.users_file, 'w') as f:
-                json.dump(users, f, indent=2)
+            users[username] = new_user
+            self._save_users(users)
             
             return True, f"✅ User '{username}' registered successfully as {role.upper()}"
         except Exception as e:
@@ -508,23 +1061,21 @@ class AuthManager:
     def get_all_users(self) -> List[Dict]:
         """Get all user accounts (without passwords)"""
         try:
-            with open(self.users_file, 'r') as f:
-                users = json.load(f)
+            users = self._load_users()
             
             # Return users without passwords
-            return [{**u, 'password': '***'} for u in users]
+            return [{**u, 'password': '***'} for u in users.values()]
         except Exception as e:
             return []
     
     def delete_user(self, username: str) -> Tuple[bool, str]:
         """Delete a user account"""
         try:
-            with open(self.users_file, 'r') as f:
-                users = json.load(f)
+            users = dict(self._load_users())
             
             # Don't allow deleting the last admin
-            admin_count = len([u for u in users if u['role'] == 'admin'])
-            target_user = next((u for u in users if u['username'] == username), None)
+            admin_count = len([u for u in users.values() if u['role'] == 'admin'])
+            target_user = users.get(username)
             
             if not target_user:
                 return False, f"❌ User '{username}' not found"
@@ -533,10 +1084,8 @@ class AuthManager:
                 return False, "❌ Cannot delete the last admin account"
             
             # Remove user
-            users = [u for u in users if u['username'] != username]
-            
-            with open(self.users_file, 'w') as f:
-                json.dump(users, f, indent=2)
+            del users[username]
+            self._save_users(users)
             
             return True, f"✅ User '{username}' deleted successfully"
         except Exception as e:
@@ -546,15 +1095,14 @@ class AuthManager:
                        new_password: str) -> Tuple[bool, str]:
         """Change user password"""
         try:
-            with open(self.users_file, 'r') as f:
-                users = json.load(f)
+            users = self._load_users()
             
-            user = next((u for u in users if u['username'] == username), None)
+            user = users.get(username)
             if not user:
                 return False, f"❌ User '{username}' not found"
             
             # Verify old password
-            if user['password'] != self._hash_password(old_password):
+            if not self._verify_password(old_password, user['password']):
                 return False, "❌ Current password is incorrect"
             
             if len(new_password) < 6:
@@ -562,9 +1110,7 @@ class AuthManager:
             
             # Update password
             user['password'] = self._hash_password(new_password)
-            
-            with open(self.users_file, 'w') as f:
-                json.dump(users, f, indent=2)
+            self._save_users(users)
             
             return True, "✅ Password changed successfully"
         except Exception as e:
@@ -714,6 +1260,239 @@ class EmailAlertConfig:
             return False
 
 
+class AlertDispatcher:
+    """Sends email alerts from a persistent outbox without blocking the UI
+    
+    enqueue() only appends to the outbox file. An asyncio loop on a
+    background thread groups queued alerts of the same kind into one digest
+    once the oldest has waited digest_window seconds, sends at most
+    max_per_minute mails over one reused SMTP connection, and retries
+    failures with backoff ('retrying'). After max_attempts an alert is
+    marked 'failed' and no longer sent; the admin view lists it until
+    retry_failed() puts it back in the queue. Alerts survive restarts
+    because they stay in the outbox until sent.
+    
+    Point smtp_server/smtp_port at a local stand-in (e.g. aiosmtpd's
+    Controller on localhost:8025, use_tls false) to test end to end.
+    """
+    
+    OPEN_STATUSES = ('queued', 'retrying')
+    SUBJECTS = {
+        'low_stock': "⚠️ Low stock digest",
+        'payroll_due': "💰 Payroll due",
+        'peak_hours': "⏰ Peak hour capacity alerts"
+    }
+    
+    def __init__(self, config: EmailAlertConfig, outbox_file="email_outbox.json",
+                 digest_window: float = 60.0, max_per_minute: int = 10,
+                 idle_timeout: float = 120.0, max_attempts: int = 8, smtp_factory=smtplib.SMTP):
+        self.config = config
+        self.outbox_file = outbox_file
+        self.digest_window = digest_window
+        self.max_per_minute = max_per_minute
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts    # 8 attempts ~ 2 hours of backoff
+        self.smtp_factory = smtp_factory
+        self._lock = threading.Lock()
+        self._smtp = None
+        self._smtp_used = 0.0
+        self._tokens = float(max_per_minute)
+        self._refilled = time.monotonic()
+        self._thread = None
+        self._wake = None
+        self._loop = None
+        self.stats = {'queued': 0, 'sent_mails': 0, 'sent_alerts': 0, 'failures': 0, 'gave_up': 0,
+                      'connections': 0}
+    
+    # ----- Outbox -----
+    def _load(self) -> List[Dict]:
+        try:
+            with profiler.open(self.outbox_file, 'rb') as f:
+                return codec.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+    
+    def _save(self, outbox: List[Dict]):
+        # Keep everything still to send plus the last 200 sent/failed alerts for the admin view
+        sent = [a for a in outbox if a['status'] == 'sent'][-200:]
+        failed = [a for a in outbox if a['status'] == 'failed'][-200:]
+        outbox = [a for a in outbox if a['status'] in self.OPEN_STATUSES] + failed + sent
+        tmp = f"{self.outbox_file}.tmp"
+        with profiler.open(tmp, 'wb') as f:
+            codec.dump(outbox, f)
+        os.replace(tmp, self.outbox_file)
+    
+    def enqueue(self, kind: str, text: str) -> bool:
+        """Queue one alert line; False if alerts of this kind are switched off"""
+        cfg = self.config.get_config()
+        if not cfg.get('enabled') or not cfg.get('alerts', {}).get(kind, False):
+            return False
+        with self._lock:
+            outbox = self._load()
+            outbox.append({
+                'id': secrets.token_hex(6),
+                'kind': kind,
+                'text': text,
+                'created': time.time(),
+                'status': 'queued',
+                'attempts': 0,
+                'next_try': 0.0
+            })
+            self._save(outbox)
+        self.stats['queued'] += 1
+        self._ensure_running()
+        return True
+    
+    def on_events(self, events: List[Dict]):
+        """EventBus subscriber: events carrying an alert become outbox entries"""
+        for event in events:
+            if event.get('alert'):
+                self.enqueue(event.get('alert_kind', 'low_stock'), event['alert'])
+    
+    def pending(self) -> List[Dict]:
+        """Alerts still to be sent"""
+        return [a for a in self._load() if a['status'] in self.OPEN_STATUSES]
+    
+    def failed(self) -> List[Dict]:
+        """Alerts given up on after max_attempts"""
+        return [a for a in self._load() if a['status'] == 'failed']
+    
+    def retry_failed(self) -> int:
+        """Queue failed alerts again with a fresh attempt budget; returns how many"""
+        with self._lock:
+            outbox = self._load()
+            retried = 0
+            for alert in outbox:
+                if alert['status'] == 'failed':
+                    alert.update(status='queued', attempts=0, next_try=0.0)
+                    retried += 1
+            if retried:
+                self._save(outbox)
+        if retried:
+            self._ensure_running()
+        return retried
+    
+    # ----- Digests -----
+    def _due_digests(self, now: float, force: bool = False) -> List[Tuple[str, List[Dict]]]:
+        by_kind = {}
+        for alert in self._load():
+            if alert['status'] in self.OPEN_STATUSES and alert.get('next_try', 0) <= now:
+                by_kind.setdefault(alert['kind'], []).append(alert)
+        return [(kind, alerts) for kind, alerts in sorted(by_kind.items())
+                if force or now - min(a['created'] for a in alerts) >= self.digest_window]
+    
+    def _compose(self, cfg: Dict, kind: str, alerts: List[Dict]) -> EmailMessage:
+        msg = EmailMessage()
+        msg['Subject'] = f"{self.SUBJECTS.get(kind, 'Warehouse alert')} ({len(alerts)})"
+        msg['From'] = cfg.get('sender_email', '')
+        msg['To'] = ", ".join(cfg.get('recipients') or [cfg.get('sender_email', '')])
+        lines = [f"- {datetime.fromtimestamp(a['created']).strftime('%Y-%m-%d %H:%M')}  {a['text']}" for a in alerts]
+        msg.set_content("Warehouse Management System alerts\n\n" + "\n".join(lines) + "\n")
+        return msg
+    
+    # ----- SMTP (one pooled connection, used from worker threads one at a time) -----
+    def _connection(self, cfg: Dict):
+        if self._smtp is not None:
+            try:
+                if time.monotonic() - self._smtp_used < self.idle_timeout and self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self._close()
+        port = int(cfg.get('smtp_port', 587))
+        smtp = self.smtp_factory(cfg.get('smtp_server', 'localhost'), port, timeout=10)
+        if cfg.get('use_tls', port == 587):
+            smtp.starttls()
+        if cfg.get('sender_password') and cfg.get('use_tls', port == 587):
+            smtp.login(cfg.get('sender_email', ''), cfg['sender_password'])
+        self._smtp = smtp
+        self.stats['connections'] += 1
+        return smtp
+    
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+    
+    def _send(self, cfg: Dict, msg: EmailMessage):
+        self._connection(cfg).send_message(msg)
+        self._smtp_used = time.monotonic()
+    
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.max_per_minute, self._tokens + (now - self._refilled) * self.max_per_minute / 60)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+    
+    async def run_once(self, force: bool = False) -> int:
+        """Send every due digest the rate limit allows; returns mails sent"""
+        cfg = self.config.get_config()
+        now = time.time()
+        sent = 0
+        for kind, alerts in self._due_digests(now, force):
+            if not self._take_token():
+                break
+            ids = {a['id'] for a in alerts}
+            try:
+                await asyncio.to_thread(self._send, cfg, self._compose(cfg, kind, alerts))
+                status = 'sent'
+                sent += 1
+                self.stats['sent_mails'] += 1
+                self.stats['sent_alerts'] += len(alerts)
+            except Exception as e:
+                print(f"Email alert error: {e}")
+                status = 'retrying'
+                self.stats['failures'] += 1
+                await asyncio.to_thread(self._close)
+            with self._lock:
+                outbox = self._load()
+                for alert in outbox:
+                    if alert['id'] in ids:
+                        alert['attempts'] += 1
+                        alert['status'] = status
+                        if status == 'sent':
+                            alert['sent'] = now
+                        elif alert['attempts'] >= self.max_attempts:
+                            alert['status'] = 'failed'
+                            self.stats['gave_up'] += 1
+                        else:
+                            alert['next_try'] = now + min(3600, 30 * 2 ** alert['attempts'])
+                self._save(outbox)
+        return sent
+    
+    # ----- Background loop -----
+    async def _main(self):
+        self._wake = asyncio.Event()
+        while True:
+            await self.run_once()
+            if self._smtp is not None and time.monotonic() - self._smtp_used > self.idle_timeout:
+                await asyncio.to_thread(self._close)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=min(5.0, self.digest_window))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+    
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            def run():
+                self._loop = asyncio.new_event_loop()
+                self._loop.run_until_complete(self._main())
+            self._thread = threading.Thread(target=run, name="email-alerts", daemon=True)
+            self._thread.start()
+    
+    def start(self):
+        """Start the sender (e.g. at app start, to drain an outbox left from a previous run)"""
+        if (self._thread is None or not self._thread.is_alive()) and self.pending():
+            self._ensure_running()
+
+
 # =============================================================================
 # FEATURE 8: INVENTORY FORECASTING
 # =============================================================================
@@ -723,14 +1502,16 @@ def predict_low_stock(orders: List[Dict], inventory: List[Dict],
     try:
         predictions = []
         
+        # Units sold per item over the last 30 orders, in one pass
+        sold = {}
+        for o in orders[-30:]:  # Last 30 days
+            for i in o.get('items', []):
+                sold[i.get('item_id')] = sold.get(i.get('item_id'), 0) + i.get('quantity', 0)
+        
         for item in inventory:
             item_id = item['id']
             # Calculate average daily consumption
-            total_sold = sum(
-                sum(i.get('quantity', 0) for i in o.get('items', []) 
-                    if i.get('item_id') == item_id)
-                for o in orders[-30:]  # Last 30 days
-            )
+            total_sold = sold.get(item_id, 0)
             
             daily_consumption = total_sold / 30 if total_sold > 0 else 0
             projected_qty = item['quantity'] - (daily_consumption * days_ahead)
@@ -755,47 +1536,287 @@ def predict_low_stock(orders: List[Dict], inventory: List[Dict],
 # =============================================================================
 # FEATURE 9: EMPLOYEE ATTENDANCE TRACKING
 # =============================================================================
+_thread_locks = {}
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on <path>.lock, held across threads and processes"""
+    lock = _thread_locks.setdefault(path, threading.Lock())
+    with lock:
+        fd = os.open(f"{path}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # closing the descriptor drops the flock
+
+
 class AttendanceManager:
-    """Track employee attendance"""
+    """Track employee attendance
+    
+    Records are partitioned by day into append-only JSON-lines files
+    (attendance/<YYYY-MM-DD>.jsonl). An append-only index maps
+    (employee_id, date) to the byte offset of the latest record, so
+    check-in/out is an O(1) append and per-employee reports only read
+    that employee's records. Every read-check-append runs under one file
+    lock so concurrent check-ins cannot interleave their two writes.
+    """
     
-    def __init__(self, attendance_file="attendance.json"):
+    def __init__(self, attendance_file="attendance.json", partition_dir: str = None):
         self.attendance_file = attendance_file
+        self.partition_dir = partition_dir or os.path.splitext(attendance_file)[0]
+        self.index_file = os.path.join(self.partition_dir, "index.jsonl")
+        self._index = {}       # employee_id -> {date: offset}
+        self._index_pos = 0    # bytes of the index log already loaded
         self._initialize_attendance()
     
     def _initialize_attendance(self):
-        """Create attendance file if doesn't exist"""
+        """Create partition directory, migrating a legacy attendance.json once"""
         try:
-            if not os.path.exists(self.attendance_file):
-                with open(self.attendance_file, 'w') as f:
-                    json.dump([], f)
+            if os.path.isdir(self.partition_dir):
+                self._repair_index()
+                return
+            Path(self.partition_dir).mkdir(parents=True, exist_ok=True)
+            
+            if os.path.exists(self.attendance_file):
+                with profiler.open(self.attendance_file, 'rb') as f:
+                    records = codec.load(f, 'attendance')
+                with _file_lock(self.index_file):
+                    for record in records:
+                        self._write_record(record)
+                # Partitions are the source of truth now: keep the old file only as an archive
+                os.replace(self.attendance_file, f"{self.attendance_file}.migrated")
         except Exception as e:
             print(f"Error initializing attendance: {e}")
     
+    def _repair_index(self):
+        """Index records a crash left in a partition after its index append
+        
+        The index is always appended after the partition, so it can only be
+        behind when some partition was modified later than the index file.
+        """
+        with _file_lock(self.index_file):
+            indexed_at = os.path.getmtime(self.index_file) if os.path.exists(self.index_file) else 0
+            stale = [d for d in self.list_dates()
+                     if os.path.getmtime(self._partition_path(d)) > indexed_at]
+            if not stale:
+                return
+            self._refresh_index()
+            missing = []
+            for date in stale:
+                offset = 0
+                with profiler.open(self._partition_path(date), 'rb') as f:
+                    for line in f:
+                        if line.strip():
+                            employee_id = codec.loads(line)['employee_id']
+                            if self._index.get(employee_id, {}).get(date, -1) < offset:
+                                missing.append((employee_id, date, offset))
+                        offset += len(line)
+            if missing:
+                with profiler.open(self.index_file, 'ab') as f:
+                    f.write(b''.join(codec.dumps(list(e)) + b'\n' for e in missing))
+                self._refresh_index()
+    
+    def _locked(self):
+        return _file_lock(self.index_file)
+    
+    # ----- Partition & index primitives -----
+    def _partition_path(self, date: str) -> str:
+        return os.path.join(self.partition_dir, f"{date}.jsonl")
+    
+    def _refresh_index(self):
+        """Load index entries appended since the last call (by any process)"""
+        if not os.path.exists(self.index_file):
+            return
+        with profiler.open(self.index_file, 'rb') as f:
+            f.seek(self._index_pos)
+            chunk = f.read()
+        end = chunk.rfind(b'\n') + 1  # ignore a partially written trailing line
+        for line in chunk[:end].splitlines():
+            employee_id, date, offset = codec.loads(line)
+            self._index.setdefault(employee_id, {})[date] = offset
+        self._index_pos += end
+    
+    def _write_record(self, record: Dict) -> int:
+        """Append record to its day partition and index it, returns offset
+        (caller holds self._locked())"""
+        line = codec.dumps(record) + b'\n'
+        with profiler.open(self._partition_path(record['date']), 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(line)
+        
+        entry = codec.dumps([record['employee_id'], record['date'], offset])
+        with profiler.open(self.index_file, 'ab') as f:
+            f.write(entry + b'\n')
+        self._index.setdefault(record['employee_id'], {})[record['date']] = offset
+        return offset
+    
+    def _write_records(self, records: List[Dict]) -> int:
+        """Append many records with one write per day partition and one index write
+        (caller holds self._locked())"""
+        by_date = {}
+        for record in records:
+            by_date.setdefault(record['date'], []).append(record)
+        
+        index_lines = []
+        for date, day_records in by_date.items():
+            with profiler.open(self._partition_path(date), 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                buf = bytearray()
+                for record in day_records:
+                    line = codec.dumps(record) + b'\n'
+                    index_lines.append((record['employee_id'], date, offset + len(buf)))
+                    buf += line
+                f.write(buf)
+        
+        if index_lines:
+            with profiler.open(self.index_file, 'ab') as f:
+                f.write(b''.join(codec.dumps(list(e)) + b'\n' for e in index_lines))
+            for employee_id, date, offset in index_lines:
+                self._index.setdefault(employee_id, {})[date] = offset
+        return len(index_lines)
+    
+    def bulk_record(self, events: List[Dict], dedupe_seconds: int = 60) -> Dict:
+        """
+        Apply a burst of badge events in one commit.
+        
+        Each event: {'employee_id': int, 'event': 'IN'|'OUT', 'timestamp': ISO str or datetime}
+        Repeat taps of the same kind within dedupe_seconds are dropped, a second
+        IN on a day already checked in is a duplicate, and the latest OUT wins.
+        
+        Timestamps with an offset are converted to naive local time, the
+        same clock check_in() uses, so mixed readers sort together.
+        
+        Returns counts: received, checked_in, checked_out, duplicates, rejected,
+        written, plus 'errors': [(row number, reason)] for unparseable rows
+        """
+        stats = {'received': len(events), 'checked_in': 0, 'checked_out': 0,
+                 'duplicates': 0, 'rejected': 0, 'written': 0, 'errors': []}
+        try:
+            parsed = []
+            for row, event in enumerate(events, 1):
+                try:
+                    ts = event.get('timestamp') or datetime.now()
+                    if not isinstance(ts, datetime):
+                        ts = datetime.fromisoformat(str(ts))
+                    if ts.tzinfo is not None:
+                        ts = ts.astimezone().replace(tzinfo=None)
+                    kind = str(event['event']).upper()
+                    if kind not in ('IN', 'OUT'):
+                        raise ValueError(f"unknown event {kind!r}")
+                    parsed.append((ts, int(event['employee_id']), kind))
+                except KeyError as e:
+                    stats['rejected'] += 1
+                    stats['errors'].append((row, f"missing {e}"))
+                except (AttributeError, TypeError, ValueError) as e:
+                    stats['rejected'] += 1
+                    stats['errors'].append((row, str(e)))
+            parsed.sort()
+            
+            with self._locked():
+                self._refresh_index()
+                days = {}          # date -> {employee_id: record} as currently stored
+                pending = {}       # (employee_id, date) -> record to write
+                last_tap = {}      # (employee_id, kind) -> datetime of last accepted tap
+                for ts, employee_id, kind in parsed:
+                    date = ts.strftime("%Y-%m-%d")
+                    clock = ts.strftime("%H:%M:%S")
+                    
+                    previous = last_tap.get((employee_id, kind))
+                    if previous and (ts - previous).total_seconds() < dedupe_seconds:
+                        stats['duplicates'] += 1
+                        continue
+                    
+                    if date not in days:
+                        days[date] = {r['employee_id']: r for r in self.get_day(date)}
+                    record = pending.get((employee_id, date)) or days[date].get(employee_id)
+                    
+                    if kind == 'IN':
+                        if record and record['check_in']:
+                            stats['duplicates'] += 1
+                            continue
+                        record = {'employee_id': employee_id, 'date': date,
+                                  'check_in': clock, 'check_out': None}
+                        stats['checked_in'] += 1
+                    else:
+                        if not record:
+                            # Night shift: close yesterday's open record
+                            date = (ts - timedelta(days=1)).strftime("%Y-%m-%d")
+                            if date not in days:
+                                days[date] = {r['employee_id']: r for r in self.get_day(date)}
+                            record = pending.get((employee_id, date)) or days[date].get(employee_id)
+                            if not record or record['check_out'] is not None:
+                                stats['rejected'] += 1
+                                continue
+                        elif clock < record['check_in']:
+                            stats['rejected'] += 1
+                            continue
+                        record = {**record, 'check_out': clock}
+                        stats['checked_out'] += 1
+                    
+                    pending[(employee_id, date)] = record
+                    last_tap[(employee_id, kind)] = ts
+                
+                stats['written'] = self._write_records(list(pending.values()))
+        except Exception as e:
+            stats['error'] = str(e)
+        return stats
+    
+    def _read_record(self, date: str, offset: int) -> Dict:
+        with profiler.open(self._partition_path(date), 'rb') as f:
+            f.seek(offset)
+            return codec.decode(f.readline(), 'attendance')
+    
+    def _find(self, employee_id: int, date: str) -> Optional[Dict]:
+        """O(1) lookup of an employee's latest record for a day"""
+        self._refresh_index()
+        offset = self._index.get(employee_id, {}).get(date)
+        if offset is None:
+            return None
+        return self._read_record(date, offset)
+    
+    def get_day(self, date: str) -> List[Dict]:
+        """All records of one day partition (latest record per employee)"""
+        path = self._partition_path(date)
+        if not os.path.exists(path):
+            return []
+        latest = {}
+        with profiler.open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    record = codec.decode(line, 'attendance')
+                    latest[record['employee_id']] = record
+        return list(latest.values())
+    
+    def list_dates(self) -> List[str]:
+        """Dates that have a partition, oldest first"""
+        return sorted(
+            name[:-len('.jsonl')] for name in os.listdir(self.partition_dir)
+            if name.endswith('.jsonl') and name != os.path.basename(self.index_file)
+        )
+    
+    # ----- Public API -----
     def check_in(self, employee_id: int) -> Tuple[bool, str]:
         """Record employee check-in"""
         try:
-            with open(self.attendance_file, 'r') as f:
-                records = json.load(f)
-            
-            today = datetime.now().strftime("%Y-%m-%d")
+            now = datetime.now()
+            today = now.strftime("%Y-%m-%d")
             
-            # Check if already checked in
-            existing = next((r for r in records 
-                           if r['employee_id'] == employee_id and r['date'] == today),
-                          None)
-            if existing and existing['check_in']:
-                return False, "Already checked in today"
-            
-            record = {
-                'employee_id': employee_id,
-                'date': today,
-                'check_in': datetime.now().strftime("%H:%M:%S"),
-                'check_out': None
-            }
-            
-            records.append(record)
-            with open(self.attendance_file, 'w') as f:
-                json.dump(records, f, indent=2)
+            with self._locked():
+                # Check if already checked in
+                existing = self._find(employee_id, today)
+                if existing and existing['check_in']:
+                    return False, "Already checked in today"
+                
+                record = {
+                    'employee_id': employee_id,
+                    'date': today,
+                    'check_in': now.strftime("%H:%M:%S"),
+                    'check_out': None
+                }
+                self._write_record(record)
             
             return True, "✅ Checked in"
         except Exception as e:
@@ -804,39 +1825,50 @@ class AttendanceManager:
     def check_out(self, employee_id: int) -> Tuple[bool, str]:
         """Record employee check-out"""
         try:
-            with open(self.attendance_file, 'r') as f:
-                records = json.load(f)
-            
-            today = datetime.now().strftime("%Y-%m-%d")
+            now = datetime.now()
+            today = now.strftime("%Y-%m-%d")
             
-            # Find today's check-in
-            for record in records:
-                if record['employee_id'] == employee_id and record['date'] == today:
-                    record['check_out'] = datetime.now().strftime("%H:%M:%S")
-                    
-                    with open(self.attendance_file, 'w') as f:
-                        json.dump(records, f, indent=2)
-                    
-                    return True, "✅ Checked out"
+            with self._locked():
+                # Find today's check-in
+                record = self._find(employee_id, today)
+                if not record:
+                    return False, "No check-in record found today"
+                if record['check_out']:
+                    return False, f"Already checked out today at {record['check_out']}"
+                
+                record['check_out'] = now.strftime("%H:%M:%S")
+                self._write_record(record)
             
-            return False, "No check-in record found today"
+            return True, "✅ Checked out"
         except Exception as e:
             return False, f"❌ Check-out failed: {str(e)}"
     
     def get_attendance_report(self, employee_id: int = None) -> List[Dict]:
         """Get attendance records"""
         try:
-            with open(self.attendance_file, 'r') as f:
-                records = json.load(f)
-            
             if employee_id:
-                records = [r for r in records if r['employee_id'] == employee_id]
+                self._refresh_index()
+                dates = self._index.get(employee_id, {})
+                return [self._read_record(date, dates[date]) for date in sorted(dates)]
             
+            records = []
+            for date in self.list_dates():
+                records.extend(self.get_day(date))
             return records
         except Exception as e:
             return []
 
 
+def parse_badge_events(text: str) -> List[Dict]:
+    """Parse badge-reader output: CSV (employee_id,event,timestamp) or JSON lines"""
+    text = text.strip()
+    if not text:
+        return []
+    if text.startswith('{'):
+        return [codec.loads(line) for line in text.splitlines() if line.strip()]
+    return list(csv.DictReader(text.splitlines()))
+
+
 # =============================================================================
 # FEATURE 10: MULTI-LOCATION WAREHOUSE SUPPORT
 # =============================================================================
@@ -898,10 +1930,3231 @@ class MultiWarehouseManager:
             return False, f"❌ Failed: {str(e)}"
 
 
-# Initialize managers
-backup_manager = BackupManager()
-audit_logger = AuditLogger()
-auth_manager = AuthManager()
-email_config = EmailAlertConfig()
-attendance_manager = AttendanceManager()
-warehouse_manager = MultiWarehouseManager()
+# =============================================================================
+# FEATURE 11: SESSION TOKENS (Signed, in-memory, TTL-evicted)
+# =============================================================================
+class SessionManager:
+    """Signed session tokens with precomputed role permission bitsets"""
+    
+    def __init__(self, roles: Dict[str, List[str]] = None, ttl_seconds: int = 8 * 3600,
+                 secret: bytes = None):
+        roles = roles or AuthManager.ROLES
+        self.ttl_seconds = ttl_seconds
+        self.secret = secret or os.environ.get('WAREHOUSE_SESSION_SECRET', '').encode() \
+            or secrets.token_bytes(32)
+        
+        # One bit per action, one mask per role
+        actions = sorted({a for perms in roles.values() for a in perms})
+        self.permission_bits = {action: 1 << i for i, action in enumerate(actions)}
+        self.role_masks = {
+            role: sum(self.permission_bits[a] for a in set(perms))
+            for role, perms in roles.items()
+        }
+        
+        self._sessions = {}      # session id -> session dict
+        self._expiry_heap = []   # (expires_at, session id) for lazy eviction
+        self._lock = threading.Lock()  # Streamlit runs each script session on its own thread
+    
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
+    
+    def purge_expired(self, now: float = None) -> int:
+        """Evict expired sessions, returns number removed"""
+        with self._lock:
+            return self._purge(time.time() if now is None else now)
+    
+    def _purge(self, now: float) -> int:
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, sid = heapq.heappop(self._expiry_heap)
+            session = self._sessions.get(sid)
+            if session and session['expires_at'] == expires_at:
+                del self._sessions[sid]
+                removed += 1
+        return removed
+    
+    def create_session(self, username: str, role: str) -> str:
+        """Start a session, returns signed token 'sid.expires.signature'"""
+        now = time.time()
+        sid = secrets.token_urlsafe(16)
+        expires_at = int(now + self.ttl_seconds)
+        with self._lock:
+            self._purge(now)
+            self._sessions[sid] = {
+                'username': username,
+                'role': role,
+                'mask': self.role_masks.get(role, 0),
+                'expires_at': expires_at
+            }
+            heapq.heappush(self._expiry_heap, (expires_at, sid))
+        
+        payload = f"{sid}.{expires_at}"
+        return f"{payload}.{self._sign(payload)}"
+    
+    def get_session(self, token: str) -> Optional[Dict]:
+        """Return session for a valid, unexpired token, else None"""
+        if not token:
+            return None
+        try:
+            sid, expires_at, signature = token.split('.')
+        except ValueError:
+            return None
+        
+        if not hmac.compare_digest(signature, self._sign(f"{sid}.{expires_at}")):
+            return None
+        
+        with self._lock:
+            session = self._sessions.get(sid)
+            if not session:
+                return None
+            if session['expires_at'] <= time.time():
+                del self._sessions[sid]
+                return None
+            return session
+    
+    def has_permission(self, token: str, action: str) -> bool:
+        """Constant-time bit test against the session's role mask"""
+        session = self.get_session(token)
+        if not session:
+            return False
+        return bool(session['mask'] & self.permission_bits.get(action, 0))
+    
+    def revoke(self, token: str) -> bool:
+        """End a single session (logout)"""
+        session = self.get_session(token)
+        if not session:
+            return False
+        with self._lock:
+            return self._sessions.pop(token.split('.')[0], None) is not None
+    
+    def revoke_user(self, username: str) -> int:
+        """End every session of a user (deletion, password change)"""
+        with self._lock:
+            sids = [sid for sid, s in self._sessions.items() if s['username'] == username]
+            for sid in sids:
+                del self._sessions[sid]
+            return len(sids)
+    
+    def active_sessions(self) -> int:
+        with self._lock:
+            self._purge(time.time())
+            return len(self._sessions)
+
+
+# =============================================================================
+# FEATURE 12: ATTENDANCE ANALYTICS (Hours, Overtime, Payroll)
+# =============================================================================
+def _clock_seconds(clock: str) -> int:
+    h, m, s = (int(x) for x in clock.split(':'))
+    return h * 3600 + m * 60 + s
+
+
+class AttendanceAnalytics:
+    """Hours worked, overtime and absence per employee per period
+    
+    Day partitions are read incrementally (only bytes appended since the
+    last call), so the current day stays cheap to refresh. Each day is held
+    as columns (employee id, worked seconds, open shift); with numpy the
+    period totals are a bincount over the concatenated columns. Aggregates
+    for closed periods are cached and reused until a partition in the
+    period changes size.
+    """
+    
+    def __init__(self, attendance: AttendanceManager, standard_hours: float = 8.0,
+                 workdays: Tuple[int, ...] = (0, 1, 2, 3, 4, 5),
+                 overtime_multiplier: float = 2.0):
+        self.attendance = attendance
+        self.standard_hours = standard_hours
+        self.workdays = set(workdays)                # Monday=0 ... Saturday=5
+        self.overtime_multiplier = overtime_multiplier  # Factories Act: twice the ordinary rate
+        self._days = {}      # date -> {'size', 'latest', 'ids', 'worked', 'open'}
+        self._periods = {}   # (start, end) -> (signature, totals)
+    
+    def _day(self, date: str) -> Dict:
+        """Per-day worked seconds by employee, tail-reading the partition"""
+        path = self.attendance._partition_path(date)
+        day = self._days.setdefault(date, {'size': 0, 'latest': {}, 'ids': [], 'worked': [], 'open': []})
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == day['size']:
+            return day
+        if size < day['size']:
+            # Partition was rewritten or removed: start over
+            day.update(size=0, latest={}, ids=[], worked=[], open=[])
+            if not size:
+                return day
+        
+        with profiler.open(path, 'rb') as f:
+            f.seek(day['size'])
+            chunk = f.read()
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            record = codec.decode(line, 'attendance')
+            day['latest'][record['employee_id']] = record
+        day['size'] += end
+        
+        # Day columns: employee id, worked seconds, open shift (-1 = no check-out)
+        records = list(day['latest'].values())
+        ids = [r['employee_id'] for r in records]
+        ins = [_clock_seconds(r['check_in']) for r in records]
+        outs = [_clock_seconds(r['check_out']) if r['check_out'] else -1 for r in records]
+        if np is not None:
+            ins, outs = np.array(ins, dtype=np.int64), np.array(outs, dtype=np.int64)
+            day['ids'] = np.array(ids, dtype=np.int64)
+            day['open'] = outs < 0
+            day['worked'] = np.where(day['open'], 0, (outs - ins) % 86400)  # overnight shifts wrap
+        else:
+            day['ids'] = ids
+            day['open'] = [o < 0 for o in outs]
+            day['worked'] = [0 if o < 0 else (o - i) % 86400 for i, o in zip(ins, outs)]
+        return day
+    
+    def hours_by_employee(self, start: str, end: str) -> Dict[int, Dict]:
+        """Totals per employee for dates start..end (inclusive, YYYY-MM-DD)"""
+        dates = [d for d in self.attendance.list_dates() if start <= d <= end]
+        today = datetime.now().strftime("%Y-%m-%d")
+        
+        signature = None
+        if end < today:
+            signature = tuple(
+                (d, os.path.getsize(self.attendance._partition_path(d))) for d in dates
+            )
+            cached = self._periods.get((start, end))
+            if cached and cached[0] == signature:
+                return cached[1]
+        
+        standard = self.standard_hours * 3600
+        days = [self._day(date) for date in dates]
+        if np is not None:
+            totals = self._column_totals(days, standard)
+        else:
+            totals = {}
+            for day in days:
+                for employee_id, worked, is_open in zip(day['ids'], day['worked'], day['open']):
+                    t = totals.setdefault(employee_id, {
+                        'days_present': 0, 'worked_seconds': 0,
+                        'overtime_seconds': 0, 'open_shifts': 0
+                    })
+                    t['days_present'] += 1
+                    t['worked_seconds'] += worked
+                    t['overtime_seconds'] += max(0, worked - standard)
+                    t['open_shifts'] += int(is_open)
+        
+        if signature is not None:
+            self._periods[(start, end)] = (signature, totals)
+        return totals
+    
+    @staticmethod
+    def _column_totals(days: List[Dict], standard: float) -> Dict[int, Dict]:
+        """Per-employee sums over numpy day columns, one bincount per measure"""
+        days = [d for d in days if len(d['ids'])]
+        if not days:
+            return {}
+        employees, slot = np.unique(np.concatenate([d['ids'] for d in days]), return_inverse=True)
+        worked = np.concatenate([d['worked'] for d in days])
+        is_open = np.concatenate([d['open'] for d in days])
+        n = len(employees)
+        present = np.bincount(slot, minlength=n)
+        seconds = np.bincount(slot, weights=worked, minlength=n)
+        overtime = np.bincount(slot, weights=np.maximum(worked - standard, 0), minlength=n)
+        open_shifts = np.bincount(slot, weights=is_open, minlength=n)
+        return {
+            e: {'days_present': p, 'worked_seconds': int(w),
+                'overtime_seconds': o, 'open_shifts': int(s)}
+            for e, p, w, o, s in zip(employees.tolist(), present.tolist(), seconds.tolist(),
+                                     overtime.tolist(), open_shifts.tolist())
+        }
+    
+    def _workdays_between(self, start: str, end: str) -> int:
+        first = datetime.strptime(start[:10], "%Y-%m-%d")
+        last = datetime.strptime(end[:10], "%Y-%m-%d")
+        if last < first:
+            return 0
+        full_weeks, extra = divmod((last - first).days + 1, 7)
+        count = full_weeks * len(self.workdays)
+        count += sum(1 for n in range(extra) if (first.weekday() + n) % 7 in self.workdays)
+        return count
+    
+    def summarize(self, employees: List[Dict], start: str, end: str) -> List[Dict]:
+        """Hours worked, overtime and absence stats for each employee"""
+        totals = self.hours_by_employee(start, end)
+        today = datetime.now().strftime("%Y-%m-%d")
+        
+        rows = []
+        for emp in employees:
+            t = totals.get(emp['id'], {})
+            window_start = max(start, (emp.get('hire_date') or start)[:10])
+            expected = self._workdays_between(window_start, min(end, today))
+            present = t.get('days_present', 0)
+            hours = t.get('worked_seconds', 0) / 3600
+            rows.append({
+                'employee_id': emp['id'],
+                'name': emp.get('name', ''),
+                'days_present': present,
+                'days_absent': max(0, expected - present),
+                'hours_worked': round(hours, 2),
+                'overtime_hours': round(t.get('overtime_seconds', 0) / 3600, 2),
+                'avg_hours_per_day': round(hours / present, 2) if present else 0.0,
+                'open_shifts': t.get('open_shifts', 0)
+            })
+        return rows
+    
+    def payroll_summary(self, employees: List[Dict], year: int = None,
+                        month: int = None) -> Dict:
+        """Monthly payroll: base salary plus overtime pay from attendance"""
+        now = datetime.now()
+        year, month = year or now.year, month or now.month
+        start = f"{year:04d}-{month:02d}-01"
+        next_month = datetime(year + month // 12, month % 12 + 1, 1)
+        end = (next_month - timedelta(days=1)).strftime("%Y-%m-%d")
+        
+        month_hours = self._workdays_between(start, end) * self.standard_hours
+        rows = []
+        for emp, stats in zip(employees, self.summarize(employees, start, end)):
+            salary = emp.get('salary', 0)
+            hourly = salary / month_hours if month_hours else 0
+            overtime_pay = stats['overtime_hours'] * hourly * self.overtime_multiplier
+            rows.append({
+                **stats,
+                'base_salary': salary,
+                'overtime_pay': round(overtime_pay, 2),
+                'total_pay': round(salary + overtime_pay, 2)
+            })
+        
+        return {
+            'period': f"{year:04d}-{month:02d}",
+            'rows': rows,
+            'total_base': sum(r['base_salary'] for r in rows),
+            'total_overtime_pay': round(sum(r['overtime_pay'] for r in rows), 2),
+            'total_payroll': round(sum(r['total_pay'] for r in rows), 2),
+            'total_overtime_hours': round(sum(r['overtime_hours'] for r in rows), 2)
+        }
+
+
+# =============================================================================
+# FEATURE 13: PER-WAREHOUSE STOCK LEDGER
+# =============================================================================
+class StockLedger:
+    """Stock per (warehouse_id, item_id) with incremental site totals
+    
+    Rows live in data['stock_levels'] so save_data() persists them with the
+    rest of the dataset. item['quantity'] is kept equal to the sum over all
+    sites, so helpers that work on the global inventory list keep working.
+    """
+    
+    def __init__(self, data: Dict, warehouses: List[Dict], on_cross=None):
+        self.data = data
+        self.on_cross = on_cross  # called with a crossing dict when an item enters/leaves low stock
+        self.capacity = {w['id']: w.get('capacity', 0) for w in warehouses}
+        self.default_warehouse = warehouses[0]['id'] if warehouses else 1
+        
+        self._items = {i['id']: i for i in data.get('inventory', [])}
+        self._rows = {}          # (warehouse_id, item_id) -> ledger row
+        self._site_totals = {}   # warehouse_id -> units on hand
+        self._site_items = {}    # warehouse_id -> {item_id}
+        self._item_sites = {}    # item_id -> {warehouse_id}
+        self._item_reserved = {}  # item_id -> units reserved across all sites
+        self._site_orders = None  # warehouse_id -> [orders], built on first use
+        self._low = set()         # item_ids below min_stock overall
+        self._site_low = {}       # warehouse_id -> {item_ids below min_stock at that site}
+        
+        for row in data.setdefault('stock_levels', []):
+            self._index_row(row)
+        
+        # Items created before the ledger existed live at the default site
+        for item_id, item in self._items.items():
+            if item_id not in self._item_sites:
+                self._new_row(item.get('warehouse_id', self.default_warehouse), item_id,
+                              item.get('quantity', 0))
+        
+        for wid, item_id in self._rows:
+            self._mark(wid, item_id, emit=False)
+        for item_id in self._items:
+            self._mark(None, item_id, emit=False)
+    
+    def _index_row(self, row: Dict):
+        key = (row['warehouse_id'], row['item_id'])
+        self._rows[key] = row
+        self._site_totals[key[0]] = self._site_totals.get(key[0], 0) + row['quantity']
+        self._site_items.setdefault(key[0], set()).add(key[1])
+        self._item_sites.setdefault(key[1], set()).add(key[0])
+        if row.get('reserved'):
+            self._item_reserved[key[1]] = self._item_reserved.get(key[1], 0) + row['reserved']
+    
+    def _new_row(self, warehouse_id: int, item_id: int, quantity: int = 0) -> Dict:
+        row = {'warehouse_id': warehouse_id, 'item_id': item_id, 'quantity': quantity}
+        self.data['stock_levels'].append(row)
+        self._index_row(row)
+        return row
+    
+    def _mark(self, warehouse_id: Optional[int], item_id: int, emit: bool = True):
+        """Edge-triggered low-stock tracking: O(1), fires only when min_stock is crossed"""
+        item = self._items.get(item_id)
+        if not item:
+            return
+        if warehouse_id is None:
+            qty, low_set = item.get('quantity', 0), self._low
+        else:
+            row = self._rows.get((warehouse_id, item_id))
+            qty, low_set = (row['quantity'] if row else 0), self._site_low.setdefault(warehouse_id, set())
+        low = qty < item.get('min_stock', 10)
+        if low == (item_id in low_set):
+            return
+        if low:
+            low_set.add(item_id)
+        else:
+            low_set.discard(item_id)
+        if emit and self.on_cross:
+            self.on_cross({'item_id': item_id, 'name': item.get('name', ''), 'warehouse_id': warehouse_id,
+                           'quantity': qty, 'min_stock': item.get('min_stock', 10), 'low': low})
+    
+    # ----- Mutations -----
+    def add_item(self, item: Dict, warehouse_id: int = None):
+        """Register a new catalog item with its opening stock at one site"""
+        self._items[item['id']] = item
+        wid = warehouse_id or self.default_warehouse
+        self._new_row(wid, item['id'], item.get('quantity', 0))
+        self._mark(wid, item['id'])
+        self._mark(None, item['id'])
+    
+    def set_min_stock(self, item_id: int, min_stock: int):
+        """Change an item's reorder threshold and re-evaluate it everywhere"""
+        item = self._items.get(item_id)
+        if item:
+            item['min_stock'] = min_stock
+            for wid in self._item_sites.get(item_id, ()):
+                self._mark(wid, item_id)
+            self._mark(None, item_id)
+    
+    def adjust(self, warehouse_id: int, item_id: int, delta: int,
+               consume_reserved: int = 0) -> Tuple[bool, str]:
+        """Apply a stock delta at one site, O(1)
+        
+        On-hand never drops below the reserved quantity. A caller that ships
+        reserved stock passes consume_reserved, which is released only if the
+        adjustment succeeds.
+        """
+        item = self._items.get(item_id)
+        if not item:
+            return False, "❌ Item not found"
+        
+        row = self._rows.get((warehouse_id, item_id))
+        current = row['quantity'] if row else 0
+        if current + delta < 0:
+            return False, f"❌ Insufficient stock at site: {current} available, {-delta} requested"
+        held = (row.get('reserved', 0) if row else 0) - consume_reserved
+        if delta < 0 and current + delta < held:
+            return False, f"❌ {held} units at site are reserved: on-hand cannot drop below {held}"
+        
+        if consume_reserved:
+            self.release(warehouse_id, item_id, consume_reserved)
+        if not row:
+            row = self._new_row(warehouse_id, item_id)
+        row['quantity'] += delta
+        self._site_totals[warehouse_id] = self._site_totals.get(warehouse_id, 0) + delta
+        item['quantity'] = item.get('quantity', 0) + delta
+        self._mark(warehouse_id, item_id)
+        self._mark(None, item_id)
+        stock_mutations.labels(warehouse_id, 'adjust').inc()
+        return True, "✅ Stock updated"
+    
+    def set_quantity(self, warehouse_id: int, item_id: int, quantity: int) -> Tuple[bool, str]:
+        """Set absolute on-hand quantity at one site (not below what is reserved there)"""
+        return self.adjust(warehouse_id, item_id, quantity - self.quantity(warehouse_id, item_id))
+    
+    def set_bin(self, warehouse_id: int, item_id: int, bin_code: str) -> Tuple[bool, str]:
+        """Assign the shelf location (e.g. "B-07-2") an item is picked from at a site"""
+        bin_code = (bin_code or '').strip().upper()
+        if bin_code and PickPathOptimizer.parse_bin(bin_code) is None:
+            return False, "❌ Bin must look like AISLE-BAY-LEVEL, e.g. B-07-2"
+        row = self._rows.get((warehouse_id, item_id))
+        if not row:
+            if item_id not in self._items:
+                return False, "❌ Item not found"
+            row = self._new_row(warehouse_id, item_id)
+        if bin_code:
+            row['bin'] = bin_code
+        else:
+            row.pop('bin', None)
+        return True, "✅ Bin location updated"
+    
+    def record_order(self, order: Dict):
+        """Keep the per-site order index current after appending an order"""
+        if self._site_orders is not None:
+            wid = order.get('warehouse_id', self.default_warehouse)
+            self._site_orders.setdefault(wid, []).append(order)
+    
+    # ----- Queries -----
+    def quantity(self, warehouse_id: int, item_id: int) -> int:
+        row = self._rows.get((warehouse_id, item_id))
+        return row['quantity'] if row else 0
+    
+    def low_stock_ids(self, warehouse_id: int = None) -> set:
+        """Items currently below min_stock (overall, or at one site)"""
+        return self._low if warehouse_id is None else self._site_low.get(warehouse_id, set())
+    
+    def low_stock_items(self, warehouse_id: int = None) -> List[Dict]:
+        """Inventory records below min_stock, as seen from the site (or overall)"""
+        ids = sorted(self.low_stock_ids(warehouse_id))
+        if warehouse_id is None:
+            return [self._items[iid] for iid in ids]
+        return [{**self._items[iid], 'quantity': self.quantity(warehouse_id, iid), 'warehouse_id': warehouse_id}
+                for iid in ids]
+    
+    def bin_of(self, warehouse_id: int, item_id: int) -> Optional[str]:
+        row = self._rows.get((warehouse_id, item_id))
+        return row.get('bin') if row else None
+    
+    def site_total(self, warehouse_id: int) -> int:
+        return self._site_totals.get(warehouse_id, 0)
+    
+    def utilization(self, warehouse_id: int) -> float:
+        """Share of site capacity in use (0.0 - 1.0+)"""
+        capacity = self.capacity.get(warehouse_id, 0)
+        return self.site_total(warehouse_id) / capacity if capacity else 0.0
+    
+    def sites_for_item(self, item_id: int) -> Dict[int, int]:
+        return {wid: self._rows[(wid, item_id)]['quantity'] for wid in self._item_sites.get(item_id, ())}
+    
+    def available(self, warehouse_id: int, item_id: int) -> int:
+        """On-hand quantity not held by a reservation"""
+        row = self._rows.get((warehouse_id, item_id))
+        return row['quantity'] - row.get('reserved', 0) if row else 0
+    
+    def reserve(self, warehouse_id: int, item_id: int, qty: int) -> Tuple[bool, str]:
+        """Hold stock at a site without removing it from on-hand"""
+        if qty <= 0:
+            return False, "❌ Quantity must be > 0"
+        available = self.available(warehouse_id, item_id)
+        if available < qty:
+            return False, f"❌ Insufficient available stock: {available} available, {qty} requested"
+        row = self._rows[(warehouse_id, item_id)]
+        row['reserved'] = row.get('reserved', 0) + qty
+        self._item_reserved[item_id] = self._item_reserved.get(item_id, 0) + qty
+        stock_mutations.labels(warehouse_id, 'reserve').inc()
+        return True, "✅ Stock reserved"
+    
+    def release(self, warehouse_id: int, item_id: int, qty: int) -> Tuple[bool, str]:
+        """Return reserved stock to available"""
+        row = self._rows.get((warehouse_id, item_id))
+        if not row:
+            return False, "❌ No stock held for this item at the site"
+        released = min(qty, row.get('reserved', 0))
+        row['reserved'] = row.get('reserved', 0) - released
+        self._item_reserved[item_id] = self._item_reserved.get(item_id, 0) - released
+        stock_mutations.labels(warehouse_id, 'release').inc()
+        return True, "✅ Reservation released"
+    
+    def available_to_promise(self, item_id: int, warehouse_id: int = None) -> int:
+        """Unreserved on-hand units for a SKU at one site or across all sites, O(1)"""
+        if warehouse_id is not None:
+            return self.available(warehouse_id, item_id)
+        item = self._items.get(item_id)
+        if not item:
+            return 0
+        return item.get('quantity', 0) - self._item_reserved.get(item_id, 0)
+    
+    def items_at(self, warehouse_id: int, available: bool = False) -> List[Dict]:
+        """Inventory records as seen from one site (quantity = site quantity)
+        
+        With available=True the quantity excludes reserved stock.
+        """
+        return [
+            {**self._items[iid],
+             'quantity': self.available(warehouse_id, iid) if available
+             else self._rows[(warehouse_id, iid)]['quantity'],
+             'warehouse_id': warehouse_id,
+             'bin': self._rows[(warehouse_id, iid)].get('bin', '')}
+            for iid in sorted(self._site_items.get(warehouse_id, ()))
+            if iid in self._items
+        ]
+    
+    def orders_at(self, warehouse_id: int) -> List[Dict]:
+        """Orders placed against one site"""
+        if self._site_orders is None:
+            self._site_orders = {}
+            for order in self.data.get('orders', []):
+                wid = order.get('warehouse_id', self.default_warehouse)
+                self._site_orders.setdefault(wid, []).append(order)
+        return self._site_orders.get(warehouse_id, [])
+    
+    def site_summary(self) -> List[Dict]:
+        """Units, SKU count and capacity utilization per warehouse"""
+        return [
+            {
+                'warehouse_id': wid,
+                'units': self.site_total(wid),
+                'skus': len(self._site_items.get(wid, ())),
+                'capacity': capacity,
+                'utilization_percent': round(self.utilization(wid) * 100, 1)
+            }
+            for wid, capacity in self.capacity.items()
+        ]
+
+
+# =============================================================================
+# FEATURE 14: INTER-WAREHOUSE TRANSFERS & REBALANCING
+# =============================================================================
+class TransferManager:
+    """Reserved -> In Transit -> Received stock transfers between sites
+    
+    Transfers live in data['transfers']. Source stock is reserved on the
+    ledger when a transfer is created, leaves the source on dispatch and
+    lands at the destination on receipt.
+    """
+    
+    OPEN_STATUSES = ('Reserved', 'In Transit')
+    
+    def __init__(self, data: Dict, ledger: StockLedger, allocate_id: Callable[[str], int] = None):
+        self.data = data
+        self.ledger = ledger
+        self.allocate_id = allocate_id  # shard_store.allocate_id when sharded
+        self._by_id = {}        # transfer id -> transfer
+        self._inbound = {}      # (warehouse_id, item_id) -> quantity reserved or in transit
+        self._next_id = max((t['id'] for t in data.get('transfers', [])), default=0) + 1
+        for transfer in data.setdefault('transfers', []):
+            self._by_id[transfer['id']] = transfer
+            if transfer['status'] in self.OPEN_STATUSES:
+                self._track_inbound(transfer, transfer['quantity'])
+    
+    def _track_inbound(self, transfer: Dict, qty: int):
+        key = (transfer['to_warehouse'], transfer['item_id'])
+        self._inbound[key] = self._inbound.get(key, 0) + qty
+    
+    def _set_status(self, transfer: Dict, status: str):
+        transfer['status'] = status
+        transfer['updated_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    def create_transfer(self, item_id: int, from_warehouse: int, to_warehouse: int,
+                        qty: int) -> Tuple[bool, str]:
+        """Reserve stock at the source and open a transfer"""
+        if from_warehouse == to_warehouse:
+            return False, "❌ Source and destination must differ"
+        if to_warehouse not in self.ledger.capacity:
+            return False, "❌ Destination warehouse not found"
+        
+        ok, msg = self.ledger.reserve(from_warehouse, item_id, qty)
+        if not ok:
+            return False, msg
+        
+        if self.allocate_id:
+            transfer_id = self.allocate_id('transfers')
+        else:
+            transfer_id = self._next_id
+            self._next_id += 1
+        transfer = {
+            'id': transfer_id,
+            'item_id': item_id,
+            'from_warehouse': from_warehouse,
+            'to_warehouse': to_warehouse,
+            'quantity': qty,
+            'status': 'Reserved',
+            'created_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        self.data['transfers'].append(transfer)
+        self._by_id[transfer_id] = transfer
+        self._track_inbound(transfer, qty)
+        return True, f"✅ Transfer #{transfer_id} reserved"
+    
+    def dispatch(self, transfer_id: int) -> Tuple[bool, str]:
+        """Ship reserved stock: it leaves the source ledger"""
+        transfer = self._by_id.get(transfer_id)
+        if not transfer or transfer['status'] != 'Reserved':
+            return False, "❌ Only reserved transfers can be dispatched"
+        
+        # The reservation is consumed only if the stock actually leaves
+        ok, msg = self.ledger.adjust(transfer['from_warehouse'], transfer['item_id'], -transfer['quantity'],
+                                     consume_reserved=transfer['quantity'])
+        if not ok:
+            return False, msg
+        self._set_status(transfer, 'In Transit')
+        return True, f"✅ Transfer #{transfer_id} in transit"
+    
+    def receive(self, transfer_id: int) -> Tuple[bool, str]:
+        """Book in-transit stock at the destination"""
+        transfer = self._by_id.get(transfer_id)
+        if not transfer or transfer['status'] != 'In Transit':
+            return False, "❌ Only in-transit transfers can be received"
+        
+        self.ledger.adjust(transfer['to_warehouse'], transfer['item_id'], transfer['quantity'])
+        self._track_inbound(transfer, -transfer['quantity'])
+        self._set_status(transfer, 'Received')
+        return True, f"✅ Transfer #{transfer_id} received"
+    
+    def cancel(self, transfer_id: int) -> Tuple[bool, str]:
+        """Cancel an open transfer, returning stock to the source"""
+        transfer = self._by_id.get(transfer_id)
+        if not transfer or transfer['status'] not in self.OPEN_STATUSES:
+            return False, "❌ Only open transfers can be cancelled"
+        
+        if transfer['status'] == 'Reserved':
+            self.ledger.release(transfer['from_warehouse'], transfer['item_id'], transfer['quantity'])
+        else:
+            self.ledger.adjust(transfer['from_warehouse'], transfer['item_id'], transfer['quantity'])
+        self._track_inbound(transfer, -transfer['quantity'])
+        self._set_status(transfer, 'Cancelled')
+        return True, f"✅ Transfer #{transfer_id} cancelled"
+    
+    def open_transfers(self) -> List[Dict]:
+        return [t for t in self.data['transfers'] if t['status'] in self.OPEN_STATUSES]
+    
+    def inbound(self, warehouse_id: int, item_id: int) -> int:
+        return self._inbound.get((warehouse_id, item_id), 0)
+    
+    # ----- Rebalancing optimizer -----
+    def site_demand(self, orders: List[Dict], days: int = 30) -> Dict[Tuple[int, int], float]:
+        """Average daily units per (warehouse_id, item_id) over the last N days"""
+        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        demand = {}
+        for order in orders:
+            if order.get('created_date', '')[:10] < cutoff:
+                continue
+            wid = order.get('warehouse_id', self.ledger.default_warehouse)
+            for line in order.get('items', []):
+                key = (wid, line.get('item_id'))
+                demand[key] = demand.get(key, 0) + line.get('quantity', 0)
+        return {key: units / days for key, units in demand.items()}
+    
+    def propose_rebalancing(self, orders: List[Dict], inventory: List[Dict],
+                            days_ahead: int = 7, max_moves: int = None) -> List[Dict]:
+        """
+        Propose transfers that cover projected shortfalls from sites with surplus.
+        
+        A site needs stock when on-hand + inbound falls below min_stock plus
+        its forecast demand over days_ahead; stock above that level (and not
+        reserved) is surplus. Deficits are filled greedily from the largest
+        surplus while the destination has free capacity.
+        """
+        demand = self.site_demand(orders)
+        free_capacity = {wid: cap - self.ledger.site_total(wid)
+                         for wid, cap in self.ledger.capacity.items()}
+        for (wid, _), qty in self._inbound.items():
+            free_capacity[wid] = free_capacity.get(wid, 0) - qty
+        
+        proposals = []
+        for item in inventory:
+            item_id = item['id']
+            min_stock = item.get('min_stock', 10)
+            deficits, surpluses = [], []
+            for wid in self.ledger.capacity:
+                target = min_stock + demand.get((wid, item_id), 0) * days_ahead
+                position = self.ledger.quantity(wid, item_id) + self.inbound(wid, item_id)
+                if position < target:
+                    deficits.append([int(round(target - position)), wid])
+                else:
+                    spare = min(self.ledger.available(wid, item_id), int(position - target))
+                    if spare > 0:
+                        surpluses.append([spare, wid])
+            
+            if not deficits or not surpluses:
+                continue
+            deficits.sort(reverse=True)
+            surpluses.sort(reverse=True)
+            
+            for deficit in deficits:
+                for surplus in surpluses:
+                    qty = min(deficit[0], surplus[0], max(free_capacity.get(deficit[1], 0), 0))
+                    if qty <= 0:
+                        continue
+                    proposals.append({
+                        'item_id': item_id,
+                        'item_name': item.get('name', ''),
+                        'from_warehouse': surplus[1],
+                        'to_warehouse': deficit[1],
+                        'quantity': qty,
+                        'reason': f"Site {deficit[1]} short by {deficit[0]} over {days_ahead} days"
+                    })
+                    deficit[0] -= qty
+                    surplus[0] -= qty
+                    free_capacity[deficit[1]] -= qty
+                    if deficit[0] <= 0:
+                        break
+        
+        proposals.sort(key=lambda p: p['quantity'], reverse=True)
+        return proposals[:max_moves] if max_moves else proposals
+    
+    def apply_proposals(self, proposals: List[Dict]) -> Dict:
+        """Open transfers for a batch of proposals, returns counts"""
+        created, failed = 0, 0
+        for p in proposals:
+            ok, _ = self.create_transfer(p['item_id'], p['from_warehouse'],
+                                         p['to_warehouse'], p['quantity'])
+            created += ok
+            failed += not ok
+        return {'created': created, 'failed': failed}
+
+
+# =============================================================================
+# FEATURE 15: PER-WAREHOUSE DATA SHARDS
+# =============================================================================
+class ShardedStore:
+    """Per-warehouse shard files for employees, inventory and orders
+    
+    Each site lives in shards/warehouse_<id>.json with the same layout as
+    warehouse_data.json. Only the selected site's shard is read; the
+    'All Warehouses' view merges shards, and admin aggregates come from
+    per-shard summaries cached until the shard file changes.
+    """
+    
+    TABLES = ('employees', 'inventory', 'orders', 'order_lines', 'shipments', 'shipment_events',
+              'stock_levels', 'transfers', 'purchase_orders')
+    ID_TABLES = ('employees', 'inventory', 'orders', 'order_lines', 'shipments', 'transfers',
+                 'purchase_orders')   # ids allocated through the manifest
+    
+    def __init__(self, shard_dir="shards"):
+        self.shard_dir = shard_dir
+        self.manifest_file = os.path.join(shard_dir, "manifest.json")
+        self._digests = {}     # warehouse_id -> (file stamp, sha1 of contents)
+        self._summaries = {}   # warehouse_id -> (file stamp, summary)
+    
+    def enabled(self) -> bool:
+        return os.path.exists(self.manifest_file)
+    
+    def _manifest(self) -> Dict:
+        with profiler.open(self.manifest_file, 'rb') as f:
+            return codec.load(f)
+    
+    def _write_manifest(self, manifest: Dict):
+        tmp = f"{self.manifest_file}.tmp"
+        with profiler.open(tmp, 'wb') as f:
+            codec.dump(manifest, f, pretty=True)
+        os.replace(tmp, self.manifest_file)
+    
+    def _shard_path(self, warehouse_id: int) -> str:
+        return os.path.join(self.shard_dir, f"warehouse_{warehouse_id}.json")
+    
+    def _stamp(self, warehouse_id: int) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(self._shard_path(warehouse_id))
+            return info.st_mtime_ns, info.st_size
+        except OSError:
+            return None
+    
+    def warehouse_ids(self) -> List[int]:
+        return self._manifest()['warehouses']
+    
+    def scope_stamp(self, warehouse_id: int = None) -> Tuple:
+        """File stamps of the shards load_scope(warehouse_id) reads"""
+        ids = [warehouse_id] if warehouse_id else self.warehouse_ids()
+        return tuple((wid, self._stamp(wid)) for wid in ids)
+    
+    def default_warehouse(self) -> int:
+        return self._manifest()['default']
+    
+    # ----- Load -----
+    def load(self, warehouse_id: int) -> Dict:
+        """Read one site's shard (empty layout if the site has no data yet)"""
+        data = {table: [] for table in self.TABLES}
+        path = self._shard_path(warehouse_id)
+        if os.path.exists(path):
+            with profiler.open(path, 'rb') as f:
+                raw = f.read()
+            self._digests[warehouse_id] = (self._stamp(warehouse_id), hashlib.sha1(raw).hexdigest())
+            data.update(codec.decode(raw, 'dataset'))
+        return data
+    
+    def load_all(self) -> Dict:
+        """Merged view across all shards (inventory quantities summed per item)"""
+        merged = {table: [] for table in self.TABLES}
+        items = {}
+        for wid in self.warehouse_ids():
+            shard = self.load(wid)
+            for table in self.TABLES:
+                if table != 'inventory':
+                    merged[table].extend(shard[table])
+            for item in shard['inventory']:
+                if item['id'] in items:
+                    items[item['id']]['quantity'] += item['quantity']
+                else:
+                    items[item['id']] = {k: v for k, v in item.items() if k != 'warehouse_id'}
+        merged['inventory'] = sorted(items.values(), key=lambda i: i['id'])
+        return merged
+    
+    def load_scope(self, warehouse_id: int = None) -> Dict:
+        return self.load(warehouse_id) if warehouse_id else self.load_all()
+    
+    # ----- Save -----
+    def split(self, data: Dict) -> Dict[int, Dict]:
+        """Route records to their warehouse shard"""
+        default = self.default_warehouse()
+        shards = {}
+        
+        def shard(wid):
+            return shards.setdefault(wid, {table: [] for table in self.TABLES})
+        
+        for table, key in (('employees', 'warehouse_id'), ('orders', 'warehouse_id'),
+                           ('order_lines', 'warehouse_id'), ('shipments', 'warehouse_id'),
+                           ('shipment_events', 'warehouse_id'), ('stock_levels', 'warehouse_id'),
+                           ('purchase_orders', 'warehouse_id'),
+                           ('transfers', 'from_warehouse')):
+            for record in data.get(table, []):
+                shard(record.get(key, default))[table].append(record)
+        
+        # Each site holds a copy of the catalog item with its own quantity
+        site_qty = {}
+        for row in data.get('stock_levels', []):
+            site_qty.setdefault(row['item_id'], {})[row['warehouse_id']] = row['quantity']
+        for item in data.get('inventory', []):
+            sites = site_qty.get(item['id']) or {item.get('warehouse_id', default): item['quantity']}
+            for wid, qty in sites.items():
+                shard(wid)['inventory'].append({**item, 'quantity': qty, 'warehouse_id': wid})
+        return shards
+    
+    def save(self, data: Dict, warehouse_id: int = None) -> int:
+        """
+        Write shards for data loaded with load_scope(warehouse_id).
+        Only shards whose contents changed are rewritten; returns shards written.
+        """
+        shards = self.split(data)
+        if warehouse_id:
+            foreign = set(shards) - {warehouse_id}
+            if foreign:
+                raise ValueError(f"Records for warehouses {sorted(foreign)} can't be saved while only "
+                                 f"warehouse {warehouse_id} is loaded; select that warehouse or All Warehouses")
+            shards.setdefault(warehouse_id, {table: [] for table in self.TABLES})
+        else:
+            for wid in self.warehouse_ids():
+                shards.setdefault(wid, {table: [] for table in self.TABLES})
+        
+        written = 0
+        for wid, shard in shards.items():
+            raw = codec.dumps(shard)
+            digest = hashlib.sha1(raw).hexdigest()
+            cached = self._digests.get(wid)
+            if cached and cached == (self._stamp(wid), digest):
+                continue
+            tmp = f"{self._shard_path(wid)}.tmp"
+            with profiler.open(tmp, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp, self._shard_path(wid))
+            self._digests[wid] = (self._stamp(wid), digest)
+            written += 1
+        
+        with _file_lock(self.manifest_file):
+            manifest = self._manifest()
+            new_sites = sorted(set(shards) - set(manifest['warehouses']))
+            if new_sites:
+                manifest['warehouses'] = sorted(manifest['warehouses'] + new_sites)
+                self._write_manifest(manifest)
+        return written
+    
+    def migrate(self, data: Dict, warehouses: List[Dict]) -> Tuple[bool, str]:
+        """Split a monolithic dataset into shards and switch sharding on"""
+        try:
+            Path(self.shard_dir).mkdir(parents=True, exist_ok=True)
+            ids = [w['id'] for w in warehouses] or [1]
+            manifest = {'warehouses': ids, 'default': ids[0], 'next_ids': {}}
+            for table in self.ID_TABLES:
+                manifest['next_ids'][table] = max((r['id'] for r in data.get(table, [])), default=0) + 1
+            self._write_manifest(manifest)
+            written = self.save(data)
+            return True, f"✅ Data split into {written} warehouse shards"
+        except Exception as e:
+            return False, f"❌ Sharding failed: {str(e)}"
+    
+    def allocate_id(self, table: str) -> int:
+        """Next globally unique id for a table (ids must not collide across shards)
+        
+        The manifest read-modify-write runs under a file lock so two workers
+        never hand out the same id. A table missing from a manifest written
+        by an older migrate is seeded from the highest id in any shard.
+        """
+        with _file_lock(self.manifest_file):
+            manifest = self._manifest()
+            next_id = manifest['next_ids'].get(table)
+            if next_id is None:
+                next_id = max((r['id'] for wid in manifest['warehouses']
+                               for r in self.load(wid).get(table, [])), default=0) + 1
+            manifest['next_ids'][table] = next_id + 1
+            self._write_manifest(manifest)
+        return next_id
+    
+    # ----- Cross-shard aggregates -----
+    def _summarize(self, warehouse_id: int) -> Dict:
+        stamp = self._stamp(warehouse_id)
+        cached = self._summaries.get(warehouse_id)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        
+        shard = self.load(warehouse_id)
+        inventory, orders = shard['inventory'], shard['orders']
+        summary = {
+            'warehouse_id': warehouse_id,
+            'employees': len(shard['employees']),
+            'payroll': sum(e.get('salary', 0) for e in shard['employees']),
+            'items': len(inventory),
+            'units': sum(i.get('quantity', 0) for i in inventory),
+            'inventory_value': sum(i.get('quantity', 0) * i.get('price', 0) for i in inventory),
+            'low_stock': sum(1 for i in inventory if i.get('quantity', 0) < i.get('min_stock', 10)),
+            'orders': len(orders),
+            'pending_orders': sum(1 for o in orders if o.get('status') not in OrderBook.CLOSED_STATES),
+            'revenue': sum(o.get('total', 0) for o in orders)
+        }
+        self._summaries[warehouse_id] = (stamp, summary)
+        return summary
+    
+    def aggregate(self) -> List[Dict]:
+        """Per-warehouse summaries; only shards changed since the last call are re-read"""
+        return [self._summarize(wid) for wid in self.warehouse_ids()]
+    
+    def aggregate_totals(self) -> Dict:
+        """Company-wide totals across all shards"""
+        totals = {}
+        for summary in self.aggregate():
+            for key, value in summary.items():
+                if key != 'warehouse_id':
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+def dataset_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a dataset file, None if missing; changes on every save by any process"""
+    try:
+        info = os.stat(path)
+        return info.st_mtime_ns, info.st_size
+    except OSError:
+        return None
+
+
+def load_dataset(path: str) -> Dict:
+    """Read a single-file dataset (sharding disabled); empty tables if missing or unreadable"""
+    data = {table: [] for table in ShardedStore.TABLES}
+    if os.path.exists(path):
+        try:
+            with profiler.open(path, 'rb') as f:
+                raw = f.read()
+            try:
+                data.update(codec.decode(raw, 'dataset'))
+            except SchemaError as e:
+                # Keep the records: dropping them here would erase them on the next save
+                print(f"⚠️ {path} does not match the schema: {e}")
+                data.update(codec.loads(raw))
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+    return data
+
+
+def save_dataset(data: Dict, path: str):
+    """Write a single-file dataset (compact JSON)"""
+    with profiler.open(path, 'wb') as f:
+        codec.dump(data, f)
+
+
+# =============================================================================
+# FEATURE 16: ORDER LINES & STOCK RESERVATION STATE MACHINE
+# =============================================================================
+class OrderBook:
+    """Normalized orders + order lines with a per-line fulfilment state machine
+    
+    Pending -> Reserved -> Picked -> Fulfilled, or Cancelled from any open
+    state. Reserving holds stock on the StockLedger (available-to-promise
+    drops, on-hand does not); picking takes it off the shelf; cancelling
+    releases the reservation or puts picked stock back.
+    
+    Order headers stay in data['orders']; lines live in data['order_lines'].
+    view() joins them back into the legacy {'items': [...]} shape for the
+    analytics helpers.
+    """
+    
+    STATES = ('Pending', 'Reserved', 'Picked', 'Fulfilled', 'Cancelled')
+    OPEN_STATES = ('Pending', 'Reserved', 'Picked')
+    CLOSED_STATES = ('Fulfilled', 'Cancelled')
+    TRANSITIONS = {
+        'Pending': ('Reserved', 'Cancelled'),
+        'Reserved': ('Picked', 'Cancelled'),
+        'Picked': ('Fulfilled', 'Cancelled'),
+        'Fulfilled': (),
+        'Cancelled': ()
+    }
+    
+    def __init__(self, data: Dict, ledger: StockLedger, allocate_id: Callable[[str], int] = None):
+        self.data = data
+        self.ledger = ledger
+        self.allocate_id = allocate_id  # shard_store.allocate_id when sharded
+        self._orders = {o['id']: o for o in data.get('orders', [])}
+        self._lines = {}        # order_id -> [lines]
+        self._line_by_id = {}
+        lines = data.setdefault('order_lines', [])
+        self._next_line_id = max((l['id'] for l in lines), default=0) + 1
+        for line in lines:
+            self._index_line(line)
+        
+        # Orders saved before order lines existed: stock was deducted at creation
+        for order in data.get('orders', []):
+            if 'items' in order and order['id'] not in self._lines:
+                status = 'Fulfilled' if order.get('status') == 'Fulfilled' else 'Picked'
+                for item in order.pop('items'):
+                    self._add_line(order, item, status)
+                order['status'] = status
+    
+    def _index_line(self, line: Dict):
+        self._lines.setdefault(line['order_id'], []).append(line)
+        self._line_by_id[line['id']] = line
+    
+    def _new_line_id(self) -> int:
+        """Line ids must be unique across shards: a per-scope max + 1 collides"""
+        if self.allocate_id:
+            return self.allocate_id('order_lines')
+        line_id = self._next_line_id
+        self._next_line_id += 1
+        return line_id
+    
+    def _add_line(self, order: Dict, item: Dict, status: str = 'Pending') -> Dict:
+        line = {
+            'id': self._new_line_id(),
+            'order_id': order['id'],
+            'item_id': item['item_id'],
+            'name': item.get('name', ''),
+            'quantity': item['quantity'],
+            'price': item.get('price', 0),
+            'total': item.get('total', item['quantity'] * item.get('price', 0)),
+            'warehouse_id': order.get('warehouse_id', self.ledger.default_warehouse),
+            'status': status
+        }
+        self.data['order_lines'].append(line)
+        self._index_line(line)
+        return line
+    
+    def _refresh_status(self, order: Dict):
+        """Header status = least advanced open line; 'Partially Fulfilled' if mixed"""
+        states = {l['status'] for l in self._lines.get(order['id'], [])}
+        open_states = [s for s in self.OPEN_STATES if s in states]
+        if open_states:
+            order['status'] = 'Partially Fulfilled' if 'Fulfilled' in states else open_states[0]
+        elif 'Fulfilled' in states:
+            order['status'] = 'Fulfilled'
+        else:
+            order['status'] = 'Cancelled'
+        order['updated_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    # ----- Stock effects of a line transition -----
+    def _apply(self, line: Dict, new_state: str) -> Tuple[bool, str]:
+        wid, iid, qty, old = line['warehouse_id'], line['item_id'], line['quantity'], line['status']
+        if new_state not in self.TRANSITIONS[old]:
+            return False, f"❌ Cannot move line from {old} to {new_state}"
+        
+        if new_state == 'Reserved':
+            ok, msg = self.ledger.reserve(wid, iid, qty)
+            if not ok:
+                return False, f"{msg} ({line['name']})"
+        elif new_state == 'Picked':
+            ok, msg = self.ledger.adjust(wid, iid, -qty, consume_reserved=qty)
+            if not ok:
+                return False, f"{msg} ({line['name']})"
+        elif new_state == 'Cancelled' and old in ('Reserved', 'Picked'):
+            if old == 'Reserved':
+                ok, msg = self.ledger.release(wid, iid, qty)
+            else:
+                ok, msg = self.ledger.adjust(wid, iid, qty)
+            if not ok:
+                return False, f"{msg} ({line['name']})"
+        line['status'] = new_state
+        return True, "✅ Line updated"
+    
+    def _split(self, line: Dict, qty: int) -> Dict:
+        """Split off the remainder of a line so qty units can move on alone"""
+        order = self._orders[line['order_id']]
+        remainder = self._add_line(order, {**line, 'quantity': line['quantity'] - qty,
+                                           'total': (line['quantity'] - qty) * line['price']},
+                                   line['status'])
+        line['quantity'] = qty
+        line['total'] = qty * line['price']
+        return remainder
+    
+    def _unsplit(self, line: Dict, remainder: Dict):
+        """Merge a split-off remainder back after the transition failed"""
+        line['quantity'] += remainder['quantity']
+        line['total'] = line['quantity'] * line['price']
+        self._lines[remainder['order_id']].remove(remainder)
+        del self._line_by_id[remainder['id']]
+        self.data['order_lines'].remove(remainder)
+    
+    # ----- Public API -----
+    def create_order(self, order_id: int, customer: str, items: List[Dict], warehouse_id: int,
+                     reserve: bool = True) -> Tuple[bool, str, Optional[Dict]]:
+        """Create an order with its lines, reserving stock for every line or none"""
+        order = {
+            'id': order_id,
+            'customer': customer,
+            'total': sum(i['quantity'] * i['price'] for i in items),
+            'total_qty': sum(i['quantity'] for i in items),
+            'status': 'Pending',
+            'warehouse_id': warehouse_id,
+            'created_date': datetime.now().strftime("%Y-%m-%d")
+        }
+        self.data['orders'].append(order)
+        self._orders[order_id] = order
+        lines = [self._add_line(order, item) for item in items]
+        
+        if reserve:
+            done = []
+            for line in lines:
+                ok, msg = self._apply(line, 'Reserved')
+                if not ok:
+                    for reserved in done:
+                        self._apply(reserved, 'Cancelled')
+                    self.delete_order(order_id)
+                    return False, msg, None
+                done.append(line)
+        
+        self._refresh_status(order)
+        orders_created.labels(warehouse_id).inc()
+        return True, f"✅ Order #{order_id} created", order
+    
+    def advance_line(self, line_id: int, new_state: str, qty: int = None) -> Tuple[bool, str]:
+        """Move one line (or qty units of it, for partial fulfilment) to new_state"""
+        line = self._line_by_id.get(line_id)
+        if not line:
+            return False, "❌ Order line not found"
+        if qty is not None and 0 < qty < line['quantity']:
+            if new_state not in self.TRANSITIONS[line['status']]:
+                return False, f"❌ Cannot move line from {line['status']} to {new_state}"
+            remainder = self._split(line, qty)
+            ok, msg = self._apply(line, new_state)
+            if not ok:
+                self._unsplit(line, remainder)
+        else:
+            ok, msg = self._apply(line, new_state)
+        self._refresh_status(self._orders[line['order_id']])
+        return ok, msg
+    
+    def advance_order(self, order_id: int, new_state: str) -> Tuple[bool, str]:
+        """Move every line that allows it to new_state"""
+        order = self._orders.get(order_id)
+        if not order:
+            return False, "❌ Order not found"
+        moved, errors = 0, []
+        for line in self._lines.get(order_id, []):
+            if new_state in self.TRANSITIONS[line['status']]:
+                ok, msg = self._apply(line, new_state)
+                moved += ok
+                if not ok:
+                    errors.append(msg)
+        self._refresh_status(order)
+        if errors:
+            return moved > 0, "; ".join(errors)
+        return moved > 0, f"✅ Order #{order_id}: {moved} lines → {new_state}" if moved else "❌ Nothing to update"
+    
+    def next_state(self, order: Dict) -> Optional[str]:
+        """Next forward state for an order's least advanced open line"""
+        for state in self.OPEN_STATES:
+            if any(l['status'] == state for l in self._lines.get(order['id'], [])):
+                return self.TRANSITIONS[state][0]
+        return None
+    
+    def delete_order(self, order_id: int) -> Tuple[bool, str]:
+        """Cancel open lines (restoring stock) and remove the order"""
+        order = self._orders.get(order_id)
+        if not order:
+            return False, "❌ Order not found"
+        lines = self._lines.get(order_id, [])
+        restored = 0
+        for line in lines:
+            if line['status'] in self.OPEN_STATES:
+                holds_stock = line['status'] != 'Pending'
+                ok, msg = self._apply(line, 'Cancelled')
+                if not ok:
+                    self._refresh_status(order)
+                    return False, msg
+                restored += holds_stock
+        
+        del self._orders[order_id]
+        self._lines.pop(order_id, None)
+        for line in lines:
+            del self._line_by_id[line['id']]
+        removed = {id(l) for l in lines}
+        self.data['order_lines'] = [l for l in self.data['order_lines'] if id(l) not in removed]
+        self.data['orders'].remove(order)
+        if restored:
+            return True, f"✅ Order #{order_id} deleted, stock restored for {restored} lines"
+        return True, f"✅ Order #{order_id} deleted"
+    
+    def lines(self, order_id: int) -> List[Dict]:
+        return self._lines.get(order_id, [])
+    
+    def view(self, orders: List[Dict]) -> List[Dict]:
+        """Orders joined with their lines under 'items' (legacy shape)"""
+        return [{**o, 'items': self._lines.get(o['id'], [])} for o in orders]
+
+
+# =============================================================================
+# FEATURE 17: PICK WAVES (Batching by SKU overlap)
+# =============================================================================
+class WavePlanner:
+    """Groups orders awaiting picking into waves with consolidated pick lists
+    
+    Orders are batched per warehouse. Each wave is seeded with the oldest
+    unassigned order and grown greedily with the orders sharing the most
+    SKUs with it, found through a SKU -> orders index, until the order,
+    unit or SKU limits are reached.
+    """
+    
+    def __init__(self, order_book: OrderBook, max_orders: int = 25, max_units: int = 500,
+                 max_skus: int = 40, router: 'PickPathOptimizer' = None):
+        self.order_book = order_book
+        self.router = router
+        self.max_orders = max_orders
+        self.max_units = max_units
+        self.max_skus = max_skus
+    
+    def _pickable(self, warehouse_id: int = None, states: Tuple = ('Reserved',)) -> Dict:
+        """warehouse_id -> order_id -> [lines] for lines ready to pick"""
+        sites = {}
+        for line in self.order_book.data.get('order_lines', []):
+            if line['status'] in states and (warehouse_id is None or line['warehouse_id'] == warehouse_id):
+                sites.setdefault(line['warehouse_id'], {}).setdefault(line['order_id'], []).append(line)
+        return sites
+    
+    def _plan_site(self, warehouse_id: int, orders: Dict[int, List[Dict]], first_wave: int) -> List[Dict]:
+        skus_of = {oid: {l['item_id'] for l in lines} for oid, lines in orders.items()}
+        units_of = {oid: sum(l['quantity'] for l in lines) for oid, lines in orders.items()}
+        orders_of = {}  # item_id -> [order_ids]
+        for oid, skus in skus_of.items():
+            for sku in skus:
+                orders_of.setdefault(sku, []).append(oid)
+        
+        unassigned = set(orders)
+        seeds = sorted(orders)  # oldest first
+        seed_pos = 0
+        waves = []
+        while unassigned:
+            while seeds[seed_pos] not in unassigned:
+                seed_pos += 1
+            members, wave_skus, units = [], set(), 0
+            overlap, heap = {}, []
+            
+            def add(oid):
+                nonlocal units
+                unassigned.discard(oid)
+                members.append(oid)
+                units += units_of[oid]
+                for sku in skus_of[oid] - wave_skus:
+                    wave_skus.add(sku)
+                    for other in orders_of[sku]:
+                        if other in unassigned:
+                            overlap[other] = overlap.get(other, 0) + 1
+                            heapq.heappush(heap, (-overlap[other], other))
+            
+            add(seeds[seed_pos])
+            while len(members) < self.max_orders and heap:
+                score, oid = heapq.heappop(heap)
+                if oid not in unassigned or -score != overlap[oid]:
+                    continue  # stale heap entry
+                new_skus = len(skus_of[oid] - wave_skus)
+                if units + units_of[oid] > self.max_units or len(wave_skus) + new_skus > self.max_skus:
+                    overlap[oid] = 0  # too big for this wave; stays in the pool
+                    continue
+                add(oid)
+            
+            waves.append(self._wave(first_wave + len(waves), warehouse_id,
+                                    {oid: orders[oid] for oid in members}))
+        return waves
+    
+    @staticmethod
+    def _wave(wave_id: int, warehouse_id: int, orders: Dict[int, List[Dict]]) -> Dict:
+        picks, order_ids = {}, {}
+        for lines in orders.values():
+            for line in lines:
+                pick = picks.setdefault(line['item_id'], {'item_id': line['item_id'], 'name': line['name'],
+                                                          'quantity': 0, 'orders': 0})
+                pick['quantity'] += line['quantity']
+                order_ids.setdefault(line['item_id'], set()).add(line['order_id'])
+        # Split lines of one order share a SKU: count distinct orders, not lines
+        for item_id, pick in picks.items():
+            pick['orders'] = len(order_ids[item_id])
+        return {
+            'wave_id': wave_id,
+            'warehouse_id': warehouse_id,
+            'order_ids': sorted(orders),
+            'line_ids': [l['id'] for lines in orders.values() for l in lines],
+            'units': sum(p['quantity'] for p in picks.values()),
+            'skus': len(picks),
+            'pick_list': sorted(picks.values(), key=lambda p: p['item_id'])
+        }
+    
+    def plan(self, warehouse_id: int = None) -> List[Dict]:
+        """Plan waves for every site (or one site) from reserved order lines"""
+        waves = []
+        for wid, orders in sorted(self._pickable(warehouse_id).items(), key=lambda kv: str(kv[0])):
+            waves.extend(self._plan_site(wid, orders, len(waves) + 1))
+        if self.router:
+            for wave in waves:
+                route = self.router.route(wave['warehouse_id'], wave['pick_list'])
+                wave['pick_list'] = route['stops']
+                wave['distance'] = route['distance']
+                wave['unrouted_distance'] = route['unrouted_distance']
+        return waves
+    
+    def release(self, wave: Dict) -> Tuple[bool, str]:
+        """Mark every line in a wave as Picked"""
+        try:
+            picked, errors = 0, []
+            for line_id in wave['line_ids']:
+                ok, msg = self.order_book.advance_line(line_id, 'Picked')
+                picked += ok
+                if not ok:
+                    errors.append(msg)
+            if errors:
+                return picked > 0, f"⚠️ {picked} lines picked, {len(errors)} failed: {errors[0]}"
+            return True, f"✅ Wave {wave['wave_id']}: {picked} lines picked for {len(wave['order_ids'])} orders"
+        except Exception as e:
+            return False, f"❌ Error releasing wave: {str(e)}"
+
+
+# =============================================================================
+# FEATURE 18: PICK-PATH OPTIMIZATION (Bin locations)
+# =============================================================================
+class PickPathOptimizer:
+    """Orders a pick list to minimize walking distance through a site
+    
+    Bins are coded AISLE-BAY-LEVEL ("B-07-2"). Aisles are parallel and run
+    front to back, with cross aisles at the front (bay 0) and the back
+    (bay depth + 1); the depot is at the front of aisle A. Level does not
+    add walking distance. Routes start from nearest-neighbour and are then
+    improved with 2-opt under an iteration budget, so a wave routes in
+    milliseconds.
+    """
+    
+    def __init__(self, ledger: StockLedger, aisle_width: float = 3.0, bay_length: float = 1.0,
+                 max_passes: int = 20):
+        self.ledger = ledger
+        self.aisle_width = aisle_width
+        self.bay_length = bay_length
+        self.max_passes = max_passes
+        self._depth = {}  # warehouse_id -> deepest bay, for cross-aisle distances
+    
+    @staticmethod
+    def parse_bin(bin_code: str) -> Optional[Tuple[int, int, int]]:
+        """"B-07-2" -> (aisle index 1, bay 7, level 2); None if malformed"""
+        parts = (bin_code or '').strip().upper().split('-')
+        if len(parts) not in (2, 3) or not parts[0].isalpha() or not all(p.isdigit() for p in parts[1:]):
+            return None
+        aisle = 0
+        for ch in parts[0]:
+            aisle = aisle * 26 + (ord(ch) - ord('A') + 1)
+        return aisle - 1, int(parts[1]), int(parts[2]) if len(parts) == 3 else 1
+    
+    def site_depth(self, warehouse_id: int) -> int:
+        """Deepest bay in use at a site (computed once per optimizer)"""
+        if warehouse_id not in self._depth:
+            spots = (self.parse_bin(self.ledger.bin_of(warehouse_id, iid) or '')
+                     for iid in self.ledger._site_items.get(warehouse_id, ()))
+            self._depth[warehouse_id] = max((spot[1] for spot in spots if spot), default=0)
+        return self._depth[warehouse_id]
+    
+    def _distance(self, a: Tuple[int, int], b: Tuple[int, int], depth: int) -> float:
+        (a_aisle, a_bay), (b_aisle, b_bay) = a, b
+        if a_aisle == b_aisle:
+            return abs(a_bay - b_bay) * self.bay_length
+        # Change aisles through whichever cross aisle is shorter
+        along = min(a_bay + b_bay, 2 * (depth + 1) - a_bay - b_bay) * self.bay_length
+        return abs(a_aisle - b_aisle) * self.aisle_width + along
+    
+    def _tour_length(self, tour: List[int], dist: List[List[float]]) -> float:
+        return sum(dist[tour[i]][tour[i + 1]] for i in range(len(tour) - 1))
+    
+    def route(self, warehouse_id: int, pick_list: List[Dict]) -> Dict:
+        """Returns {'stops': pick list in walking order with bin/step, 'distance', 'unrouted_distance'}"""
+        located, unlocated = [], []
+        for pick in pick_list:
+            code = self.ledger.bin_of(warehouse_id, pick['item_id'])
+            spot = self.parse_bin(code) if code else None
+            (located if spot else unlocated).append((pick, code or '', spot))
+        
+        if not located:
+            stops = [{**p, 'bin': '', 'step': n} for n, (p, _, _) in enumerate(pick_list, start=1)]
+            return {'stops': stops, 'distance': 0.0, 'unrouted_distance': 0.0}
+        
+        # Node 0 is the depot; route returns to it
+        points = [(0, 0)] + [(spot[0], spot[1]) for _, _, spot in located]
+        depth = max(self.site_depth(warehouse_id), max(p[1] for p in points))
+        n = len(points)
+        dist = [[self._distance(points[i], points[j], depth) for j in range(n)] for i in range(n)]
+        unrouted = self._tour_length([0] + list(range(1, n)) + [0], dist)
+        
+        # Nearest neighbour
+        tour, left = [0], set(range(1, n))
+        while left:
+            here = tour[-1]
+            nxt = min(left, key=lambda j: (dist[here][j], j))
+            tour.append(nxt)
+            left.discard(nxt)
+        tour.append(0)
+        
+        # 2-opt: reverse segments while that shortens the tour
+        for _ in range(self.max_passes):
+            improved = False
+            for i in range(1, n - 1):
+                for k in range(i + 1, n):
+                    a, b, c, d = tour[i - 1], tour[i], tour[k], tour[k + 1]
+                    if dist[a][c] + dist[b][d] < dist[a][b] + dist[c][d] - 1e-9:
+                        tour[i:k + 1] = reversed(tour[i:k + 1])
+                        improved = True
+            if not improved:
+                break
+        
+        ordered = [located[j - 1] for j in tour[1:-1]] + unlocated
+        stops = [{**pick, 'bin': code, 'step': step} for step, (pick, code, _) in enumerate(ordered, start=1)]
+        return {'stops': stops, 'distance': round(self._tour_length(tour, dist), 1),
+                'unrouted_distance': round(unrouted, 1)}
+
+
+# =============================================================================
+# FEATURE 19: SHIPMENTS (Carrier batching, manifests, tracking history)
+# =============================================================================
+class ShipmentManager:
+    """Consolidates fulfilled orders into shipments and tracks their status
+    
+    Fulfilled orders not yet shipped are grouped by (warehouse, destination,
+    carrier) and split into shipments no larger than the carrier's unit
+    limit. Status changes are appended to data['shipment_events'] and never
+    rewritten; tracking-number and per-shipment indexes built on load make
+    track() constant-time.
+    """
+    
+    CARRIERS = {           # carrier -> max units per shipment
+        'Delhivery': 300,
+        'BlueDart': 200,
+        'India Post': 100
+    }
+    DEFAULT_CARRIER = 'Delhivery'
+    STATUSES = ('Created', 'Manifested', 'In Transit', 'Out for Delivery', 'Delivered', 'Exception')
+    TRANSITIONS = {
+        'Created': ('Manifested', 'Exception'),
+        'Manifested': ('In Transit', 'Exception'),
+        'In Transit': ('Out for Delivery', 'Delivered', 'Exception'),
+        'Out for Delivery': ('Delivered', 'Exception'),
+        'Delivered': (),
+        'Exception': ('In Transit', 'Out for Delivery', 'Delivered')
+    }
+    
+    def __init__(self, data: Dict, default_warehouse: int = 1, manifest_dir="manifests",
+                 allocate_id: Callable[[str], int] = None):
+        self.data = data
+        self.default_warehouse = default_warehouse
+        self.manifest_dir = manifest_dir
+        self.allocate_id = allocate_id  # shard_store.allocate_id when sharded
+        shipments = data.setdefault('shipments', [])
+        events = data.setdefault('shipment_events', [])
+        self._by_id = {s['id']: s for s in shipments}
+        self._by_tracking = {s['tracking']: s for s in shipments if 'tracking' in s}
+        self._history = {}  # shipment_id -> [events]
+        for event in events:
+            self._history.setdefault(event['shipment_id'], []).append(event)
+        self._next_id = max(self._by_id, default=0) + 1
+    
+    def _event(self, shipment: Dict, status: str, note: str = '', when: str = None):
+        event = {
+            'shipment_id': shipment['id'],
+            'warehouse_id': shipment.get('warehouse_id'),
+            'status': status,
+            'timestamp': when or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'note': note
+        }
+        self.data['shipment_events'].append(event)
+        self._history.setdefault(shipment['id'], []).append(event)
+        shipment['status'] = status
+        shipment['updated'] = event['timestamp']
+    
+    def unshipped(self, orders: List[Dict], warehouse_id: int = None) -> List[Dict]:
+        """Fulfilled orders that are not on a shipment yet"""
+        return [o for o in orders
+                if o.get('status') == 'Fulfilled' and not o.get('shipment_id')
+                and (warehouse_id is None or (o.get('warehouse_id') or self.default_warehouse) == warehouse_id)]
+    
+    def consolidate(self, orders: List[Dict], warehouse_id: int = None) -> Tuple[bool, str, List[Dict]]:
+        """Create shipments for every unshipped fulfilled order (one pass, grouped)"""
+        try:
+            groups = {}
+            for order in self.unshipped(orders, warehouse_id):
+                carrier = order.get('carrier') or self.DEFAULT_CARRIER
+                key = (order.get('warehouse_id') or self.default_warehouse, (order.get('destination') or 'Unspecified').strip().title(), carrier)
+                groups.setdefault(key, []).append(order)
+            
+            created = []
+            today = datetime.now().strftime("%Y-%m-%d")
+            for (wid, destination, carrier), group in sorted(groups.items(), key=lambda kv: str(kv[0])):
+                limit = self.CARRIERS.get(carrier, self.CARRIERS[self.DEFAULT_CARRIER])
+                batch, units = [], 0
+                for order in group + [None]:
+                    qty = order.get('total_qty', 0) if order else 0
+                    if batch and (order is None or units + qty > limit):
+                        created.append(self._create(wid, destination, carrier, batch, units, today))
+                        batch, units = [], 0
+                    if order:
+                        batch.append(order)
+                        units += qty
+            
+            if not created:
+                return True, "📭 No fulfilled orders waiting to ship", []
+            return True, f"✅ {len(created)} shipments created for {sum(len(s['order_ids']) for s in created)} orders", created
+        except Exception as e:
+            return False, f"❌ Error consolidating shipments: {str(e)}", []
+    
+    def _create(self, warehouse_id: int, destination: str, carrier: str, orders: List[Dict],
+                units: int, today: str) -> Dict:
+        if self.allocate_id:
+            shipment_id = self.allocate_id('shipments')  # also keeps tracking numbers unique
+        else:
+            shipment_id = self._next_id
+            self._next_id += 1
+        shipment = {
+            'id': shipment_id,
+            'tracking': f"{''.join(c for c in carrier if c.isalpha())[:3].upper()}{today.replace('-', '')}{shipment_id:06d}",
+            'warehouse_id': warehouse_id,
+            'carrier': carrier,
+            'destination': destination,
+            'order_ids': [o['id'] for o in orders],
+            'units': units,
+            'created_date': today
+        }
+        for order in orders:
+            order['shipment_id'] = shipment_id
+        self.data['shipments'].append(shipment)
+        self._by_id[shipment_id] = shipment
+        self._by_tracking[shipment['tracking']] = shipment
+        self._event(shipment, 'Created', f"{len(orders)} orders, {units} units")
+        return shipment
+    
+    def update_status(self, refs: List, status: str, note: str = '') -> Tuple[bool, str]:
+        """Append a status event to each shipment (ids or tracking numbers)"""
+        if status not in self.STATUSES:
+            return False, f"❌ Unknown status: {status}"
+        updated, skipped = 0, []
+        when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for ref in refs:
+            shipment = self._by_tracking.get(ref) or self._by_id.get(ref)
+            if not shipment or status not in self.TRANSITIONS[shipment['status']]:
+                skipped.append(str(ref))
+                continue
+            self._event(shipment, status, note, when)
+            updated += 1
+        if skipped:
+            return updated > 0, f"⚠️ {updated} updated to {status}; skipped {len(skipped)}: {', '.join(skipped[:5])}"
+        return True, f"✅ {updated} shipments → {status}"
+    
+    def generate_manifests(self, warehouse_id: int = None) -> Tuple[bool, str, List[Dict]]:
+        """One manifest per (site, carrier) covering every Created shipment; writes CSVs"""
+        try:
+            pending = {}
+            for shipment in self.data['shipments']:
+                if shipment['status'] == 'Created' and (warehouse_id is None or shipment.get('warehouse_id') == warehouse_id):
+                    pending.setdefault((shipment.get('warehouse_id'), shipment['carrier']), []).append(shipment)
+            if not pending:
+                return True, "📭 No shipments waiting for a manifest", []
+            
+            Path(self.manifest_dir).mkdir(exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            manifests = []
+            for (wid, carrier), shipments in sorted(pending.items(), key=lambda kv: str(kv[0])):
+                manifest_id = f"MF-{wid}-{''.join(c for c in carrier if c.isalpha()).upper()}-{stamp}"
+                path = os.path.join(self.manifest_dir, f"{manifest_id}.csv")
+                with open(path, 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['tracking', 'destination', 'orders', 'units'])
+                    for shipment in shipments:
+                        writer.writerow([shipment['tracking'], shipment['destination'],
+                                         ' '.join(str(o) for o in shipment['order_ids']), shipment['units']])
+                        shipment['manifest_id'] = manifest_id
+                        self._event(shipment, 'Manifested', manifest_id)
+                manifests.append({
+                    'manifest_id': manifest_id,
+                    'warehouse_id': wid,
+                    'carrier': carrier,
+                    'shipments': len(shipments),
+                    'units': sum(s['units'] for s in shipments),
+                    'file': path
+                })
+            return True, f"✅ {len(manifests)} manifests generated", manifests
+        except Exception as e:
+            return False, f"❌ Error generating manifests: {str(e)}", []
+    
+    def track(self, ref) -> Optional[Dict]:
+        """Shipment plus its full status history, by tracking number or id, O(1)"""
+        shipment = self._by_tracking.get(ref) or self._by_id.get(ref)
+        if not shipment:
+            return None
+        return {**shipment, 'history': self._history.get(shipment['id'], [])}
+    
+    def summary(self, warehouse_id: int = None) -> Dict[str, int]:
+        """Shipment counts by current status"""
+        counts = {status: 0 for status in self.STATUSES}
+        for shipment in self.data['shipments']:
+            if warehouse_id is None or shipment.get('warehouse_id') == warehouse_id:
+                counts[shipment['status']] = counts.get(shipment['status'], 0) + 1
+        return counts
+
+
+# =============================================================================
+# FEATURE 20: DOMAIN EVENT BUS (Background side-effects)
+# =============================================================================
+class EventBus:
+    """In-process publish/subscribe for domain events
+    
+    Handlers do their primary write (save_data) and publish an event; audit
+    logging, metrics and alerts run on a background worker that drains the
+    queue in batches. Subscribers registered with sync=True (cache
+    invalidation) run inline so the next rerun never sees stale views.
+    
+    The worker is a daemon thread and the queue lives in memory: events
+    still queued when the process crashes are lost (atexit flushes them on a
+    normal exit). publish() therefore waits for delivery of DURABLE_TYPES,
+    the security-relevant events whose audit entry must not go missing.
+    """
+    
+    EVENT_TYPES = {                # event type -> (audit action, module)
+        'UserCreated': ('CREATE', 'users'),
+        'UserDeleted': ('DELETE', 'users'),
+        'PasswordChanged': ('UPDATE', 'users'),
+        'EmployeeHired': ('CREATE', 'employees'),
+        'AttendanceRecorded': ('UPDATE', 'attendance'),
+        'InventoryItemAdded': ('CREATE', 'inventory'),
+        'StockAdjusted': ('UPDATE', 'inventory'),
+        'TransferCreated': ('CREATE', 'transfers'),
+        'TransferUpdated': ('UPDATE', 'transfers'),
+        'OrderCreated': ('CREATE', 'orders'),
+        'OrderUpdated': ('UPDATE', 'orders'),
+        'OrderDeleted': ('DELETE', 'orders'),
+        'ShipmentsCreated': ('CREATE', 'shipments'),
+        'ShipmentsUpdated': ('UPDATE', 'shipments'),
+        'StockLow': ('UPDATE', 'inventory'),
+        'PurchaseOrdersDrafted': ('CREATE', 'purchase_orders'),
+        'PurchaseOrderUpdated': ('UPDATE', 'purchase_orders'),
+        'StockRecovered': ('UPDATE', 'inventory'),
+        'SettingsChanged': ('UPDATE', 'system')
+    }
+    DURABLE_TYPES = ('UserCreated', 'UserDeleted', 'PasswordChanged', 'SettingsChanged')
+    
+    def __init__(self, batch_size: int = 200, flush_interval: float = 0.25, max_alerts: int = 100):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._sync = []             # (event types or None, handler)
+        self._async = []
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._worker = None
+        self._worker_lock = threading.Lock()  # two sessions must not both start a worker
+        self.alerts = deque(maxlen=max_alerts)
+        self.stats = {'published': 0, 'delivered': 0, 'batches': 0, 'errors': 0, 'by_type': {}}
+        atexit.register(self.flush)
+    
+    def subscribe(self, handler, event_types: List[str] = None, sync: bool = False):
+        """handler(events: List[Dict]) for the given types (all types if None)"""
+        (self._sync if sync else self._async).append((set(event_types) if event_types else None, handler))
+    
+    def publish(self, event_type: str, record_id: int = 0, user: str = "System",
+                details: str = "", **payload) -> Dict:
+        """Queue an event for background subscribers; returns immediately"""
+        action, module = self.EVENT_TYPES.get(event_type, ('UPDATE', 'system'))
+        event = {
+            'type': event_type,
+            'timestamp': datetime.now().isoformat(),
+            'action': action,
+            'module': module,
+            'record_id': record_id,
+            'user': user,
+            'details': details,
+            **payload
+        }
+        with self._idle:
+            self.stats['published'] += 1
+            self.stats['by_type'][event_type] = self.stats['by_type'].get(event_type, 0) + 1
+        self._deliver(self._sync, [event])
+        
+        with self._idle:
+            self._pending += 1
+        self._queue.put(event)
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="event-bus", daemon=True)
+                self._worker.start()
+        if event_type in self.DURABLE_TYPES:
+            self.flush()  # audit entry on disk before the caller reports success
+        return event
+    
+    def _deliver(self, subscribers: List, events: List[Dict]):
+        for types, handler in subscribers:
+            matching = events if types is None else [e for e in events if e['type'] in types]
+            if not matching:
+                continue
+            try:
+                handler(matching)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Event handler error ({getattr(handler, '__name__', handler)}): {e}")
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._deliver(self._async, batch)
+            self.stats['batches'] += 1
+            self.stats['delivered'] += len(batch)
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued event has been delivered"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+    
+    def queue_depth(self) -> int:
+        return self._pending
+    
+    def collect_alerts(self, events: List[Dict]):
+        """Subscriber: keep events that carry an 'alert' for the dashboard feed"""
+        for event in events:
+            if event.get('alert'):
+                self.alerts.appendleft({'timestamp': event['timestamp'], 'type': event['type'],
+                                        'alert': event['alert']})
+
+
+class ViewCache:
+    """Memoized dashboard/report computations, dropped when their modules change
+    
+    Events only reach this process, so each entry also records the data
+    generation (file or shard stamp) it was computed from; a write by another
+    worker changes the generation and the next get() recomputes.
+    """
+    
+    def __init__(self):
+        self._entries = {}   # key -> (modules, generation, value)
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, modules: Tuple[str, ...], compute, generation=None):
+        """Cached value for key at this data generation, computing it on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] == generation:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        value = compute()
+        self._entries[key] = (set(modules), generation, value)
+        return value
+    
+    def invalidate(self, events: List[Dict]):
+        """Subscriber: drop entries that depend on any module the events touched"""
+        touched = {e['module'] for e in events}
+        for key in [k for k, (modules, _, _) in self._entries.items() if modules & touched]:
+            del self._entries[key]
+    
+    def clear(self):
+        self._entries.clear()
+
+
+# =============================================================================
+# FEATURE 21: REPLENISHMENT (Draft purchase orders)
+# =============================================================================
+class ReplenishmentEngine:
+    """Turns per-SKU demand into draft purchase orders, grouped by supplier
+    
+    One pass over order lines builds a daily demand series per (site, item).
+    For each pair, reorder point = demand over the lead time + safety stock
+    (z * sigma * sqrt(lead time)), floored at min_stock. When the inventory
+    position (on hand - reserved + on order) falls to the reorder point, the
+    engine orders max(EOQ, shortfall), rounded up to the case pack. Quantity
+    already on open POs counts as on order, and new lines merge into the
+    supplier's open draft, so repeated runs never double-order.
+    """
+    
+    OPEN_STATES = ('Draft', 'Submitted')
+    DEFAULT_SUPPLIER = 'Default Supplier'
+    
+    def __init__(self, data: Dict, ledger: StockLedger, history_days: int = 30,
+                 service_z: float = 1.65, holding_rate: float = 0.25,
+                 default_lead_time: int = 7, default_order_cost: float = 500.0,
+                 allocate_id: Callable[[str], int] = None):
+        self.data = data
+        self.ledger = ledger
+        self.allocate_id = allocate_id        # shard_store.allocate_id when sharded
+        self.history_days = history_days
+        self.service_z = service_z            # 1.65 ~ 95% cycle service level
+        self.holding_rate = holding_rate      # yearly holding cost as a share of unit price
+        self.default_lead_time = default_lead_time
+        self.default_order_cost = default_order_cost
+        self.suppliers = {s['name']: s for s in data.get('suppliers', [])}
+        data.setdefault('purchase_orders', [])
+    
+    def _supplier(self, item: Dict) -> Dict:
+        name = item.get('supplier') or self.DEFAULT_SUPPLIER
+        supplier = self.suppliers.get(name, {})
+        return {
+            'name': name,
+            'lead_time_days': item.get('lead_time_days', supplier.get('lead_time_days', self.default_lead_time)),
+            'order_cost': supplier.get('order_cost', self.default_order_cost)
+        }
+    
+    def demand_series(self, today: datetime = None) -> Dict[Tuple[int, int], List[int]]:
+        """(warehouse_id, item_id) -> units per day over the history window, oldest first"""
+        today = (today or datetime.now()).date()
+        start = today - timedelta(days=self.history_days - 1)
+        order_dates = {}
+        for order in self.data.get('orders', []):
+            try:
+                day = datetime.strptime(order.get('created_date', '')[:10], "%Y-%m-%d").date()
+            except ValueError:
+                continue
+            if start <= day <= today:
+                order_dates[order['id']] = (day - start).days
+        
+        series = {}
+        for line in self.data.get('order_lines', []):
+            offset = order_dates.get(line['order_id'])
+            if offset is None or line['status'] == 'Cancelled':
+                continue
+            key = (line['warehouse_id'], line['item_id'])
+            days = series.get(key)
+            if days is None:
+                days = series[key] = [0] * self.history_days
+            days[offset] += line['quantity']
+        return series
+    
+    def on_order(self) -> Dict[Tuple[int, int], int]:
+        """(warehouse_id, item_id) -> units on open purchase orders"""
+        pending = {}
+        for po in self.data['purchase_orders']:
+            if po['status'] in self.OPEN_STATES:
+                for line in po['lines']:
+                    key = (po['warehouse_id'], line['item_id'])
+                    pending[key] = pending.get(key, 0) + line['quantity']
+        return pending
+    
+    def plan(self, today: datetime = None) -> List[Dict]:
+        """Replenishment lines for every (site, item) at or below its reorder point"""
+        series = self.demand_series(today)
+        on_order = self.on_order()
+        proposals = []
+        for (wid, item_id), row in self.ledger._rows.items():
+            item = self.ledger._items.get(item_id)
+            if not item:
+                continue
+            days = series.get((wid, item_id))
+            mean = sum(days) / len(days) if days else 0.0
+            sigma = (sum((d - mean) ** 2 for d in days) / len(days)) ** 0.5 if days else 0.0
+            supplier = self._supplier(item)
+            lead = supplier['lead_time_days']
+            
+            safety = self.service_z * sigma * lead ** 0.5
+            reorder_point = max(mean * lead + safety, item.get('min_stock', 10))
+            position = row['quantity'] - row.get('reserved', 0) + on_order.get((wid, item_id), 0)
+            if position > reorder_point:
+                continue
+            
+            annual_demand = mean * 365
+            holding = max(item.get('price', 0) * self.holding_rate, 0.01)
+            eoq = (2 * annual_demand * supplier['order_cost'] / holding) ** 0.5 if annual_demand else 0
+            qty = max(eoq, reorder_point - position, 1)
+            pack = max(int(item.get('case_pack', 1)), 1)
+            qty = int(-(-qty // pack) * pack)  # round up to whole cases
+            
+            proposals.append({
+                'warehouse_id': wid,
+                'item_id': item_id,
+                'name': item['name'],
+                'supplier': supplier['name'],
+                'quantity': qty,
+                'unit_cost': item.get('cost', item.get('price', 0)),
+                'daily_demand': round(mean, 2),
+                'reorder_point': round(reorder_point, 1),
+                'position': position,
+                'eoq': round(eoq, 1),
+                'lead_time_days': lead
+            })
+        return proposals
+    
+    def run(self, today: datetime = None) -> Dict:
+        """Batch job: plan the whole catalog and write/merge draft POs per supplier and site"""
+        started = time.perf_counter()
+        try:
+            proposals = self.plan(today)
+            drafts = {(po['supplier'], po['warehouse_id']): po for po in self.data['purchase_orders']
+                      if po['status'] == 'Draft'}
+            next_id = max((po['id'] for po in self.data['purchase_orders']), default=0) + 1
+            created, updated = set(), set()
+            stamp = (today or datetime.now()).strftime("%Y-%m-%d")
+            
+            for p in proposals:
+                key = (p['supplier'], p['warehouse_id'])
+                po = drafts.get(key)
+                if po is None:
+                    if self.allocate_id:
+                        po_id = self.allocate_id('purchase_orders')
+                    else:
+                        po_id, next_id = next_id, next_id + 1
+                    po = drafts[key] = {
+                        'id': po_id,
+                        'supplier': p['supplier'],
+                        'warehouse_id': p['warehouse_id'],
+                        'status': 'Draft',
+                        'lines': [],
+                        'total': 0.0,
+                        'created_date': stamp
+                    }
+                    created.add(po_id)
+                    self.data['purchase_orders'].append(po)
+                elif po['id'] not in created:
+                    updated.add(po['id'])  # existing draft: merge instead of a second PO
+                line = next((l for l in po['lines'] if l['item_id'] == p['item_id']), None)
+                if line:
+                    line['quantity'] += p['quantity']
+                else:
+                    po['lines'].append({'item_id': p['item_id'], 'name': p['name'],
+                                        'quantity': p['quantity'], 'unit_cost': p['unit_cost']})
+                po['total'] = round(sum(l['quantity'] * l['unit_cost'] for l in po['lines']), 2)
+                po['updated_date'] = stamp
+            
+            return {'skus_evaluated': len(self.ledger._rows), 'lines': len(proposals),
+                    'pos_created': len(created), 'pos_updated': len(updated),
+                    'elapsed': round(time.perf_counter() - started, 3)}
+        except Exception as e:
+            return {'error': str(e), 'skus_evaluated': 0, 'lines': 0, 'pos_created': 0, 'pos_updated': 0,
+                    'elapsed': round(time.perf_counter() - started, 3)}
+    
+    def _po(self, po_id: int) -> Optional[Dict]:
+        return next((po for po in self.data['purchase_orders'] if po['id'] == po_id), None)
+    
+    def submit(self, po_id: int) -> Tuple[bool, str]:
+        """Draft -> Submitted (sent to the supplier)"""
+        po = self._po(po_id)
+        if not po or po['status'] != 'Draft':
+            return False, "❌ Only draft purchase orders can be submitted"
+        po['status'] = 'Submitted'
+        po['submitted_date'] = datetime.now().strftime("%Y-%m-%d")
+        return True, f"✅ PO #{po_id} submitted to {po['supplier']}"
+    
+    def receive(self, po_id: int) -> Tuple[bool, str]:
+        """Submitted -> Received: books the goods into the site's stock"""
+        po = self._po(po_id)
+        if not po or po['status'] != 'Submitted':
+            return False, "❌ Only submitted purchase orders can be received"
+        for line in po['lines']:
+            self.ledger.adjust(po['warehouse_id'], line['item_id'], line['quantity'])
+        po['status'] = 'Received'
+        po['received_date'] = datetime.now().strftime("%Y-%m-%d")
+        return True, f"✅ PO #{po_id} received: {sum(l['quantity'] for l in po['lines'])} units"
+    
+    def cancel(self, po_id: int) -> Tuple[bool, str]:
+        po = self._po(po_id)
+        if not po or po['status'] not in self.OPEN_STATES:
+            return False, "❌ Only open purchase orders can be cancelled"
+        po['status'] = 'Cancelled'
+        return True, f"✅ PO #{po_id} cancelled"
+    
+    def open_orders(self, warehouse_id: int = None) -> List[Dict]:
+        return [po for po in self.data['purchase_orders'] if po['status'] in self.OPEN_STATES
+                and (warehouse_id is None or po['warehouse_id'] == warehouse_id)]
+
+
+# =============================================================================
+# FEATURE 22: PROFILING & INSTRUMENTATION
+# =============================================================================
+class _CountingFile:
+    """File proxy that adds bytes read/written to the profiler's I/O counters"""
+    
+    def __init__(self, f, counter: Dict, on_close=None):
+        self._f = f
+        self._counter = counter
+        self._on_close = on_close
+        self._opened = time.perf_counter()
+    
+    def _count(self, key: str, data):
+        if data:
+            self._counter[key] += len(data)
+        return data
+    
+    def read(self, *args):
+        return self._count('read', self._f.read(*args))
+    
+    def readline(self, *args):
+        return self._count('read', self._f.readline(*args))
+    
+    def __iter__(self):
+        for line in self._f:
+            yield self._count('read', line)
+    
+    def write(self, data):
+        self._counter['written'] += len(data)
+        return self._f.write(data)
+    
+    def __enter__(self):
+        return self
+    
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+            if self._on_close:
+                self._on_close(time.perf_counter() - self._opened)
+    
+    def __exit__(self, *exc):
+        self.close()
+        return False
+    
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class Profiler:
+    """Timing samples per operation plus file I/O counters
+    
+    instrument() wraps every public function and method defined in a module
+    so each call is timed under "Class.method". helpers only instruments
+    itself when WAREHOUSE_PROFILE=1 at import, so hot paths carry no wrapper
+    otherwise; enabled can then be toggled at runtime. Explicit timed()
+    blocks and record() calls always record.
+    
+    Data-file I/O goes through open(), which counts bytes per file while
+    enabled and times writes for on_write; otherwise it is the builtin.
+    """
+    
+    def __init__(self, max_samples: int = 1000, enabled: bool = None):
+        self.max_samples = max_samples
+        self.enabled = os.environ.get('WAREHOUSE_PROFILE', '0') == '1' if enabled is None else enabled
+        self._samples = {}   # operation -> deque of seconds
+        self._calls = {}     # operation -> (count, total seconds)
+        self.io = {}         # file key -> {'read', 'written', 'opens'}
+        self.on_write = None # on_write(file key, seconds open) after a file opened for writing closes
+        self.wrapped = False # instrument() has run
+        self._builtin_open = builtins.open
+    
+    def record(self, name: str, seconds: float):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.max_samples)
+        samples.append(seconds)
+        count, total = self._calls.get(name, (0, 0.0))
+        self._calls[name] = (count + 1, total + seconds)
+    
+    def timed(self, name: str):
+        """Context manager: with profiler.timed("app.load_data"): ..."""
+        profiler = self
+        
+        class _Timer:
+            def __enter__(self):
+                self.started = time.perf_counter()
+                return self
+            
+            def __exit__(self, *exc):
+                profiler.record(name, time.perf_counter() - self.started)
+                return False
+        return _Timer()
+    
+    def _wrap(self, fn, name: str):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - started)
+        wrapper.__profiled__ = True
+        return wrapper
+    
+    def instrumented(self, name: str = None):
+        """Decorator form of timed(); records even while instrumentation is disabled"""
+        def decorate(fn):
+            label = name or fn.__qualname__
+            
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timed(label):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+    
+    def instrument(self, namespace: Dict):
+        """Wrap public functions and class methods defined in a module namespace"""
+        self.wrapped = True
+        module = namespace.get('__name__')
+        for name, obj in list(namespace.items()):
+            if name.startswith('_') or getattr(obj, '__module__', None) != module:
+                continue
+            if inspect.isfunction(obj) and not getattr(obj, '__profiled__', False):
+                namespace[name] = self._wrap(obj, name)
+            elif inspect.isclass(obj) and obj not in (Profiler, _CountingFile, MetricsRegistry, JsonCodec) \
+                    and not issubclass(obj, (_Metric, CompactRecord)) \
+                    and not issubclass(obj, BaseException):
+                for attr, member in list(vars(obj).items()):
+                    if attr.startswith('_'):
+                        continue
+                    label = f"{obj.__name__}.{attr}"
+                    if isinstance(member, staticmethod):
+                        setattr(obj, attr, staticmethod(self._wrap(member.__func__, label)))
+                    elif isinstance(member, classmethod):
+                        setattr(obj, attr, classmethod(self._wrap(member.__func__, label)))
+                    elif inspect.isfunction(member) and not getattr(member, '__profiled__', False):
+                        setattr(obj, attr, self._wrap(member, label))
+    
+    @staticmethod
+    def _io_key(path) -> str:
+        # Group date-partitioned and timestamped files: attendance/2026-01-05.jsonl -> attendance/#.jsonl
+        return re.sub(r'\d[\d_-]*\d|\d', '#', os.path.relpath(str(path)))
+    
+    def open(self, file, mode='r', *args, **kwargs):
+        """open() for data files: counts bytes per file while enabled, times writes for on_write"""
+        f = self._builtin_open(file, mode, *args, **kwargs)
+        writing = any(c in mode for c in 'wax+')
+        if isinstance(file, int) or not (self.enabled or (writing and self.on_write is not None)):
+            return f
+        key = self._io_key(file)
+        counter = self.io.get(key)
+        if counter is None:
+            counter = self.io[key] = {'read': 0, 'written': 0, 'opens': 0}
+        counter['opens'] += 1
+        on_close = None
+        if self.on_write is not None and writing:
+            on_write = self.on_write
+            on_close = lambda seconds: on_write(key, seconds)
+        return _CountingFile(f, counter, on_close)
+    
+    @staticmethod
+    def _pct(ordered: List[float], pct: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+    
+    def report(self) -> List[Dict]:
+        """p50/p95/p99 (ms) per operation over the retained samples, slowest total first"""
+        rows = []
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            count, total = self._calls[name]
+            rows.append({
+                'operation': name,
+                'calls': count,
+                'total_ms': round(total * 1000, 2),
+                'p50_ms': round(self._pct(ordered, 50) * 1000, 3),
+                'p95_ms': round(self._pct(ordered, 95) * 1000, 3),
+                'p99_ms': round(self._pct(ordered, 99) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3)
+            })
+        return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+    
+    def io_report(self) -> List[Dict]:
+        return sorted(({'file': k, **v} for k, v in self.io.items()),
+                      key=lambda r: r['read'] + r['written'], reverse=True)
+    
+    def reset(self):
+        self._samples.clear()
+        self._calls.clear()
+        self.io.clear()
+    
+    def capture(self):
+        """Start a whole-call-stack profile; returns a handle for finish_capture()"""
+        try:
+            from pyinstrument import Profiler as PyInstrument
+            handle = PyInstrument()
+        except ImportError:
+            import cProfile
+            handle = cProfile.Profile()
+        handle.enable() if hasattr(handle, 'enable') else handle.start()
+        return handle
+    
+    @staticmethod
+    def finish_capture(handle, limit: int = 40) -> str:
+        """Stop a capture and return it as text"""
+        if hasattr(handle, 'output_text'):
+            handle.stop()
+            return handle.output_text(unicode=True)
+        import pstats
+        handle.disable()
+        out = io.StringIO()
+        pstats.Stats(handle, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+
+# =============================================================================
+# FEATURE 23: METRICS (Prometheus exposition)
+# =============================================================================
+class _Cells:
+    """Per-thread accumulators: each thread only ever writes its own cell, so
+    hot-path increments need no lock; readers sum the cells at scrape time.
+    
+    Cells are keyed by Thread object, not thread id (ids are reused), and a
+    finished thread's cell is folded into a base cell on the next read, so
+    short-lived session threads don't leave cells behind.
+    """
+    
+    def __init__(self, width: int = 1):
+        self._width = width
+        self._cells = {}   # thread -> list of floats
+        self._base = [0.0] * width   # totals of threads that have finished
+        self._fold_lock = threading.Lock()
+    
+    def cell(self) -> List[float]:
+        thread = threading.current_thread()
+        cell = self._cells.get(thread)
+        if cell is None:
+            cell = self._cells.setdefault(thread, [0.0] * self._width)
+        return cell
+    
+    def totals(self) -> List[float]:
+        with self._fold_lock:
+            # A dead thread never writes again, so its cell can be merged safely
+            for thread in [t for t in list(self._cells) if not t.is_alive()]:
+                for i, value in enumerate(self._cells.pop(thread)):
+                    self._base[i] += value
+            sums = list(self._base)
+        for cell in list(self._cells.values()):
+            for i, value in enumerate(cell):
+                sums[i] += value
+        return sums
+
+
+class _Metric(abc.ABC):
+    """A metric family; labels(...) returns the child for one label set"""
+    
+    kind = 'untyped'
+    
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}   # label values -> child
+        self._function = None
+    
+    @abc.abstractmethod
+    def _new_child(self):
+        """Fresh child holding the value(s) of one label set"""
+    
+    def set_function(self, fn):
+        """Read values from fn() at scrape time instead: a number, or
+        {label values tuple: number} for labelled metrics"""
+        self._function = fn
+    
+    def labels(self, *values):
+        values = tuple(map(str, values))
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+    
+    def samples(self) -> List[Tuple[str, Dict, float]]:
+        """(suffix, labels, value) for every child"""
+        if self._function is not None:
+            result = self._function()
+            if not isinstance(result, dict):
+                return [('', {}, float(result))]
+            return [('', dict(zip(self.labelnames, map(str, values))), float(value))
+                    for values, value in result.items()]
+        out = []
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            out.extend((suffix, {**labels, **extra}, value) for suffix, extra, value in child.samples())
+        return out
+
+
+class Counter(_Metric):
+    """Monotonic count (orders created, login attempts, audit writes)"""
+    
+    kind = 'counter'
+    
+    class _Child:
+        def __init__(self):
+            self._cells = _Cells()
+        
+        def inc(self, amount: float = 1):
+            self._cells.cell()[0] += amount
+        
+        def value(self) -> float:
+            return self._cells.totals()[0]
+        
+        def samples(self):
+            return [('', {}, self.value())]
+    
+    def _new_child(self):
+        return Counter._Child()
+    
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Point-in-time value (queue depth, capacity in use)"""
+    
+    kind = 'gauge'
+    
+    class _Child:
+        def __init__(self):
+            self._value = 0.0
+            self._lock = threading.Lock()
+        
+        def set(self, value: float):
+            self._value = float(value)
+        
+        def inc(self, amount: float = 1):
+            with self._lock:
+                self._value += amount
+        
+        def dec(self, amount: float = 1):
+            self.inc(-amount)
+        
+        def value(self) -> float:
+            return self._value
+        
+        def samples(self):
+            return [('', {}, self._value)]
+    
+    def _new_child(self):
+        return Gauge._Child()
+    
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    """Latency distribution with cumulative buckets, _sum and _count"""
+    
+    kind = 'histogram'
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    
+    class _Child:
+        def __init__(self, buckets: Tuple[float, ...]):
+            self._buckets = buckets
+            # one slot per bucket, then +Inf, sum
+            self._cells = _Cells(len(buckets) + 2)
+        
+        def observe(self, seconds: float):
+            cell = self._cells.cell()
+            cell[bisect.bisect_left(self._buckets, seconds)] += 1
+            cell[-1] += seconds
+        
+        def time(self):
+            """Context manager: with histogram.labels(...).time(): ..."""
+            child = self
+            
+            class _Timer:
+                def __enter__(self):
+                    self.started = time.perf_counter()
+                    return self
+                
+                def __exit__(self, *exc):
+                    child.observe(time.perf_counter() - self.started)
+                    return False
+            return _Timer()
+        
+        def samples(self):
+            totals = self._cells.totals()
+            out, running = [], 0.0
+            for bound, count in zip(self._buckets + (float('inf'),), totals[:-1]):
+                running += count
+                out.append(('_bucket', {'le': '+Inf' if bound == float('inf') else repr(bound)}, running))
+            out.append(('_sum', {}, totals[-1]))
+            out.append(('_count', {}, running))
+            return out
+    
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = None):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+    
+    def _new_child(self):
+        return Histogram._Child(self.buckets)
+    
+    def observe(self, seconds: float):
+        self.labels().observe(seconds)
+
+
+class MetricsRegistry:
+    """Named metric families rendered in the Prometheus text format
+    
+    Hot paths only touch per-thread cells; collectors registered with
+    add_collector() refresh pull-style values (queue depths, capacity use)
+    right before each scrape. serve() exposes /metrics on a daemon thread.
+    """
+    
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+    
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._collectors = []
+        self._server = None
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+    
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+    
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = None) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+    
+    def add_collector(self, fn):
+        """fn() runs before every scrape, e.g. to copy a manager's stats into gauges"""
+        self._collectors.append(fn)
+    
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    
+    @staticmethod
+    def _number(value: float) -> str:
+        if value == float('inf'):
+            return '+Inf'
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    
+    def exposition(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print(f"Metrics error ({metric.name}): {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{k}="{self._escape(v)}"' for k, v in labels.items())
+                name = metric.name + suffix
+                lines.append(f"{name}{{{label_text}}} {self._number(value)}" if label_text
+                             else f"{name} {self._number(value)}")
+        return '\n'.join(lines) + '\n'
+    
+    def serve(self, port: int = 9464, host: str = '127.0.0.1') -> Tuple[bool, str]:
+        """Start the /metrics endpoint on a daemon thread"""
+        if self._server is not None:
+            return True, f"✅ Metrics already served on port {self._server.server_address[1]}"
+        registry = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.exposition().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', registry.CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="metrics-exporter",
+                             daemon=True).start()
+            return True, f"✅ Metrics on http://{host}:{self._server.server_address[1]}/metrics"
+        except Exception as e:
+            self._server = None
+            return False, f"❌ Metrics exporter not started: {str(e)}"
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def serving(self) -> Optional[int]:
+        """Port the exporter listens on, or None"""
+        return self._server.server_address[1] if self._server else None
+
+
+# =============================================================================
+# FEATURE 24: COMPACT RECORDS (Memory-lean inventory, orders and order lines)
+# =============================================================================
+class CompactRecord(MutableMapping):
+    """dict-compatible record stored in __slots__
+    
+    Known FIELDS live in slots (no per-record hash table); any other key goes
+    to a small overflow dict created on first use. Repeating strings (status,
+    dates, names) are interned so millions of records share one copy, and
+    NESTED list fields (an order's items) are compacted too. Everything that
+    reads records through [], get(), in, ** or json keeps working.
+    """
+    
+    __slots__ = ('_extra',)
+    FIELDS: Tuple[str, ...] = ()
+    INTERN: frozenset = frozenset()
+    NESTED: Dict = {}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._SLOTS = {field: f"f_{field}" for field in cls.FIELDS}
+    
+    def __init__(self, data: Dict = None, **kwargs):
+        self._extra = None
+        for source in (data or {}, kwargs):
+            for key, value in source.items():
+                self[key] = value
+    
+    def __getitem__(self, key):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        if type(value) is str and key in self.INTERN:
+            value = sys.intern(value)
+        elif type(value) is list and key in self.NESTED:
+            record_type = self.NESTED[key]
+            value = [v if isinstance(v, CompactRecord) else record_type(v) for v in value]
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key):
+        slot = self._SLOTS.get(key)
+        try:
+            if slot is not None:
+                delattr(self, slot)
+            else:
+                del self._extra[key]
+        except (AttributeError, KeyError, TypeError):
+            raise KeyError(key) from None
+    
+    def __iter__(self):
+        for field, slot in self._SLOTS.items():
+            if hasattr(self, slot):
+                yield field
+        if self._extra:
+            yield from list(self._extra)
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __contains__(self, key):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and key in self._extra
+    
+    def get(self, key, default=None):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            return getattr(self, slot, default)
+        return self._extra.get(key, default) if self._extra is not None else default
+    
+    def copy(self):
+        return type(self)(self)
+    
+    def to_dict(self) -> Dict:
+        """Plain dict (nested records included), e.g. for json"""
+        return {k: [v.to_dict() if isinstance(v, CompactRecord) else v for v in value]
+                if type(value) is list else value for k, value in self.items()}
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class OrderItemRecord(CompactRecord):
+    """One entry of an order's 'items' list"""
+    FIELDS = ('item_id', 'name', 'quantity', 'price', 'total')
+    INTERN = frozenset({'name'})
+    __slots__ = tuple(f"f_{field}" for field in FIELDS)
+
+
+class InventoryRecord(CompactRecord):
+    FIELDS = ('id', 'name', 'quantity', 'price', 'min_stock', 'added_date', 'updated_date',
+              'warehouse_id', 'supplier', 'lead_time_days')
+    INTERN = frozenset({'added_date', 'updated_date', 'supplier'})
+    __slots__ = tuple(f"f_{field}" for field in FIELDS)
+
+
+class OrderRecord(CompactRecord):
+    FIELDS = ('id', 'customer', 'items', 'total', 'total_qty', 'status', 'warehouse_id',
+              'created_date', 'admission', 'admitted_hour', 'deferred_at', 'destination', 'carrier',
+              'shipment_id')
+    INTERN = frozenset({'customer', 'status', 'created_date', 'admission', 'admitted_hour',
+                        'destination', 'carrier'})
+    NESTED = {'items': OrderItemRecord}
+    __slots__ = tuple(f"f_{field}" for field in FIELDS)
+
+
+class OrderLineRecord(CompactRecord):
+    """A row of data['order_lines'] (see OrderBook)"""
+    FIELDS = ('id', 'order_id', 'item_id', 'name', 'quantity', 'price', 'total', 'warehouse_id', 'status')
+    INTERN = frozenset({'name', 'status'})
+    __slots__ = tuple(f"f_{field}" for field in FIELDS)
+
+
+COMPACT_TABLES = {'inventory': InventoryRecord, 'orders': OrderRecord, 'order_lines': OrderLineRecord}
+
+
+def compact_dataset(data: Dict) -> Dict:
+    """Convert inventory, orders and order lines to compact records in place"""
+    for table, record_type in COMPACT_TABLES.items():
+        rows = data.get(table)
+        if rows:
+            data[table] = [r if isinstance(r, CompactRecord) else record_type(r) for r in rows]
+    return data
+
+
+def _json_default(obj):
+    """json.dump(default=...) hook so compact records serialize like dicts"""
+    if isinstance(obj, CompactRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# =============================================================================
+# FEATURE 25: SHARED MEMORY-MAPPED SNAPSHOTS (Zero-copy dataset for all workers)
+# =============================================================================
+class Snapshot:
+    """One mapped generation of the dataset
+    
+    File layout: 8-byte magic, uint64 header length, JSON header (column
+    directory), then 8-byte aligned blocks: fixed-width columns (int64,
+    float64, int32 string ids, uint8 presence masks, int64 child offsets)
+    and one deduplicated string table. Every worker maps the same file, so
+    the page cache holds a single copy; numeric columns are memoryviews
+    straight into the map.
+    """
+    
+    MAGIC = b'WHSNAP01'
+    MISSING, NULL, PRESENT = 0, 1, 2   # presence mask values
+    
+    def __init__(self, path: str):
+        self.path = path
+        with profiler.open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if bytes(self._view[:8]) != self.MAGIC:
+            raise ValueError(f"{path} is not a warehouse snapshot")
+        header_len = self._view[8:16].cast('Q')[0]
+        self.header = json.loads(bytes(self._view[16:16 + header_len]))
+        self.generation = self.header['generation']
+        self._strings = None
+        self._decoded = {}   # (table, column) -> list of python values, shared by loads
+    
+    def _array(self, offset: int, count: int, code: str) -> memoryview:
+        size = struct.calcsize(code)
+        return self._view[offset:offset + count * size].cast(code)
+    
+    def strings(self) -> List[str]:
+        """String table, decoded once per generation"""
+        if self._strings is None:
+            meta = self.header['strings']
+            text = bytes(self._view[meta['data']:meta['data'] + meta['size']]).decode('utf-8')
+            offsets = self._array(meta['offsets'], meta['count'] + 1, 'q')
+            self._strings = [text[offsets[i]:offsets[i + 1]] for i in range(meta['count'])]
+        return self._strings
+    
+    def tables(self) -> List[str]:
+        return [name for name in self.header['tables'] if '.' not in name]
+    
+    def rows(self, table: str) -> int:
+        return self.header['tables'][table]['rows']
+    
+    def column(self, table: str, name: str) -> memoryview:
+        """Zero-copy view of a numeric column (missing values read as 0)"""
+        meta = self.header['tables'][table]
+        col = next(c for c in meta['columns'] if c['name'] == name)
+        if col['type'] not in ('q', 'd', 'b'):
+            raise TypeError(f"{table}.{name} is not numeric")
+        return self._array(col['offset'], meta['rows'], 'd' if col['type'] == 'd' else 'q')
+    
+    def _values(self, table: str, col: Dict, rows: int) -> List:
+        key = (table, col['name'])
+        values = self._decoded.get(key)
+        if values is not None:
+            return values
+        kind = col['type']
+        if kind in ('q', 'd'):
+            values = self._array(col['offset'], rows, kind).tolist()
+        elif kind == 'b':
+            values = [bool(v) for v in self._array(col['offset'], rows, 'q')]
+        elif kind == 's':
+            strings = self.strings()
+            values = [strings[i] for i in self._array(col['offset'], rows, 'i')]
+        else:   # 'j' and 'L' hold mutable values; decoded fresh on every load
+            return None
+        self._decoded[key] = values
+        return values
+    
+    def load(self, table: str) -> List[Dict]:
+        """Fresh list of dicts for a table (safe to mutate)"""
+        meta = self.header['tables'][table]
+        rows = meta['rows']
+        names, columns, masked = [], [], []
+        for col in meta['columns']:
+            values = self._values(table, col, rows)
+            if values is None and col['type'] == 'j':
+                strings = self.strings()
+                values = [codec.loads(strings[i]) if i >= 0 else None for i in self._array(col['offset'], rows, 'i')]
+            elif values is None:   # 'L': list of records in a child table
+                children = self.load(f"{table}.{col['name']}")
+                offsets = self._array(col['offset'], rows + 1, 'q')
+                values = [children[offsets[i]:offsets[i + 1]] for i in range(rows)]
+            names.append(col['name'])
+            columns.append(values)
+            if col.get('mask') is not None:
+                masked.append((col['name'], self._array(col['mask'], rows, 'B')))
+        
+        records = [dict(zip(names, values)) for values in zip(*columns)] if names else [{} for _ in range(rows)]
+        for name, mask in masked:
+            for record, state in zip(records, mask):
+                if state == self.MISSING:
+                    del record[name]
+                elif state == self.NULL:
+                    record[name] = None
+        return records
+    
+    def to_dataset(self) -> Dict:
+        return {table: self.load(table) for table in self.tables()}
+
+
+class SnapshotStore:
+    """Generations of the dataset as memory-mapped snapshot files
+    
+    A writer encodes the dataset into snapshots/gen-<N>.snap (written to a
+    temp file, fsynced, then linked into place) and atomically swaps the
+    CURRENT pointer. Readers stat CURRENT on every load and remap only when
+    the generation changed, so Streamlit workers share one mapped copy and
+    never re-parse JSON. Old generations are unlinked; workers still mapping
+    them keep a valid view until they move on.
+    """
+    
+    def __init__(self, snapshot_dir="snapshots", keep: int = 3):
+        self.snapshot_dir = snapshot_dir
+        self.pointer_file = os.path.join(snapshot_dir, "CURRENT")
+        self.keep = keep
+        self._pointer_stamp = None
+        self._snapshot = None
+    
+    def enabled(self) -> bool:
+        return os.path.exists(self.pointer_file)
+    
+    def _pointer(self) -> Dict:
+        with profiler.open(self.pointer_file, 'r') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _source_stamp(path: str) -> Optional[List[int]]:
+        try:
+            info = os.stat(path)
+            return [info.st_mtime_ns, info.st_size]
+        except OSError:
+            return None
+    
+    # ----- Encoding -----
+    @staticmethod
+    def _column_type(values: List) -> str:
+        kinds = {type(v) for v in values if v is not None}
+        if not kinds:
+            return 'q'
+        if kinds == {bool}:
+            return 'b'
+        if kinds == {int} and all(-2 ** 63 <= v < 2 ** 63 for v in values if v is not None):
+            return 'q'
+        if kinds <= {int, float} and bool not in kinds:
+            return 'd'
+        if kinds == {str}:
+            return 's'
+        if kinds == {list} and all(type(x) is dict for v in values if v for x in v):
+            return 'L'
+        return 'j'
+    
+    def _encode(self, data: Dict, generation: int, source_stamp) -> Tuple[Dict, List[bytes]]:
+        """(header, data blocks) for a dataset"""
+        string_ids, strings = {}, []
+        
+        def intern(text: str) -> int:
+            sid = string_ids.get(text)
+            if sid is None:
+                sid = string_ids[text] = len(strings)
+                strings.append(text)
+            return sid
+        
+        tables, blocks = {}, []
+        
+        def add_block(raw: bytes) -> int:
+            blocks.append(raw + b'\0' * (-len(raw) % 8))
+            return len(blocks) - 1   # resolved to a file offset once the header size is known
+        
+        def presence(record: Dict, key: str) -> int:
+            if key not in record:
+                return Snapshot.MISSING
+            return Snapshot.NULL if record[key] is None else Snapshot.PRESENT
+        
+        def encode_table(name: str, records: List[Dict]):
+            columns, names = [], []
+            for record in records:
+                for key in record:
+                    if key not in columns:
+                        columns.append(key)
+            for key in columns:
+                values = [r.get(key) for r in records]
+                kind = self._column_type(values)
+                col = {'name': key, 'type': kind}
+                if kind in ('q', 'b'):
+                    col['offset'] = add_block(array('q', (int(v or 0) for v in values)).tobytes())
+                elif kind == 'd':
+                    col['offset'] = add_block(array('d', (float(v or 0.0) for v in values)).tobytes())
+                elif kind == 's':
+                    col['offset'] = add_block(array('i', (intern(v) if v is not None else 0 for v in values)).tobytes())
+                elif kind == 'j':
+                    col['offset'] = add_block(array('i', (intern(codec.dumps(v).decode('utf-8'))
+                                                          if v is not None else -1 for v in values)).tobytes())
+                else:
+                    child, offsets = [], array('q', [0])
+                    for v in values:
+                        child.extend(v or [])
+                        offsets.append(len(child))
+                    col['offset'] = add_block(offsets.tobytes())
+                    encode_table(f"{name}.{key}", child)
+                if any(key not in r or r[key] is None for r in records):
+                    col['mask'] = add_block(bytes(presence(r, key) for r in records))
+                names.append(col)
+            tables[name] = {'rows': len(records), 'columns': names}
+        
+        for table, records in data.items():
+            if isinstance(records, list):
+                encode_table(table, records)
+        
+        text = ''.join(strings)
+        offsets, pos = array('q', [0]), 0
+        for s in strings:
+            pos += len(s)
+            offsets.append(pos)
+        strings_meta = {'count': len(strings), 'offsets': add_block(offsets.tobytes()),
+                        'data': add_block(text.encode('utf-8')), 'size': len(text.encode('utf-8'))}
+        header = {'generation': generation, 'created': datetime.now().isoformat(),
+                  'source': source_stamp, 'strings': strings_meta, 'tables': tables}
+        return header, blocks
+    
+    @staticmethod
+    def _layout(header: Dict, blocks: List[bytes]) -> bytes:
+        """Replace block indexes in the header with file offsets; returns the header bytes"""
+        # Offsets grow the header, so iterate until its length is stable
+        header_len = 0
+        while True:
+            start = 16 + header_len + (-(16 + header_len) % 8)
+            positions, pos = [], start
+            for block in blocks:
+                positions.append(pos)
+                pos += len(block)
+            resolved = json.loads(json.dumps(header))
+            for table in resolved['tables'].values():
+                for col in table['columns']:
+                    col['offset'] = positions[col['offset']]
+                    if 'mask' in col:
+                        col['mask'] = positions[col['mask']]
+            for key in ('offsets', 'data'):
+                resolved['strings'][key] = positions[resolved['strings'][key]]
+            raw = json.dumps(resolved).encode('utf-8')
+            if len(raw) == header_len:
+                return raw
+            header_len = len(raw)
+    
+    # ----- Writer -----
+    def publish(self, data: Dict, source_path: str = None) -> Tuple[bool, str]:
+        """Write the dataset as the next generation and point CURRENT at it"""
+        try:
+            Path(self.snapshot_dir).mkdir(parents=True, exist_ok=True)
+            generation = self._pointer()['generation'] + 1 if self.enabled() else 1
+            # Reserve the file name first so concurrent writers get distinct generations
+            while True:
+                name = f"gen-{generation:08d}.snap"
+                try:
+                    os.close(os.open(os.path.join(self.snapshot_dir, name), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    break
+                except FileExistsError:
+                    generation += 1
+            
+            header, blocks = self._encode(data, generation, self._source_stamp(source_path) if source_path else None)
+            raw_header = self._layout(header, blocks)
+            tmp = os.path.join(self.snapshot_dir, f".{name}.tmp")
+            with profiler.open(tmp, 'wb') as f:
+                f.write(Snapshot.MAGIC)
+                f.write(struct.pack('<Q', len(raw_header)))
+                f.write(raw_header)
+                f.write(b'\0' * (-(16 + len(raw_header)) % 8))
+                for block in blocks:
+                    f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, os.path.join(self.snapshot_dir, name))
+            if self.enabled() and self._pointer()['generation'] > generation:
+                return True, f"✅ Snapshot generation {generation} superseded by a newer one"
+            
+            pointer_tmp = f"{self.pointer_file}.{name}.tmp"
+            with profiler.open(pointer_tmp, 'w') as f:
+                json.dump({'generation': generation, 'file': name}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(pointer_tmp, self.pointer_file)
+            self._prune(generation)
+            return True, f"✅ Snapshot generation {generation} published"
+        except Exception as e:
+            return False, f"❌ Snapshot failed: {str(e)}"
+    
+    def _prune(self, generation: int):
+        for name in os.listdir(self.snapshot_dir):
+            if name.startswith('gen-') and name.endswith('.snap') \
+                    and int(name[4:12]) <= generation - self.keep:
+                try:
+                    os.unlink(os.path.join(self.snapshot_dir, name))
+                except OSError:
+                    pass
+    
+    # ----- Reader -----
+    def current(self) -> Optional[Snapshot]:
+        """The mapped current generation, remapped only when CURRENT changed"""
+        stamp = self._source_stamp(self.pointer_file)
+        if stamp is None:
+            return None
+        if stamp != self._pointer_stamp or self._snapshot is None:
+            pointer = self._pointer()
+            if self._snapshot is None or self._snapshot.generation != pointer['generation']:
+                self._snapshot = Snapshot(os.path.join(self.snapshot_dir, pointer['file']))
+            self._pointer_stamp = stamp
+        return self._snapshot
+    
+    def load(self, source_path: str = None) -> Optional[Dict]:
+        """Dataset from the current generation, or None if missing or older than source_path"""
+        try:
+            snapshot = self.current()
+            if snapshot is None:
+                return None
+            if source_path and snapshot.header.get('source') != self._source_stamp(source_path):
+                return None
+            return snapshot.to_dataset()
+        except Exception as e:
+            print(f"Snapshot load error: {e}")
+            return None
+    
+    def status(self) -> Dict:
+        snapshot = self.current()
+        if snapshot is None:
+            return {}
+        return {'generation': snapshot.generation, 'created': snapshot.header['created'],
+                'file': os.path.basename(snapshot.path), 'bytes': os.path.getsize(snapshot.path),
+                'rows': {t: snapshot.rows(t) for t in snapshot.tables()}}
+
+
+# =============================================================================
+# FEATURE 26: JSON CODEC (orjson / msgspec with stdlib fallback, typed decoding)
+# =============================================================================
+class SchemaError(ValueError):
+    """A decoded record does not match its schema"""
+
+
+class JsonCodec:
+    """Pluggable JSON encoding for machine-written files
+    
+    Uses orjson, then msgspec, then the stdlib json module, whichever is
+    installed first (WAREHOUSE_JSON=orjson|msgspec|json forces one). Output
+    is compact by default; pretty=True keeps the indent-2 layout for files
+    people edit. decode(raw, schema) type-checks records against SCHEMAS
+    while loading, coercing int/float where the value is exact.
+    """
+    
+    BACKENDS = ('orjson', 'msgspec', 'json')
+    
+    # Record schemas: field -> type, or [schema name] for a list of nested records
+    SCHEMAS = {
+        'employee': {'id': int, 'name': str, 'age': int, 'position': str, 'salary': float,
+                     'shift': str, 'hire_date': str, 'warehouse_id': int},
+        'inventory_item': {'id': int, 'name': str, 'quantity': int, 'price': float, 'min_stock': int,
+                           'added_date': str, 'updated_date': str, 'warehouse_id': int},
+        'order_item': {'item_id': int, 'name': str, 'quantity': int, 'price': float, 'total': float},
+        'order': {'id': int, 'customer': str, 'items': ['order_item'], 'total': float, 'total_qty': int,
+                  'status': str, 'warehouse_id': int, 'created_date': str},
+        'order_line': {'id': int, 'order_id': int, 'item_id': int, 'name': str, 'quantity': int,
+                       'price': float, 'total': float, 'warehouse_id': int, 'status': str},
+        'attendance': {'employee_id': int, 'date': str, 'check_in': str, 'check_out': str}
+    }
+    # Tables of a dataset file that are decoded against a record schema
+    DATASET = {'employees': 'employee', 'inventory': 'inventory_item', 'orders': 'order',
+               'order_lines': 'order_line'}
+    
+    def __init__(self, backend: str = None):
+        wanted = backend or os.environ.get('WAREHOUSE_JSON')
+        self.backend = 'json'
+        for name in ((wanted,) if wanted else self.BACKENDS):
+            try:
+                if name == 'orjson':
+                    import orjson
+                    self._orjson = orjson
+                    self._options = orjson.OPT_NON_STR_KEYS
+                elif name == 'msgspec':
+                    import msgspec
+                    self._msgspec = msgspec
+                    self._encoder = msgspec.json.Encoder(enc_hook=_json_default)
+                    self._decoder = msgspec.json.Decoder()
+                elif name != 'json':
+                    raise ImportError(f"unknown JSON backend {name}")
+                self.backend = name
+                break
+            except ImportError as e:
+                if wanted:
+                    print(f"JSON backend {wanted} unavailable ({e}), using stdlib json")
+        # field lists per schema, resolved once: (field, type, nested schema or None)
+        self._fields = {
+            name: [(field, list, kind[0]) if isinstance(kind, list) else (field, kind, None)
+                   for field, kind in fields.items()]
+            for name, fields in self.SCHEMAS.items()
+        }
+    
+    # ----- Encoding -----
+    def dumps(self, obj, pretty: bool = False) -> bytes:
+        if self.backend == 'orjson':
+            option = self._options | (self._orjson.OPT_INDENT_2 if pretty else 0)
+            return self._orjson.dumps(obj, default=_json_default, option=option)
+        if self.backend == 'msgspec':
+            raw = self._encoder.encode(obj)
+            return self._msgspec.json.format(raw, indent=2) if pretty else raw
+        if pretty:
+            return json.dumps(obj, indent=2, default=_json_default).encode('utf-8')
+        return json.dumps(obj, separators=(',', ':'), default=_json_default).encode('utf-8')
+    
+    def loads(self, raw):
+        """Parse bytes or str; malformed input raises json.JSONDecodeError on every backend"""
+        if self.backend == 'orjson':
+            return self._orjson.loads(raw)
+        if self.backend == 'msgspec':
+            try:
+                return self._decoder.decode(raw)
+            except self._msgspec.DecodeError as e:
+                raise json.JSONDecodeError(str(e), raw if isinstance(raw, str) else '', 0) from None
+        return json.loads(raw)
+    
+    def dump(self, obj, f, pretty: bool = False):
+        """Write to a file opened in binary mode"""
+        f.write(self.dumps(obj, pretty))
+    
+    def load(self, f, schema: str = None):
+        return self.decode(f.read(), schema)
+    
+    # ----- Typed decoding -----
+    def decode(self, raw, schema: str = None):
+        """Parse and check against a record schema ('order', 'attendance', ...) or 'dataset'"""
+        value = self.loads(raw)
+        if schema == 'dataset':
+            for table, record_schema in self.DATASET.items():
+                if value.get(table):
+                    self.check(value[table], record_schema, table)
+        elif schema:
+            self.check(value if isinstance(value, list) else [value], schema, schema)
+        return value
+    
+    def check(self, records: List[Dict], schema: str, path: str = ''):
+        """Validate records in place; raises SchemaError naming the first bad field"""
+        if not isinstance(records, list):
+            raise SchemaError(f"{path}: expected a list, got {type(records).__name__}")
+        fields = self._fields[schema]
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise SchemaError(f"{path}[{i}]: expected an object, got {type(record).__name__}")
+            for field, expected, nested in fields:
+                value = record.get(field)
+                if value is None:
+                    continue
+                kind = type(value)
+                if kind is not expected:
+                    if expected is float and kind is int:
+                        record[field] = float(value)
+                    elif expected is int and kind is float and value.is_integer():
+                        record[field] = int(value)
+                    else:
+                        raise SchemaError(f"{path}[{i}].{field}: expected {expected.__name__}, "
+                                          f"got {kind.__name__} {value!r}")
+                elif nested:
+                    self.check(value, nested, f"{path}[{i}].{field}")
+
+
+# Time every function and method above only when profiling from startup;
+# the wrappers would otherwise tax hot paths like StockLedger.quantity
+profiler = Profiler()
+if profiler.enabled:
+    profiler.instrument(globals())
+
+# Metrics fed from the data and manager layers (scrape with WAREHOUSE_METRICS_PORT set)
+metrics_registry = MetricsRegistry()
+orders_created = metrics_registry.counter(
+    'warehouse_orders_created_total', 'Orders created', ('warehouse',))
+stock_mutations = metrics_registry.counter(
+    'warehouse_stock_mutations_total', 'Stock ledger changes by kind', ('warehouse', 'kind'))
+audit_writes = metrics_registry.counter(
+    'warehouse_audit_writes_total', 'Audit log entries written')
+login_attempts = metrics_registry.counter(
+    'warehouse_login_attempts_total', 'Login attempts by result', ('result',))
+file_write_seconds = metrics_registry.histogram(
+    'warehouse_file_write_seconds', 'Time a data file was held open for writing', ('file',))
+profiler.on_write = lambda key, seconds: file_write_seconds.labels(key).observe(seconds)
+
+# Initialize managers
+codec = JsonCodec()
+backup_manager = BackupManager()
+audit_logger = AuditLogger()
+auth_manager = AuthManager()
+email_config = EmailAlertConfig()
+attendance_manager = AttendanceManager()
+warehouse_manager = MultiWarehouseManager()
+session_manager = SessionManager()
+attendance_analytics = AttendanceAnalytics(attendance_manager)
+shard_store = ShardedStore()
+snapshot_store = SnapshotStore()
+event_bus = EventBus()
+view_cache = ViewCache()
+event_bus.subscribe(view_cache.invalidate, sync=True)
+event_bus.subscribe(audit_logger.log_events)
+event_bus.subscribe(event_bus.collect_alerts)
+alert_dispatcher = AlertDispatcher(email_config)
+event_bus.subscribe(alert_dispatcher.on_events)
+
+
+def _peak_capacity(field: str) -> Dict:
+    sites = {w['id'] for w in warehouse_manager.get_all_warehouses()} | peak_manager.active_sites()
+    return {(wid,): peak_manager.metrics(warehouse_id=wid)[field] for wid in sites}
+
+
+metrics_registry.gauge('warehouse_peak_hour_capacity_units', 'Units admissible this hour',
+                       ('warehouse',)).set_function(lambda: _peak_capacity('hour_capacity'))
+metrics_registry.gauge('warehouse_peak_hour_consumed_units', 'Units admitted this hour',
+                       ('warehouse',)).set_function(lambda: _peak_capacity('hour_consumed'))
+metrics_registry.gauge('warehouse_admission_queue_depth', 'Orders deferred by peak-hour admission'
+                       ).set_function(peak_manager.queue_depth)
+metrics_registry.counter('warehouse_admission_decisions_total', 'Peak-hour admission decisions',
+                         ('decision',)).set_function(
+    lambda: {(k,): v for k, v in peak_manager.decision_counts().items()})
+metrics_registry.counter('warehouse_events_total', 'Domain events published', ('type',)).set_function(
+    lambda: {(k,): v for k, v in dict(event_bus.stats['by_type']).items()})
+metrics_registry.counter('warehouse_event_handler_errors_total', 'Event subscriber failures'
+                         ).set_function(lambda: event_bus.stats['errors'])
+metrics_registry.gauge('warehouse_event_queue_depth', 'Events waiting for background delivery'
+                       ).set_function(event_bus.queue_depth)
+metrics_registry.gauge('warehouse_email_outbox_pending', 'Alert emails waiting to be sent'
+                       ).set_function(lambda: len(alert_dispatcher.pending()))
+metrics_registry.gauge('warehouse_active_sessions', 'Signed-in sessions'
+                       ).set_function(session_manager.active_sessions)
+if os.environ.get('WAREHOUSE_METRICS_PORT'):
+    print(metrics_registry.serve(int(os.environ['WAREHOUSE_METRICS_PORT']))[1])
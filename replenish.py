@@ -0,0 +1,70 @@
+"""
+REPLENISHMENT - Nightly draft purchase-order run over the whole catalog
+Reads warehouse_data.json (or the warehouse shards when sharding is on),
+merges new draft POs per supplier and site, and writes the data back.
+
+Usage:
+    python replenish.py                 # e.g. from cron: 0 2 * * * python replenish.py
+    python replenish.py --dry-run       # print the plan, change nothing
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from helpers import ReplenishmentEngine, StockLedger, event_bus, shard_store, warehouse_manager
+
+DATA_FILE = "warehouse_data.json"
+
+
+def load():
+    if shard_store.enabled():
+        return shard_store.load_all()
+    with open(DATA_FILE, 'r') as f:
+        return json.load(f)
+
+
+def save(data):
+    if shard_store.enabled():
+        shard_store.save(data)
+    else:
+        with open(DATA_FILE, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Draft purchase orders from demand")
+    parser.add_argument("--dry-run", action="store_true", help="print proposed lines without saving")
+    parser.add_argument("--history-days", type=int, default=30)
+    args = parser.parse_args()
+
+    if not shard_store.enabled() and not os.path.exists(DATA_FILE):
+        print(f"❌ {DATA_FILE} not found", file=sys.stderr)
+        return 1
+
+    data = load()
+    ledger = StockLedger(data, warehouse_manager.get_all_warehouses())
+    engine = ReplenishmentEngine(data, ledger, history_days=args.history_days,
+                                 allocate_id=shard_store.allocate_id if shard_store.enabled() else None)
+
+    if args.dry_run:
+        for line in engine.plan():
+            print(f"site {line['warehouse_id']:<3} {line['supplier']:<20} {line['name'][:30]:<30} "
+                  f"qty={line['quantity']:<6} position={line['position']:<6} rop={line['reorder_point']}")
+        return 0
+
+    result = engine.run()
+    if 'error' in result:
+        print(f"❌ Replenishment failed: {result['error']}", file=sys.stderr)
+        return 1
+    save(data)
+    event_bus.publish('PurchaseOrdersDrafted', 0, 'System',
+                      f"Scheduled run: {result['lines']} lines, {result['pos_created']} new POs")
+    print(f"✅ {result['skus_evaluated']} SKUs in {result['elapsed']}s: {result['lines']} lines, "
+          f"{result['pos_created']} new POs, {result['pos_updated']} drafts updated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
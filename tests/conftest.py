@@ -0,0 +1,12 @@
+"""
+Tests import helpers from a scratch directory: its singletons create their
+data files (users.json, audit.json, attendance/...) in the working directory.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="warehouse-tests-"))
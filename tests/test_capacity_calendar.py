@@ -0,0 +1,45 @@
+"""A hand-edited capacity calendar with bad entries must not break startup"""
+
+import json
+from datetime import datetime
+
+from helpers import CapacityCalendar
+
+DEFAULTS = {14: 50, 15: 75}
+MONDAY = datetime(2026, 10, 19)
+
+
+def calendar_from(tmp_path, content):
+    path = tmp_path / "capacity_calendar.json"
+    path.write_text(content if isinstance(content, str) else json.dumps(content))
+    return CapacityCalendar(str(path), DEFAULTS, default_limit=30)
+
+
+def test_malformed_entries_are_skipped(tmp_path):
+    calendar = calendar_from(tmp_path, {
+        'default': 'lots',                                   # not a number
+        'hours': {'14': 60, '25': 10, 'noon': 10, '16': 'x'},
+        'weekdays': {'Funday': {'14': 5}, 'Sat': {'15': 40}},
+        'warehouses': {'north': {'default': 5}, '2': {'default': 20, 'hours': {'9': -1, '10': 12}},
+                       '3': 'closed'},
+        'seasons': [{'start': '13-40', 'end': '11-15', 'factor': 2},
+                    {'start': '10-15', 'end': '11-15', 'factor': 'high'},
+                    'festive'],
+    })
+
+    assert calendar.limit(None, MONDAY.replace(hour=14)) == 60   # valid entry kept
+    assert calendar.limit(None, MONDAY.replace(hour=16)) == 30   # bad limit -> default
+    assert calendar.limit(None, MONDAY.replace(hour=9)) == 30
+    assert calendar.limit(None, datetime(2026, 10, 24, 15)) == 40  # Saturday override kept
+    assert calendar.limit(2, MONDAY.replace(hour=9)) == 20        # negative limit dropped
+    assert calendar.limit(2, MONDAY.replace(hour=10)) == 12
+    assert calendar.limit(3, MONDAY.replace(hour=9)) == 30        # non-object site ignored
+    assert calendar._seasons == []
+
+
+def test_unreadable_file_falls_back_to_defaults(tmp_path):
+    for content in ('{"hours": {', '[1, 2, 3]'):
+        calendar = calendar_from(tmp_path, content)
+        assert calendar.limit(None, MONDAY.replace(hour=15)) == 75
+        assert calendar.limit(None, MONDAY.replace(hour=9)) == 30
+        assert calendar.is_peak(None, MONDAY.replace(hour=14))
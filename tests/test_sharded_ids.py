@@ -0,0 +1,53 @@
+"""Order line ids stay unique when lines are created in separate shards"""
+
+from helpers import OrderBook, ShardedStore, StockLedger
+
+WAREHOUSES = [{'id': 1, 'name': 'North', 'capacity': 1000},
+              {'id': 2, 'name': 'South', 'capacity': 1000}]
+ITEMS = [{'item_id': 1, 'name': 'Bolt', 'quantity': 2, 'price': 5.0},
+         {'item_id': 2, 'name': 'Crate', 'quantity': 1, 'price': 40.0}]
+
+
+def sharded_store(tmp_path):
+    store = ShardedStore(str(tmp_path / "shards"))
+    ok, msg = store.migrate({table: [] for table in ShardedStore.TABLES}, WAREHOUSES)
+    assert ok, msg
+    return store
+
+
+def create_in_shard(store, warehouse_id):
+    data = store.load(warehouse_id)
+    book = OrderBook(data, StockLedger(data, WAREHOUSES), allocate_id=store.allocate_id)
+    ok, msg, _ = book.create_order(store.allocate_id('orders'), 'Acme', ITEMS, warehouse_id, reserve=False)
+    assert ok, msg
+    store.save(data, warehouse_id)
+
+
+def test_lines_created_in_two_shards_merge_without_collisions(tmp_path):
+    store = sharded_store(tmp_path)
+    create_in_shard(store, 1)
+    create_in_shard(store, 2)
+
+    merged = store.load_all()
+    line_ids = [line['id'] for line in merged['order_lines']]
+    assert len(line_ids) == 4
+    assert len(set(line_ids)) == 4
+
+    book = OrderBook(merged, StockLedger(merged, WAREHOUSES))
+    assert len(book._line_by_id) == 4
+    for order in book.view(merged['orders']):
+        assert [item['item_id'] for item in order['items']] == [1, 2]
+        assert {item['warehouse_id'] for item in order['items']} == {order['warehouse_id']}
+
+
+def test_manifest_without_line_counter_is_seeded_from_shards(tmp_path):
+    store = sharded_store(tmp_path)
+    create_in_shard(store, 1)
+
+    # Manifest written before order_lines were allocated through it
+    manifest = store._manifest()
+    del manifest['next_ids']['order_lines']
+    store._write_manifest(manifest)
+
+    highest = max(line['id'] for line in store.load_all()['order_lines'])
+    assert store.allocate_id('order_lines') == highest + 1